@@ -0,0 +1,224 @@
+"""
+Baked sprite atlas.
+
+The build step cuts every frame out of the sprite sheet, rotates it and packs
+it into one 32-bit atlas stored as raw pixels in the usual display layout,
+next to a JSON manifest of named frames. At startup the atlas is read with a
+single memory-mapped copy; when it is missing or older than the sprite sheet
+the registry is built from the GIF instead.
+
+Build it from src with: PYTHONPATH=.. python -m src.atlas
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+import pygame
+
+from src.constants import Direction, Sprite
+from src.sprite_registry import ROTATION_ANGLES, SPRITE_RECTS, TILE_RECTS, SpriteRegistry
+
+SHEET_PATH = "../sprites/sprites.gif"
+ATLAS_PATH = "../sprites/atlas.raw"
+MANIFEST_PATH = "../sprites/atlas.json"
+SHEET_CACHE_PATH = "../sprites/sheet.raw"
+
+ATLAS_VERSION = 1
+ATLAS_WIDTH = 256
+# XRGB8888, the pixel format of most displays
+ATLAS_MASKS = (0xff0000, 0xff00, 0xff, 0)
+# candidates for the transparent color, the first one the sheet does not use wins
+COLORKEYS = ((255, 0, 255), (0, 255, 255), (1, 2, 3))
+
+SHEET_SIZE = (192, 224)
+# the scaled sheet's pixels follow the source stamp, the pitch and the colorkey
+SHEET_CACHE_HEADER = struct.Struct("<4sqqH3B")
+SHEET_CACHE_MAGIC = b"BCSH"
+
+
+def load_sheet():
+    """
+    The scaled sprite sheet as a 32-bit surface in the atlas pixel format.
+
+    The GIF marks transparency by palette index and also uses the same color
+    for visible pixels, so transparent pixels are moved to a color the sheet
+    doesn't use before leaving the palette behind.
+    """
+    converted = _load_cached_sheet()
+    if converted is not None:
+        return converted
+
+    sheet = pygame.transform.scale(pygame.image.load(SHEET_PATH), SHEET_SIZE)
+    colorkey = _find_colorkey(sheet)
+
+    converted = pygame.Surface(sheet.get_size(), 0, 32, ATLAS_MASKS)
+    converted.fill(colorkey)
+    converted.blit(sheet, [0, 0])
+    converted.set_colorkey(colorkey)
+
+    try:
+        _save_cached_sheet(converted)
+    except OSError:
+        # a read-only install scales the sheet at every launch
+        pass
+    return converted
+
+
+def _save_cached_sheet(sheet):
+    stamp = get_source_stamp()
+    # written under a temporary name first, a launch reading the cache never sees half of it
+    temporary = f"{SHEET_CACHE_PATH}.{os.getpid()}"
+    with open(temporary, "wb") as f:
+        f.write(SHEET_CACHE_HEADER.pack(SHEET_CACHE_MAGIC, stamp["mtime_ns"], stamp["size"], sheet.get_pitch(),
+                                        *sheet.get_colorkey()[:3]))
+        f.write(sheet.get_view("1").raw)
+    os.replace(temporary, SHEET_CACHE_PATH)
+
+
+def _load_cached_sheet():
+    """The scaled sheet saved by a previous launch, None if there is none or the GIF changed since."""
+    if not os.path.isfile(SHEET_CACHE_PATH):
+        return None
+
+    with open(SHEET_CACHE_PATH, "rb") as f:
+        data = f.read()
+    try:
+        magic, mtime_ns, size, pitch, *colorkey = SHEET_CACHE_HEADER.unpack_from(data)
+    except struct.error:
+        # a cut short file is rebuilt like a stale one
+        return None
+    stamp = get_source_stamp()
+    if magic != SHEET_CACHE_MAGIC or (mtime_ns, size) != (stamp["mtime_ns"], stamp["size"]):
+        return None
+
+    sheet = pygame.Surface(SHEET_SIZE, 0, 32, ATLAS_MASKS)
+    if sheet.get_pitch() != pitch or len(data) != SHEET_CACHE_HEADER.size + pitch * sheet.get_height():
+        return None
+    pixels = memoryview(sheet.get_view("1")).cast("B")
+    pixels[:] = memoryview(data)[SHEET_CACHE_HEADER.size:]
+    pixels.release()
+    sheet.set_colorkey(colorkey)
+    return sheet
+
+
+def get_layout_hash():
+    """Changes whenever the frame table in sprite_registry does."""
+    layout = repr((sorted(SPRITE_RECTS.items()), sorted(TILE_RECTS.items()), sorted(ROTATION_ANGLES.items())))
+    return hashlib.sha1(layout.encode()).hexdigest()
+
+
+def get_frame_name(key):
+    sprite, direction, variant = key
+    return f"{Sprite(sprite).name}:{Direction(direction).name}:{variant}"
+
+
+def parse_frame_name(name):
+    sprite, direction, variant = name.split(":")
+    return Sprite[sprite], Direction[direction], int(variant)
+
+
+def get_source_stamp():
+    stat = os.stat(SHEET_PATH)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def _pack(images):
+    """Shelf-pack frames, tallest first, into rows ATLAS_WIDTH pixels wide."""
+    frames = {}
+    x = y = row_height = 0
+    for key, image in sorted(images.items(), key=lambda item: -item[1].get_height()):
+        width, height = image.get_size()
+        if x + width > ATLAS_WIDTH:
+            x, y = 0, y + row_height
+            row_height = 0
+        frames[key] = (x, y, width, height)
+        x += width
+        row_height = max(row_height, height)
+    return frames, (ATLAS_WIDTH, y + row_height)
+
+
+def _find_colorkey(sheet):
+    if sheet.get_bitsize() == 8:
+        used = {tuple(color)[:3] for color in sheet.get_palette()}
+    else:
+        used = {tuple(sheet.get_at((x, y)))[:3] for x in range(sheet.get_width()) for y in range(sheet.get_height())}
+    for colorkey in COLORKEYS:
+        if colorkey not in used:
+            return colorkey
+    raise ValueError("No free color left for the atlas colorkey")
+
+
+def bake_atlas():
+    sheet = load_sheet()
+    images = SpriteRegistry.from_sheet(sheet).images
+    frames, size = _pack(images)
+    colorkey = sheet.get_colorkey()[:3]
+
+    atlas = pygame.Surface(size, 0, 32, ATLAS_MASKS)
+    atlas.fill(colorkey)
+    for key, rect in frames.items():
+        # transparent pixels of the frame are skipped and keep the atlas colorkey
+        atlas.blit(images[key], rect[:2])
+
+    with open(ATLAS_PATH, "wb") as f:
+        f.write(atlas.get_view("1").raw)
+
+    manifest = {
+        "version": ATLAS_VERSION,
+        "layout": get_layout_hash(),
+        "source": get_source_stamp(),
+        "size": list(size),
+        "pitch": atlas.get_pitch(),
+        "masks": list(ATLAS_MASKS),
+        "colorkey": list(colorkey),
+        "frames": {get_frame_name(key): list(rect) for key, rect in sorted(frames.items())}
+    }
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(manifest, f, indent=1)
+
+    return manifest
+
+
+def load_atlas():
+    """The registry backed by the baked atlas, None if there is no atlas or it is stale."""
+    if not os.path.isfile(ATLAS_PATH) or not os.path.isfile(MANIFEST_PATH):
+        return None
+
+    with open(MANIFEST_PATH, "r") as f:
+        manifest = json.load(f)
+    if (manifest.get("version") != ATLAS_VERSION or manifest.get("layout") != get_layout_hash()
+            or manifest.get("source") != get_source_stamp()):
+        return None
+
+    atlas = pygame.Surface(manifest["size"], 0, 32, manifest["masks"])
+    if atlas.get_pitch() != manifest["pitch"] or os.path.getsize(ATLAS_PATH) != atlas.get_pitch() * atlas.get_height():
+        return None
+
+    with open(ATLAS_PATH, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        pixels = memoryview(atlas.get_view("1")).cast("B")
+        pixels[:] = data
+        pixels.release()
+    atlas.set_colorkey(manifest["colorkey"])
+
+    if pygame.display.get_surface() is not None:
+        atlas = atlas.convert()
+
+    frames = {parse_frame_name(name): rect for name, rect in manifest["frames"].items()}
+    return SpriteRegistry.from_atlas(atlas, frames)
+
+
+def load_sprite_registry():
+    registry = load_atlas()
+    if registry is None:
+        sheet = load_sheet()
+        if pygame.display.get_surface() is not None:
+            sheet = sheet.convert()
+        registry = SpriteRegistry.from_sheet(sheet)
+    return registry
+
+
+if __name__ == "__main__":
+    baked = bake_atlas()
+    print(f"Baked {len(baked['frames'])} frames into a {baked['size'][0]}x{baked['size'][1]} atlas")
@@ -0,0 +1,116 @@
+import pygame
+
+# sounds that are never dropped, they take over the channel of a less important sound when none is free
+CRITICAL = 3
+
+PRIORITIES = {
+    "gameover": CRITICAL,
+    "bonus": CRITICAL,
+    "gamestart": 2,
+    "background": 2,
+    "score": 1,
+    "explosion": 1,
+    "fire": 0,
+    "brick": 0,
+    "steel": 0
+}
+
+# times a sample may start in one tick, any more requests for it are merged
+DEFAULT_LIMIT = 1
+
+CHANNELS = 8
+
+
+class Audio:
+    """
+    Sound requests of a tick, played together through a pool of channels.
+
+    play only queues a request, flush starts the queued sounds once per tick:
+    most important first, each sample at most its limit times. A sound takes
+    a free channel of the pool, or the channel of a less important sound, or
+    is dropped. CRITICAL sounds take the least important channel even from an
+    equally important sound, so they are never dropped. sounds maps names to
+    DeferredSounds, see src/sound_loader.py.
+    """
+    def __init__(self, sounds=None, channels=CHANNELS, limits=None):
+        self.sounds = {} if sounds is None else sounds
+        self.channel_count = channels
+        self.limits = {} if limits is None else limits
+
+        # name -> loops of the sounds requested since the last flush, in request order
+        self.pending = {}
+        self.counts = {}
+
+        # created on the first flush, the mixer may not be initialised before
+        self.channels = None
+        # (priority, name) of what each channel last started
+        self.playing = [None] * channels
+
+        self.stats = {"played": 0, "merged": 0, "dropped": 0, "preempted": 0}
+
+    def play(self, name, loops=0):
+        count = self.counts.get(name, 0)
+        if count >= self.limits.get(name, DEFAULT_LIMIT):
+            self.stats["merged"] += 1
+            return
+        self.counts[name] = count + 1
+        self.pending.setdefault(name, []).append(loops)
+
+    def stop(self, name):
+        self.pending.pop(name, None)
+        self.counts.pop(name, None)
+        if self.channels is None:
+            return
+        for n, channel in enumerate(self.channels):
+            if self.playing[n] is not None and self.playing[n][1] == name:
+                channel.stop()
+                self.playing[n] = None
+
+    def stop_all(self):
+        self.pending.clear()
+        self.counts.clear()
+        if self.channels is not None:
+            for channel in self.channels:
+                channel.stop()
+        self.playing = [None] * self.channel_count
+
+    def flush(self):
+        if not self.pending:
+            return
+        if self.channels is None:
+            pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), self.channel_count))
+            self.channels = [pygame.mixer.Channel(n) for n in range(self.channel_count)]
+
+        for name in sorted(self.pending, key=lambda name: -PRIORITIES.get(name, 0)):
+            # sounds missing or still decoding are skipped
+            sound = self.sounds[name].get() if name in self.sounds else None
+            for loops in self.pending[name]:
+                if sound is None:
+                    continue
+                priority = PRIORITIES.get(name, 0)
+                n = self._get_channel(priority)
+                if n is None:
+                    self.stats["dropped"] += 1
+                    continue
+                self.channels[n].play(sound, loops)
+                self.playing[n] = (priority, name)
+                self.stats["played"] += 1
+
+        self.pending.clear()
+        self.counts.clear()
+
+    def _get_channel(self, priority):
+        """Index of the channel a sound of priority plays on, None when it has to be dropped."""
+        lowest = None
+        for n, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                return n
+            if lowest is None or self.playing[n] is None or (self.playing[lowest] is not None
+                                                             and self.playing[n][0] < self.playing[lowest][0]):
+                lowest = n
+
+        playing = self.playing[lowest]
+        if playing is None or playing[0] < priority or (priority >= CRITICAL and playing[0] <= priority):
+            self.stats["preempted"] += 1
+            return lowest
+        return None
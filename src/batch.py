@@ -0,0 +1,188 @@
+"""
+Many games stepped in lockstep.
+
+BatchedSimulation keeps the state the rules scan every tick in arrays with
+a leading game dimension: the tile grids of all games and their bullets.
+Bullets of every game are moved and tested against the borders, the tiles,
+each other, the tanks and the castles in one vectorized pass, only those touching something go through the per-game rules of
+BulletEngine.resolve. Tanks still run their own rules and every game draws
+from its own seeded generator, so each game plays exactly as a Simulation
+on its own would.
+"""
+import random
+
+import numpy as np
+
+from src.bullet_engine import BULLET_STOPPING_TILES, FIELDS, BulletEngine
+from src.constants import MAP_SIZE, TICK_MS, TILE_SIZE, BulletState, TankState
+from src.simulation import Simulation
+
+
+class BatchedBulletEngine(BulletEngine):
+    """The bullets of one game of a batch, its arrays being row index of the batch's."""
+    def __init__(self, game, batch, index):
+        BulletEngine.__init__(self, game, capacity=0)
+        self.batch = batch
+        self.index = index
+        self.bind()
+
+    def bind(self):
+        for name in FIELDS:
+            setattr(self, name, getattr(self.batch, name)[self.index])
+
+    def _grow(self):
+        self.batch.grow_bullets()
+
+
+class BatchedSimulation:
+    def __init__(self, count, players_number=1, seed=None, enemy_behaviour=None, bullet_capacity=16):
+        if seed is None:
+            seed = random.randrange(2 ** 63)
+        options = {} if enemy_behaviour is None else {"enemy_behaviour": enemy_behaviour}
+        self.games = [Simulation(players_number, seed + n, **options) for n in range(count)]
+
+        self.tiles = np.zeros((count, MAP_SIZE, MAP_SIZE), dtype=np.uint8)
+
+        template = self.games[0].bullet_engine
+        for name in FIELDS:
+            setattr(self, name, np.zeros((count, bullet_capacity), dtype=getattr(template, name).dtype))
+        for n, game in enumerate(self.games):
+            game.bullet_engine = BatchedBulletEngine(game, self, n)
+
+    def __len__(self):
+        return len(self.games)
+
+    def grow_bullets(self):
+        for name in FIELDS:
+            array = getattr(self, name)
+            grown = np.zeros((array.shape[0], array.shape[1] * 2), dtype=array.dtype)
+            grown[:, :array.shape[1]] = array
+            setattr(self, name, grown)
+        for game in self.games:
+            game.bullet_engine.bind()
+
+    def start_stage(self, index, stage=None):
+        """Start the next stage of a game, or the given one, with its tiles stored in the batch."""
+        self.games[index].start_stage(stage)
+        self._bind_level(index)
+
+    def _bind_level(self, index):
+        """Move the tiles of the level a game just started into the batch."""
+        game = self.games[index]
+        self.tiles[index] = np.frombuffer(game.level.map, dtype=np.uint8).reshape(MAP_SIZE, MAP_SIZE)
+        game.level.map = memoryview(self.tiles[index].reshape(-1))
+
+    def reset(self, index, seed=None, stage=1, players=None):
+        """Start a new game in a slot, the way the menu does."""
+        game = self.games[index]
+        game.new_game(game.players_number if players is None else players, stage, seed)
+        self._bind_level(index)
+
+    def step(self, inputs, time_passed=TICK_MS):
+        """Advance every game by one tick, inputs holding a list of (direction, fire) per game."""
+        for game, game_inputs in zip(self.games, inputs):
+            game.step_tanks(game_inputs, time_passed)
+        dropped = self.update_bullets()
+        for game, game_dropped in zip(self.games, dropped):
+            game.step_rest(game_dropped, time_passed)
+
+    def update_bullets(self):
+        """BulletEngine.update for all games at once, returns the dropped bullets of each game."""
+        games = self.games
+        counts = np.array([len(game.bullets) for game in games])
+        dropped = [[] for _ in games]
+        width = int(counts.max())
+        if width == 0:
+            return dropped
+
+        valid = np.arange(width) < counts[:, None]
+        state = self.state[:, :width]
+        removed = (state == BulletState.Removed) & valid
+        moving_games, moving_rows = np.nonzero((state == BulletState.Active) & valid)
+
+        for index in np.flatnonzero(((state == BulletState.Exploding) & valid).any(axis=1)).tolist():
+            games[index].bullet_engine.finish_explosions()
+
+        if len(moving_games):
+            x, y = self.x[:, :width], self.y[:, :width]
+            old_x, old_y = x.copy(), y.copy()
+            moving = moving_games, moving_rows
+            speed = self.speed[moving]
+            x[moving] += self.dx[moving] * speed
+            y[moving] += self.dy[moving] * speed
+
+            for index, i, left, top in zip(moving_games.tolist(), moving_rows.tolist(),
+                                           x[moving].tolist(), y[moving].tolist()):
+                games[index].bullets[i].rect.topleft = left, top
+
+            outside, touching = self._find_contacts(moving_games, moving_rows, old_x, old_y, valid)
+            # row-major order, so each game's bullets are resolved in list order
+            for k in np.flatnonzero(touching).tolist():
+                index, i = int(moving_games[k]), int(moving_rows[k])
+                n = counts[index]
+                games[index].bullet_engine.resolve(i, outside[k], removed[index, :n], old_x[index, :n],
+                                                   old_y[index, :n])
+
+        for index in np.flatnonzero(removed.any(axis=1)).tolist():
+            dropped[index] = games[index].bullet_engine.compact(removed[index, :counts[index]])
+        return dropped
+
+    def _find_contacts(self, moving_games, moving_rows, old_x, old_y, valid):
+        """BulletEngine._find_contacts over the moving bullets of every game."""
+        width = valid.shape[1]
+        x, y = self.x[:, :width], self.y[:, :width]
+        widths, heights = self.width[:, :width], self.height[:, :width]
+        owner = self.owner[:, :width]
+
+        left, top = x[moving_games, moving_rows], y[moving_games, moving_rows]
+        bullet_width, bullet_height = widths[moving_games, moving_rows], heights[moving_games, moving_rows]
+        right, bottom = left + bullet_width, top + bullet_height
+        dx, dy = self.dx[moving_games, moving_rows], self.dy[moving_games, moving_rows]
+
+        field = MAP_SIZE * TILE_SIZE
+        outside = (((dy < 0) & (top < 0)) | ((dx > 0) & (left > field - bullet_width)) |
+                   ((dy > 0) & (top > field - bullet_height)) | ((dx < 0) & (left < 0)))
+
+        x0 = np.minimum(np.maximum(left // TILE_SIZE, 0), MAP_SIZE - 1)
+        y0 = np.minimum(np.maximum(top // TILE_SIZE, 0), MAP_SIZE - 1)
+        x1 = np.minimum(np.maximum((right - 1) // TILE_SIZE, 0), MAP_SIZE - 1)
+        y1 = np.minimum(np.maximum((bottom - 1) // TILE_SIZE, 0), MAP_SIZE - 1)
+        tiles = self.tiles
+        touching = outside | (~outside & (BULLET_STOPPING_TILES[tiles[moving_games, y0, x0]] |
+                                          BULLET_STOPPING_TILES[tiles[moving_games, y0, x1]] |
+                                          BULLET_STOPPING_TILES[tiles[moving_games, y1, x0]] |
+                                          BULLET_STOPPING_TILES[tiles[moving_games, y1, x1]]))
+
+        # the other bullets of the same game, before and after this tick's move
+        others = valid[moving_games] & (owner[moving_games, moving_rows][:, None] != owner[moving_games])
+        others[np.arange(len(moving_games)), moving_rows] = False
+        target_width, target_height = widths[moving_games], heights[moving_games]
+        for target_x, target_y in ((x[moving_games], y[moving_games]), (old_x[moving_games], old_y[moving_games])):
+            hits = ((left[:, None] < target_x + target_width) & (target_x < right[:, None]) &
+                    (top[:, None] < target_y + target_height) & (target_y < bottom[:, None]) & others)
+            touching |= hits.any(axis=1)
+
+        # alive tanks and standing castles of the games with moving bullets
+        shooting = np.unique(moving_games)
+        boxes = []
+        for index in shooting.tolist():
+            game = self.games[index]
+            game_boxes = [tuple(tank.rect) for tank in game.players + game.enemies if tank.state == TankState.Alive]
+            if game.castle.active:
+                game_boxes.append(tuple(game.castle.rect))
+            boxes.append(game_boxes)
+        most = max(len(game_boxes) for game_boxes in boxes)
+        if most:
+            box_array = np.zeros((len(self.games), most, 4), dtype=np.int32)
+            box_valid = np.zeros((len(self.games), most), dtype=bool)
+            for index, game_boxes in zip(shooting.tolist(), boxes):
+                if game_boxes:
+                    box_array[index, :len(game_boxes)] = game_boxes
+                    box_valid[index, :len(game_boxes)] = True
+            box = box_array[moving_games]
+            hits = ((left[:, None] < box[:, :, 0] + box[:, :, 2]) & (box[:, :, 0] < right[:, None]) &
+                    (top[:, None] < box[:, :, 1] + box[:, :, 3]) & (box[:, :, 1] < bottom[:, None]) &
+                    box_valid[moving_games])
+            touching |= hits.any(axis=1)
+
+        return outside, touching
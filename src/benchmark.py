@@ -0,0 +1,273 @@
+"""
+Microbenchmarks of the hot paths.
+
+Every benchmark runs on a fixture built from a fixed seed, under the SDL
+dummy drivers so no window or sound device is needed. The median and the
+best time per call of each benchmark are written to a JSON file. The best
+times, the least disturbed by the rest of the machine, are compared with a
+stored baseline: a benchmark slower than the baseline by more than the
+threshold counts as a regression and makes the run exit with status 1, as
+does a missing baseline.
+
+Run it from src with: PYTHONPATH=.. python -m src.benchmark
+Store the current numbers as the baseline with --save-baseline.
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import functools
+import gc
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+import pygame
+
+from src.constants import TICK_MS, Direction, TankState
+from src.simulation import Simulation
+from src.timer import Timer
+
+RESULTS_PATH = "../benchmarks/latest.json"
+BASELINE_PATH = "../benchmarks/baseline.json"
+BENCHMARK_VERSION = 1
+SEED = 1985
+REPEAT = 9
+
+
+def _get_inputs(rng, players):
+    return [(rng.choice([None, Direction.Up, Direction.Up, Direction.Left, Direction.Right, Direction.Down]),
+             rng.random() < 0.3) for _ in range(players)]
+
+
+def _get_simulation(stage=1, ticks=400, players=2, game=None):
+    """A seeded simulation a few seconds into a stage, enemies spawned and bricks shot."""
+    sim = game if game is not None else Simulation(players_number=players, seed=SEED)
+    sim.new_game(players, stage)
+
+    rng = random.Random(SEED)
+    inputs = _get_inputs(rng, players)
+    for tick in range(ticks):
+        if tick % 25 == 0:
+            inputs = _get_inputs(rng, players)
+        sim.step(inputs)
+    return sim
+
+
+def _fire_volley(sim, count):
+    """Put count bullets flying in seeded directions from seeded spots of the field."""
+    rng = random.Random(SEED)
+    tanks = [tank for tank in sim.players + sim.enemies if tank.state == TankState.Alive]
+    for n in range(count):
+        tank = tanks[n % len(tanks)]
+        position = tank.rect.topleft
+        tank.rect.topleft = rng.randrange(0, 390), rng.randrange(0, 390)
+        tank.direction = rng.choice(list(Direction))
+        tank.fire(True)
+        tank.rect.topleft = position
+
+
+def bench_bullet_engine_update():
+    # Bullet.update became BulletEngine.update, one call moves every bullet
+    sim = _get_simulation()
+    _fire_volley(sim, 200)
+    return sim.bullet_engine.update, 10
+
+
+def bench_level_hit_tile():
+    sim = _get_simulation(ticks=0)
+    rng = random.Random(SEED)
+    positions = [(rng.randrange(0, 416), rng.randrange(0, 416)) for _ in range(500)]
+    level = sim.level
+
+    def run():
+        for position in positions:
+            level.hit_tile(position, 2)
+    return run, 1
+
+
+def bench_level_update_obstacle_rects():
+    sim = _get_simulation(ticks=0)
+    return sim.level.update_obstacle_rects, 50
+
+
+def bench_enemy_generate_path():
+    sim = _get_simulation()
+    enemy = sim.enemies[0]
+
+    def run():
+        enemy.generate_path(None, True)
+        enemy.generate_path(enemy.direction)
+    return run, 200
+
+
+def bench_enemy_move():
+    sim = _get_simulation()
+    enemies = sim.enemies
+
+    def run():
+        for enemy in enemies:
+            enemy.move()
+    return run, 100
+
+
+def bench_timer_update():
+    timer = Timer()
+    rng = random.Random(SEED)
+    for n in range(500):
+        timer.add(rng.choice([20, 100, 200, 500, 1000, 3000]), lambda: None, rng.choice([-1, 1, 5]))
+
+    def run():
+        timer.update(TICK_MS)
+    return run, 500
+
+
+_game = None
+
+
+def _get_game():
+    """One window for every draw benchmark, reseeded for each fixture."""
+    global _game
+    from src.game import Game
+
+    if _game is None:
+        _game = Game(seed=SEED)
+        _game.play_sounds = False
+        # the score screen waits on the clock and the keyboard, end stages the headless way instead
+        _game._end_stage = functools.partial(Simulation._end_stage, _game)
+    _game.random.seed(SEED)
+    return _game
+
+
+def bench_game_draw():
+    game = _get_simulation(game=_get_game())
+    game.dirty_rendering = False
+    return game.draw, 20
+
+
+def bench_game_draw_dirty():
+    game = _get_simulation(game=_get_game())
+    game.dirty_rendering = True
+    game.drawn_rects = None
+    game.draw()
+    return game.draw, 50
+
+
+def bench_level_load_level():
+    sim = _get_simulation(ticks=0)
+    level = sim.level
+
+    def run():
+        for level_number in range(1, 7):
+            level.load_level(level_number)
+    return run, 5
+
+
+BENCHMARKS = {
+    "bullet_engine.update": bench_bullet_engine_update,
+    "level.hit_tile": bench_level_hit_tile,
+    "level.update_obstacle_rects": bench_level_update_obstacle_rects,
+    "enemy.generate_path": bench_enemy_generate_path,
+    "enemy.move": bench_enemy_move,
+    "timer.update": bench_timer_update,
+    "game.draw": bench_game_draw,
+    "game.draw_dirty": bench_game_draw_dirty,
+    "level.load_level": bench_level_load_level,
+}
+
+
+def measure(setup, repeat=REPEAT):
+    """
+    Microseconds per call of the function setup returns, one fresh fixture
+    per repeat so state changed by the calls doesn't carry over.
+    """
+    times = []
+    for _ in range(repeat):
+        run, calls = setup()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter_ns()
+            for _ in range(calls):
+                run()
+            elapsed = time.perf_counter_ns() - start
+        finally:
+            gc.enable()
+        times.append(elapsed / calls / 1000)
+    return {"median_us": round(statistics.median(times), 3), "min_us": round(min(times), 3), "repeat": repeat}
+
+
+def run_benchmarks(names=None, repeat=REPEAT):
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        results[name] = measure(setup, repeat)
+        print(f"{name:30} {results[name]['min_us']:12.1f} us", file=sys.stderr)
+
+    return {
+        "version": BENCHMARK_VERSION,
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results
+    }
+
+
+def compare(results, baseline, threshold):
+    """Names of the benchmarks slower than the baseline by more than threshold, 0.2 meaning 20%."""
+    regressions = []
+    for name, result in results["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = result["min_us"] / base["min_us"]
+        flag = "REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{name:30} {base['min_us']:12.1f} -> {result['min_us']:12.1f} us  {ratio:6.2f}x {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def _write_json(filename, data):
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(filename, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the hot paths of Battle city")
+    parser.add_argument("names", nargs="*", help="benchmarks to run, all by default: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--output", default=RESULTS_PATH, help="where to write the results")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="slowdown over the baseline that counts as a regression, 0.2 meaning 20%%")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="fresh fixtures timed per benchmark")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    args = parser.parse_args()
+
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    benchmark_results = run_benchmarks(args.names, args.repeat)
+    _write_json(args.output, benchmark_results)
+
+    if args.save_baseline:
+        _write_json(args.baseline, benchmark_results)
+    elif os.path.isfile(args.baseline):
+        with open(args.baseline, "r") as f:
+            if compare(benchmark_results, json.load(f), args.threshold):
+                sys.exit(1)
+    else:
+        # nothing to check against is a failure, not a pass
+        sys.exit(f"No baseline at {args.baseline}, store one with --save-baseline")
@@ -1,8 +1,6 @@
-import random
-
 import pygame
 
-from src.constants import BonusType
+from src.constants import BonusType, Sprite
 
 
 class Bonus:
@@ -19,8 +17,8 @@ class Bonus:
         self.level = level
         self.active = True
         self.visible = True
-        self.rect = pygame.Rect(random.randint(0, 416 - 32), random.randint(0, 416 - 32), 32, 32)
-        self.bonus = random.choice([
+        self.rect = pygame.Rect(self.game.random.randint(0, 416 - 32), self.game.random.randint(0, 416 - 32), 32, 32)
+        self.bonus = self.game.random.choice([
             BonusType.Grenade,
             BonusType.Helmet,
             BonusType.Shovel,
@@ -28,11 +26,11 @@ class Bonus:
             BonusType.Tank,
             BonusType.Timer
         ])
-        self.image = self.game.sprites.subsurface(16 * 2 * self.bonus, 32 * 2, 16 * 2, 15 * 2)
+        self.image = self.game.sprite_registry.get(Sprite.Bonus, variant=self.bonus)
 
     def draw(self):
         if self.visible:
-            self.game.screen.blit(self.image, self.rect.topleft)
+            return self.game.screen.blit(self.image, self.rect.topleft)
 
     def toggle_visibility(self):
         self.visible = not self.visible
@@ -0,0 +1,236 @@
+import numpy as np
+
+from src.constants import MAP_SIZE, TILE_SIZE, BulletState, GameSide, TankState, Tile
+
+# movement per unit of speed, indexed by Direction
+DIRECTION_X = (0, 1, 0, -1)
+DIRECTION_Y = (-1, 0, 1, 0)
+
+# tiles that stop a bullet, water lets it fly over
+BULLET_STOPPING_TILES = np.zeros(256, dtype=bool)
+BULLET_STOPPING_TILES[[Tile.Brick, Tile.Steel]] = True
+
+# the arrays of a BulletEngine, one row per bullet
+FIELDS = ("x", "y", "width", "height", "dx", "dy", "speed", "power", "owner", "state")
+
+
+class BulletEngine:
+    """
+    Structure-of-arrays update for every bullet in game.bullets.
+
+    Row n of the arrays belongs to game.bullets[n]. All bullets are moved
+    and tested against the borders, the tile grid, each other, the tanks and
+    the castle in vectorized passes. Only the bullets that touch something
+    are then resolved one by one, in list order, by the usual rules: every
+    other bullet just moves.
+    """
+    def __init__(self, game, capacity=64):
+        self.game = game
+        self.bullets = game.bullets
+
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.width = np.zeros(capacity, dtype=np.int32)
+        self.height = np.zeros(capacity, dtype=np.int32)
+        self.dx = np.zeros(capacity, dtype=np.int32)
+        self.dy = np.zeros(capacity, dtype=np.int32)
+        self.speed = np.zeros(capacity, dtype=np.int32)
+        self.power = np.zeros(capacity, dtype=np.int8)
+        self.owner = np.zeros(capacity, dtype=np.int8)
+        self.state = np.zeros(capacity, dtype=np.int8)
+
+        # zero-copy view of level.map, rebuilt when the level changes
+        self.level_map = None
+        self.grid = None
+
+    def _get_arrays(self):
+        return tuple(getattr(self, name) for name in FIELDS)
+
+    def _grow(self):
+        for name in FIELDS:
+            array = getattr(self, name)
+            grown = np.zeros(len(array) * 2, dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def add(self, bullet):
+        """Append a fired bullet to game.bullets and to the arrays."""
+        n = len(self.bullets)
+        if n == len(self.x):
+            self._grow()
+        self.bullets.append(bullet)
+
+        self.x[n], self.y[n], self.width[n], self.height[n] = bullet.rect
+        self.dx[n] = DIRECTION_X[bullet.direction]
+        self.dy[n] = DIRECTION_Y[bullet.direction]
+        self.speed[n] = bullet.speed
+        self.power[n] = bullet.power
+        self.owner[n] = bullet.owner
+        self.state[n] = bullet.state
+
+    def _get_grid(self):
+        level_map = self.game.level.map
+        if level_map is not self.level_map:
+            self.level_map = level_map
+            self.grid = np.frombuffer(level_map, dtype=np.uint8).reshape(MAP_SIZE, MAP_SIZE)
+        return self.grid
+
+    def update(self):
+        """
+        Advance every bullet by one tick and return the bullets dropped from
+        game.bullets, those that were already removed when the tick started.
+        """
+        n = len(self.bullets)
+        if n == 0:
+            return []
+        state = self.state[:n]
+        removed = state == BulletState.Removed
+        moving = np.flatnonzero(state == BulletState.Active)
+
+        self.finish_explosions()
+
+        if len(moving):
+            old_x = self.x[:n].copy()
+            old_y = self.y[:n].copy()
+            self.x[moving] += self.dx[moving] * self.speed[moving]
+            self.y[moving] += self.dy[moving] * self.speed[moving]
+            self.sync_rects(moving)
+
+            outside, touching = self._find_contacts(moving, old_x, old_y)
+            for i in moving[touching].tolist():
+                self.resolve(i, outside[i], removed, old_x, old_y)
+
+        return self.compact(removed)
+
+    def finish_explosions(self):
+        """Mark the bullets whose explosion is over as removed, they are dropped on the next update."""
+        n = len(self.bullets)
+        for i in np.flatnonzero(self.state[:n] == BulletState.Exploding).tolist():
+            bullet = self.bullets[i]
+            if not bullet.explosion.active:
+                bullet.destroy()
+                self.game.explosion_pool.release(bullet.explosion)
+                bullet.explosion = None
+                self.state[i] = BulletState.Removed
+
+    def sync_rects(self, moving):
+        for i, left, top in zip(moving.tolist(), self.x[moving].tolist(), self.y[moving].tolist()):
+            self.bullets[i].rect.topleft = left, top
+
+    def compact(self, removed):
+        """Drop the rows and bullets flagged in removed and return the dropped bullets."""
+        if not removed.any():
+            return []
+        n = len(removed)
+        keep = ~removed
+        kept = int(keep.sum())
+        for array in self._get_arrays():
+            array[:kept] = array[:n][keep]
+        dropped = [bullet for bullet, gone in zip(self.bullets, removed.tolist()) if gone]
+        self.bullets[:] = [bullet for bullet, gone in zip(self.bullets, removed.tolist()) if not gone]
+        return dropped
+
+    def _find_contacts(self, moving, old_x, old_y):
+        """
+        Flag the moved bullets that left the field and those that may hit
+        something. The second mask is a superset: resolve makes the final call.
+        """
+        n = len(self.bullets)
+        x, y, width, height, dx, dy = self.x[:n], self.y[:n], self.width[:n], self.height[:n], self.dx[:n], self.dy[:n]
+        owner = self.owner[:n]
+        left, top = x[moving], y[moving]
+        right, bottom = left + width[moving], top + height[moving]
+
+        field = MAP_SIZE * TILE_SIZE
+        outside = np.zeros(n, dtype=bool)
+        outside[moving] = (((dy[moving] < 0) & (top < 0)) | ((dx[moving] > 0) & (left > field - width[moving])) |
+                           ((dy[moving] > 0) & (top > field - height[moving])) | ((dx[moving] < 0) & (left < 0)))
+        inside = ~outside[moving]
+
+        # a bullet is at most 8x8, so it covers at most 2x2 tiles
+        grid = self._get_grid()
+        # np.clip costs more than the ufuncs it wraps on a handful of bullets
+        x0 = np.minimum(np.maximum(left // TILE_SIZE, 0), MAP_SIZE - 1)
+        y0 = np.minimum(np.maximum(top // TILE_SIZE, 0), MAP_SIZE - 1)
+        x1 = np.minimum(np.maximum((right - 1) // TILE_SIZE, 0), MAP_SIZE - 1)
+        y1 = np.minimum(np.maximum((bottom - 1) // TILE_SIZE, 0), MAP_SIZE - 1)
+        touching = outside[moving] | (inside & (BULLET_STOPPING_TILES[grid[y0, x0]] | BULLET_STOPPING_TILES[grid[y0, x1]] |
+                                                BULLET_STOPPING_TILES[grid[y1, x0]] | BULLET_STOPPING_TILES[grid[y1, x1]]))
+
+        # other bullets, at the position they had before or after this tick's move, removed ones included
+        for target_x, target_y in ((x, y), (old_x, old_y)):
+            hits = ((left[:, None] < target_x + width) & (target_x < right[:, None]) &
+                    (top[:, None] < target_y + height) & (target_y < bottom[:, None]) &
+                    (owner[moving][:, None] != owner))
+            hits[np.arange(len(moving)), moving] = False
+            touching |= hits.any(axis=1)
+
+        boxes = [tank.rect for tank in self.game.players + self.game.enemies if tank.state == TankState.Alive]
+        if self.game.castle.active:
+            boxes.append(self.game.castle.rect)
+        if boxes:
+            boxes = np.array([tuple(box) for box in boxes], dtype=np.int32)
+            hits = ((left[:, None] < boxes[:, 0] + boxes[:, 2]) & (boxes[:, 0] < right[:, None]) &
+                    (top[:, None] < boxes[:, 1] + boxes[:, 3]) & (boxes[:, 1] < bottom[:, None]))
+            touching |= hits.any(axis=1)
+
+        return outside, touching
+
+    def resolve(self, i, outside, removed, old_x, old_y):
+        """Collision rules for bullet i, applied to the world as the bullets before it left it."""
+        game = self.game
+        bullet = self.bullets[i]
+
+        if outside:
+            if game.play_sounds and bullet.owner == GameSide.Player:
+                game.audio.play("steel")
+            bullet.explode()
+            self.state[i] = bullet.state
+            return
+
+        has_collided = False
+        for tile in game.level.get_obstacles(bullet.rect):
+            if game.level.hit_tile(tile.topleft, bullet.power, bullet.owner == GameSide.Player):
+                has_collided = True
+        if has_collided:
+            bullet.explode()
+            self.state[i] = bullet.state
+            return
+
+        # bullets after this one have not moved yet, removed bullets before it are already gone
+        n = len(self.bullets)
+        order = np.arange(n)
+        target_x = np.where(order < i, self.x[:n], old_x)
+        target_y = np.where(order < i, self.y[:n], old_y)
+        left, top, right, bottom = bullet.rect.left, bullet.rect.top, bullet.rect.right, bullet.rect.bottom
+        hits = ((left < target_x + self.width[:n]) & (target_x < right) &
+                (top < target_y + self.height[:n]) & (target_y < bottom) &
+                (self.owner[:n] != self.owner[i]) & ~(removed & (order < i)))
+        hits[i] = False
+        if hits.any():
+            bullet.destroy()
+            bullet.explode()
+            self.state[i] = bullet.state
+            return
+
+        # the hash narrows down the tanks, they are still tried in list order as the hit goes to the first one
+        tanks = set(game.tank_hash.query(bullet.rect))
+
+        for player in game.players if tanks else ():
+            if player in tanks and player.state == TankState.Alive:
+                if player.calculate_bullet_impact(bullet.owner == GameSide.Player, bullet.damage, bullet.owner_class):
+                    bullet.destroy()
+                    self.state[i] = bullet.state
+                    return
+
+        for enemy in game.enemies if tanks else ():
+            if enemy in tanks and enemy.state == TankState.Alive:
+                if enemy.calculate_bullet_impact(bullet.owner == GameSide.Enemy, bullet.damage, bullet.owner_class):
+                    bullet.destroy()
+                    self.state[i] = bullet.state
+                    return
+
+        if game.castle.active and bullet.rect.colliderect(game.castle.rect):
+            game.castle.destroy()
+            bullet.destroy()
+            self.state[i] = bullet.state
@@ -2,7 +2,7 @@ import pygame
 
 from src.explosion import Explosion
 
-from src.constants import CastleState
+from src.constants import CastleState, Sprite
 
 
 class Castle:
@@ -12,27 +12,26 @@ class Castle:
         self.active = None
         self.image = None
         self.state = None
-        self.img_undamaged = self.game.sprites.subsurface(0, 15 * 2, 16 * 2, 16 * 2)
-        self.img_destroyed = self.game.sprites.subsurface(16 * 2, 15 * 2, 16 * 2, 16 * 2)
         self.rect = pygame.Rect(12 * 16, 24 * 16, 32, 32)
         self.rebuild()
 
     def draw(self):
-        self.game.screen.blit(self.image, self.rect.topleft)
+        rect = self.game.screen.blit(self.image, self.rect.topleft)
         if self.state == CastleState.Exploding:
             if not self.explosion.active:
                 self.state = CastleState.Destroyed
                 del self.explosion
             else:
-                self.explosion.draw()
+                rect = rect.union(self.explosion.draw())
+        return rect
 
     def rebuild(self):
         self.state = CastleState.Standing
-        self.image = self.img_undamaged
+        self.image = self.game.sprite_registry.get(Sprite.Castle, variant=0)
         self.active = True
 
     def destroy(self):
         self.state = CastleState.Exploding
         self.explosion = Explosion(self.game, self.rect.topleft)
-        self.image = self.img_destroyed
+        self.image = self.game.sprite_registry.get(Sprite.Castle, variant=1)
         self.active = False
@@ -0,0 +1,203 @@
+"""
+Render-only multiplayer client.
+
+Joins a server, see src/server.py, sends the keyboard as inputs and draws
+the snapshots the server sends back: it runs no simulation of its own. The
+arrow keys move and space fires whichever player the server hands out, so
+both players of a match use the same keys on their own machines.
+
+Run from src with: PYTHONPATH=.. python -m src.client [--host HOST] [--port N] [--spectate]
+"""
+import asyncio
+
+import pygame
+
+from src.atlas import load_sprite_registry
+from src.constants import TICK_MS, Direction, Sprite
+from src.level import Level
+from src.protocol import (GAME_OVER, INPUT, JOIN, LABEL_SPRITE, PLAYER, PORT, SNAPSHOT, SPECTATOR, SPECTATOR_SLOT,
+                          WELCOME, WELCOME_BODY, WorldState, decode_snapshot, get_sprite_keys, pack_message,
+                          read_message)
+from src.replay import encode_input
+from src.text_cache import TextCache
+from src.timer import Timer
+
+SCREEN_SIZE = 480, 416
+
+KEYS = {pygame.K_UP: Direction.Up, pygame.K_RIGHT: Direction.Right, pygame.K_DOWN: Direction.Down,
+        pygame.K_LEFT: Direction.Left}
+
+
+class Client:
+    """
+    A connection to a server and the WorldState it keeps up to date. With
+    render set it opens a window, reads the keyboard and draws every tick;
+    without it only the state is kept, for bots and tests.
+    """
+    def __init__(self, role=PLAYER, render=True):
+        self.role = role
+        self.state = WorldState()
+        self.match = None
+        self.slot = None
+        self.players_number = 0
+        self.tick = 0
+        self.tick_rate = None
+        self.bytes_received = 0
+        self.snapshots = 0
+
+        self.writer = None
+        # last input byte sent, inputs are only sent when they change
+        self.input = None
+        self.closed = False
+
+        self.screen = None
+        self.level = None
+        if render:
+            pygame.display.init()
+            pygame.font.init()
+            pygame.display.set_caption("Battle City")
+            self.screen = pygame.display.set_mode(SCREEN_SIZE)
+            self.sprite_registry = load_sprite_registry()
+            self.sprites = [self.sprite_registry.images[key] for key in get_sprite_keys(self.sprite_registry)]
+            # animates the water of the level
+            self.gtimer = Timer()
+            self.label_text = TextCache(pygame.font.SysFont("Arial", 13))
+            self.text = TextCache(pygame.font.Font("../fonts/font.ttf", 16))
+            self.sidebar = pygame.Surface((64, 416))
+            self.pressed = [False] * len(Direction)
+
+    async def run(self, host="127.0.0.1", port=PORT):
+        """Play until the server ends the match or the window is closed."""
+        reader, self.writer = await asyncio.open_connection(host, port)
+        try:
+            self.writer.write(pack_message(JOIN, bytes([self.role])))
+            kind, payload = await read_message(reader)
+            if kind != WELCOME:
+                raise ConnectionError(f"Expected a welcome from the server, got message {kind}")
+            self.match, self.slot, self.players_number, self.tick_rate, sprites = WELCOME_BODY.unpack(payload)
+            if self.screen is not None and sprites != len(self.sprites):
+                raise ConnectionError(f"The server draws with {sprites} sprites, this client has {len(self.sprites)}")
+
+            receiver = asyncio.create_task(self._receive(reader))
+            drawn = None
+            while not receiver.done() and not self.closed:
+                self.update()
+                if self.level is not None and self.tick != drawn:
+                    drawn = self.tick
+                    self.draw()
+                await asyncio.sleep(1 / self.tick_rate)
+            receiver.cancel()
+        finally:
+            self.writer.close()
+
+    async def _receive(self, reader):
+        try:
+            while True:
+                kind, payload = await read_message(reader)
+                if kind == SNAPSHOT:
+                    self.bytes_received += len(payload) + 3
+                    self.apply(decode_snapshot(payload))
+        except asyncio.IncompleteReadError:
+            # the server ended the match
+            pass
+
+    def apply(self, snapshot):
+        self.state.apply(snapshot)
+        ticks = snapshot.tick - self.tick
+        self.tick = snapshot.tick
+        self.snapshots += 1
+        if self.screen is None:
+            return
+
+        if self.level is not None:
+            self.gtimer.update(ticks * TICK_MS)
+
+        stage = self.state.hud[0]
+        if snapshot.tile_map is not None or self.level is None:
+            self.gtimer.clear()
+            self.level = Level(self, stage)
+            self.level.map = self.state.tiles
+            self.level.backgrounds = None
+        else:
+            for cell, tile in snapshot.tile_changes:
+                self.level.set_tile(cell, tile)
+
+    def send_input(self, direction, fire):
+        value = encode_input(direction, fire)
+        if value != self.input and self.slot != SPECTATOR_SLOT:
+            self.input = value
+            self.writer.write(pack_message(INPUT, bytes([value])))
+
+    def update(self):
+        """Read the keyboard and send the input it makes."""
+        if self.screen is None:
+            return
+        fire = False
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.closed = True
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_q:
+                    self.closed = True
+                elif event.key == pygame.K_SPACE:
+                    fire = True
+                elif event.key in KEYS:
+                    self.pressed[KEYS[event.key]] = True
+            elif event.type == pygame.KEYUP and event.key in KEYS:
+                self.pressed[KEYS[event.key]] = False
+
+        # the first held key wins, in the order Game reads them
+        direction = next((direction for direction in Direction if self.pressed[direction]), None)
+        self.send_input(direction, fire)
+
+    def draw(self):
+        self.level.draw_ground()
+        for object_id in sorted(self.state.objects):
+            for sprite, x, y in self.state.objects[object_id]:
+                if sprite >= LABEL_SPRITE:
+                    image = self.label_text.render(str(sprite - LABEL_SPRITE), False, (200, 200, 200))
+                else:
+                    image = self.sprites[sprite]
+                self.screen.blit(image, [x, y])
+        self.level.draw_grass()
+
+        stage, enemies_left, flags, *lives_and_scores = self.state.hud
+        if flags & GAME_OVER:
+            self.screen.blit(self.text.render("GAME", False, (127, 64, 64)), [176, 188])
+            self.screen.blit(self.text.render("OVER", False, (127, 64, 64)), [176, 208])
+        self._draw_sidebar(stage, enemies_left, lives_and_scores[:2])
+        pygame.display.flip()
+
+    def _draw_sidebar(self, stage, enemies_left, lives):
+        """The sidebar of Game, drawn from the HUD."""
+        registry = self.sprite_registry
+        sidebar = self.sidebar
+        sidebar.fill([100, 100, 100])
+
+        enemy_life = registry.get(Sprite.EnemyLife)
+        for n in range(enemies_left):
+            sidebar.blit(enemy_life, [16 + n % 2 * 17, 16 + n // 2 * 17])
+
+        text_color = pygame.Color('black')
+        for n in range(self.players_number):
+            y = 200 + n * 40
+            sidebar.blit(self.text.render(f"{n + 1}P", False, text_color), [16, y])
+            sidebar.blit(self.text.render(str(lives[n]), False, text_color), [31, y + 15])
+            sidebar.blit(registry.get(Sprite.PlayerLife), [17, y + 15])
+
+        sidebar.blit(registry.get(Sprite.Flag), [17, 280])
+        sidebar.blit(self.text.render(str(stage), False, text_color), [17, 312])
+        self.screen.blit(sidebar, [416, 0])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Play Battle city on a server, see src/server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--spectate", action="store_true", help="watch the newest match instead of playing")
+    args = parser.parse_args()
+
+    client = Client(SPECTATOR if args.spectate else PLAYER)
+    asyncio.run(client.run(args.host, args.port))
@@ -2,6 +2,13 @@ from enum import IntEnum
 
 TILE_SIZE = 16
 
+# the map is MAP_SIZE x MAP_SIZE tiles
+MAP_SIZE = 26
+
+# simulation ticks per second and the length of one tick in milliseconds
+TICK_RATE = 50
+TICK_MS = 1000 // TICK_RATE
+
 ENEMIES_BY_LEVEL = (
     (18, 2, 0, 0), (14, 4, 0, 2), (14, 4, 0, 2), (2, 5, 10, 3), (8, 5, 5, 2),
     (9, 2, 7, 2), (7, 4, 6, 3), (7, 4, 7, 2), (6, 4, 7, 3), (12, 2, 4, 2),
@@ -20,6 +27,17 @@ CASTLE_TILES = [(11 * TILE_SIZE, 23 * TILE_SIZE),
                 (12 * TILE_SIZE, 23 * TILE_SIZE),
                 (13 * TILE_SIZE, 23 * TILE_SIZE)]
 
+# a 26px tank sits centered in a 2x2-tile slot
+TANK_SIZE = 26
+TANK_OFFSET = (TILE_SIZE * 2 - TANK_SIZE) // 2
+
+# top-left corners of the enemy spawn slots and of the players' start positions
+SPAWN_POSITIONS = ((TANK_OFFSET, TANK_OFFSET),
+                   (12 * TILE_SIZE + TANK_OFFSET, TANK_OFFSET),
+                   (24 * TILE_SIZE + TANK_OFFSET, TANK_OFFSET))
+PLAYER_POSITIONS = ((8 * TILE_SIZE + TANK_OFFSET, 24 * TILE_SIZE + TANK_OFFSET),
+                    (16 * TILE_SIZE + TANK_OFFSET, 24 * TILE_SIZE + TANK_OFFSET))
+
 
 class Direction(IntEnum):
     Up = 0
@@ -37,6 +55,9 @@ class Tile(IntEnum):
     Frozen = 5
 
 
+OBSTACLE_TILES = (Tile.Brick, Tile.Steel, Tile.Water)
+
+
 class CastleState(IntEnum):
     Standing = 0
     Destroyed = 1
@@ -95,3 +116,30 @@ class EnemyType(IntEnum):
     Fast = 1
     Powerful = 2
     Armored = 3
+
+
+class EnemyBehaviour(IntEnum):
+    # random paths, the original behaviour
+    Wander = 0
+    # follow the flow field toward the castle
+    Castle = 1
+    # follow the flow field toward the castle and the players
+    Hunt = 2
+
+
+class Sprite(IntEnum):
+    Player = 0
+    Enemy = 1
+    Shield = 2
+    Spawn = 3
+    Bullet = 4
+    Explosion = 5
+    Bonus = 6
+    Castle = 7
+    Tile = 8
+    EnemyLife = 9
+    PlayerLife = 10
+    Flag = 11
+    Arrow = 12
+    Water = 13
+    LetterBrick = 14
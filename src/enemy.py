@@ -1,9 +1,9 @@
-import random
-
 import pygame
 
 from src.bonus import Bonus
-from src.constants import TILE_SIZE, Direction, TankState, EnemyType
+from src.constants import SPAWN_POSITIONS, TILE_SIZE, Direction, TankState, EnemyType, Sprite
+from src.flow_field import NODES, FlowField
+from src.path import Path
 from src.tank import Tank
 
 
@@ -15,7 +15,7 @@ class Enemy(Tank):
         if len(level.enemies_left) > 0:
             self.type = level.enemies_left.pop()
         else:
-            self.state = TankState.Dead
+            self._cancel_spawn()
             return
 
         if self.type == EnemyType.Basic:
@@ -27,72 +27,49 @@ class Enemy(Tank):
         elif self.type == EnemyType.Armored:
             self.health = 400
 
-        if random.randint(1, 5) == 1:
+        if self.game.random.randint(1, 5) == 1:
             self.bonus = True
             for enemy in self.game.enemies:
                 if enemy.bonus:
                     self.bonus = False
                     break
 
-        images = [
-            self.game.sprites.subsurface(32 * 2, 0, 13 * 2, 15 * 2),
-            self.game.sprites.subsurface(48 * 2, 0, 13 * 2, 15 * 2),
-            self.game.sprites.subsurface(64 * 2, 0, 13 * 2, 15 * 2),
-            self.game.sprites.subsurface(80 * 2, 0, 13 * 2, 15 * 2),
-            self.game.sprites.subsurface(32 * 2, 16 * 2, 13 * 2, 15 * 2),
-            self.game.sprites.subsurface(48 * 2, 16 * 2, 13 * 2, 15 * 2),
-            self.game.sprites.subsurface(64 * 2, 16 * 2, 13 * 2, 15 * 2),
-            self.game.sprites.subsurface(80 * 2, 16 * 2, 13 * 2, 15 * 2)
-        ]
-
-        self.image = images[self.type + 0]
-
-        self.image_up = self.image
-        self.image_left = pygame.transform.rotate(self.image, 90)
-        self.image_down = pygame.transform.rotate(self.image, 180)
-        self.image_right = pygame.transform.rotate(self.image, 270)
-
-        if self.bonus:
-            self.image1_up = self.image_up
-            self.image1_left = self.image_left
-            self.image1_down = self.image_down
-            self.image1_right = self.image_right
-
-            self.image2 = images[self.type + 4]
-            self.image2_up = self.image2
-            self.image2_left = pygame.transform.rotate(self.image2, 90)
-            self.image2_down = pygame.transform.rotate(self.image2, 180)
-            self.image2_right = pygame.transform.rotate(self.image2, 270)
+        self.set_images(Sprite.Enemy, self.type)
+        self.image = self.image_up
 
         self.rotate(self.direction, False)
 
         if position is None:
-            self.rect.topleft = self.get_free_spawning_position()
-            if not self.rect.topleft:
-                self.state = TankState.Dead
+            position = self.get_free_spawning_position()
+            if not position:
+                # every slot is taken, the type waits for the next spawn
+                level.enemies_left.append(self.type)
+                self._cancel_spawn()
                 return
+        self.rect.topleft = position
 
-        self.path = self.generate_path(self.direction)
+        if self.game.flow_field is not None:
+            self.path = self.generate_flow_path()
+        else:
+            self.path = self.generate_path(self.direction)
         self.timer_uuid_fire = self.game.gtimer.add(1000, lambda: self.fire())
 
         if self.bonus:
             self.timer_uuid_flash = self.game.gtimer.add(200, lambda: self.toggle_flash())
 
+    def _cancel_spawn(self):
+        """Leave the enemy Dead before it ever spawned, the caller must not add it to the game."""
+        self.state = TankState.Dead
+        self.game.gtimer.destroy(self.timer_uuid_spawn)
+        self.game.gtimer.destroy(self.timer_uuid_spawn_end)
+
     def toggle_flash(self):
         if self.state not in (TankState.Alive, TankState.Spawning):
             self.game.gtimer.destroy(self.timer_uuid_flash)
             return
         self.flash = not self.flash
-        if self.flash:
-            self.image_up = self.image2_up
-            self.image_right = self.image2_right
-            self.image_down = self.image2_down
-            self.image_left = self.image2_left
-        else:
-            self.image_up = self.image1_up
-            self.image_right = self.image1_right
-            self.image_down = self.image1_down
-            self.image_left = self.image1_left
+        # the flashing frames of the enemy sprites follow the regular ones
+        self.set_images(Sprite.Enemy, self.type + len(EnemyType) if self.flash else self.type)
         self.rotate(self.direction, False)
 
     def spawn_bonus(self):
@@ -100,39 +77,18 @@ class Enemy(Tank):
             return
         bonus = Bonus(self.game, self.level)
         self.game.bonuses.append(bonus)
+        self.game.bonus_hash.add(bonus)
         self.game.gtimer.add(500, lambda: bonus.toggle_visibility())
-        self.game.gtimer.add(10000, lambda: self.game.bonuses.remove(bonus), 1)
+        self.game.gtimer.add(10000, lambda: self.game.remove_bonus(bonus), 1)
 
     def get_free_spawning_position(self):
-        available_positions = [
-            [(TILE_SIZE * 2 - self.rect.width) / 2, (TILE_SIZE * 2 - self.rect.height) / 2],
-            [12 * TILE_SIZE + (TILE_SIZE * 2 - self.rect.width) / 2, (TILE_SIZE * 2 - self.rect.height) / 2],
-            [24 * TILE_SIZE + (TILE_SIZE * 2 - self.rect.width) / 2, (TILE_SIZE * 2 - self.rect.height) / 2]
-        ]
+        available_positions = [list(position) for position in SPAWN_POSITIONS]
 
-        random.shuffle(available_positions)
+        self.game.random.shuffle(available_positions)
 
         for pos in available_positions:
-            enemy_rect = pygame.Rect(pos, [26, 26])
-            collision = False
-            for enemy in self.game.enemies:
-                if enemy_rect.colliderect(enemy.rect):
-                    collision = True
-                    continue
-
-            if collision:
-                continue
-
-            collision = False
-            for player in self.game.players:
-                if enemy_rect.colliderect(player.rect):
-                    collision = True
-                    continue
-
-            if collision:
-                continue
-
-            return pos
+            if not self.game.tank_hash.query(pygame.Rect(pos, [26, 26])):
+                return pos
         return False
 
     def move(self):
@@ -140,57 +96,80 @@ class Enemy(Tank):
             return
 
         if not self.path:
-            self.path = self.generate_path(None, True)
+            self.path = self.get_next_path(None)
 
-        new_position = self.path.pop(0)
+        new_position = self.path.pop()
 
         # move enemy
         if self.direction == Direction.Up:
             if new_position[1] < 0:
-                self.path = self.generate_path(self.direction, True)
+                self.path = self.get_next_path(self.direction)
                 return
         elif self.direction == Direction.Right:
             if new_position[0] > (416 - 26):
-                self.path = self.generate_path(self.direction, True)
+                self.path = self.get_next_path(self.direction)
                 return
         elif self.direction == Direction.Down:
             if new_position[1] > (416 - 26):
-                self.path = self.generate_path(self.direction, True)
+                self.path = self.get_next_path(self.direction)
                 return
         elif self.direction == Direction.Left:
             if new_position[0] < 0:
-                self.path = self.generate_path(self.direction, True)
+                self.path = self.get_next_path(self.direction)
                 return
 
         new_rect = pygame.Rect(new_position, [26, 26])
 
-        if new_rect.collidelist(self.level.obstacle_rects) != -1:
-            self.path = self.generate_path(self.direction, True)
+        if self.level.collides(new_rect):
+            self.path = self.get_next_path(self.direction)
             return
 
-        for enemy in self.game.enemies:
-            if enemy != self and new_rect.colliderect(enemy.rect):
-                self.turn_around()
-                self.path = self.generate_path(self.direction)
-                return
-
-        for player in self.game.players:
-            if new_rect.colliderect(player.rect):
+        for tank in self.game.tank_hash.query(new_rect):
+            if tank != self:
                 self.turn_around()
                 self.path = self.generate_path(self.direction)
                 return
 
-        for bonus in self.game.bonuses:
-            if new_rect.colliderect(bonus.rect):
-                self.game.bonuses.remove(bonus)
+        for bonus in self.game.bonus_hash.query(new_rect):
+            self.game.remove_bonus(bonus)
 
         self.rect.topleft = new_rect.topleft
+        self.game.tank_hash.update(self)
 
     def update(self, time_passed):
         Tank.update(self, time_passed)
         if self.state == TankState.Alive and not self.paused:
             self.move()
 
+    def get_next_path(self, direction=None):
+        """The path to take once the current one ended or got blocked."""
+        if self.game.flow_field is not None:
+            path = self.generate_flow_path()
+            if path is not None:
+                return path
+        return self.generate_path(direction, True)
+
+    def generate_flow_path(self):
+        """
+        One tile toward the flow field's target, or None when no target can
+        be reached from here.
+        """
+        direction = self.game.flow_field.get_direction(self.rect, self.direction)
+        if direction is None:
+            return None
+
+        # turning snaps the tank to the tile grid
+        self.rotate(direction, direction != self.direction)
+
+        node = FlowField.get_node(self.rect)
+        if direction in (Direction.Right, Direction.Left):
+            x = node % NODES * TILE_SIZE + 3 + (TILE_SIZE if direction == Direction.Right else -TILE_SIZE)
+            length = abs(x - self.rect.left)
+        else:
+            y = node // NODES * TILE_SIZE + 3 + (TILE_SIZE if direction == Direction.Down else -TILE_SIZE)
+            length = abs(y - self.rect.top)
+        return Path(self.rect.topleft, direction, length, self.speed, False)
+
     def generate_path(self, direction=None, fix_direction=False):
         all_directions = [Direction.Up, Direction.Right, Direction.Down, Direction.Left]
 
@@ -200,7 +179,7 @@ class Enemy(Tank):
             else:
                 opposite_direction = self.direction - 2
             directions = all_directions
-            random.shuffle(directions)
+            self.game.random.shuffle(directions)
             directions.remove(opposite_direction)
             directions.append(opposite_direction)
         else:
@@ -214,7 +193,7 @@ class Enemy(Tank):
             else:
                 opposite_direction = direction - 2
             directions = all_directions
-            random.shuffle(directions)
+            self.game.random.shuffle(directions)
             directions.remove(opposite_direction)
             directions.remove(direction)
             directions.insert(0, direction)
@@ -228,22 +207,22 @@ class Enemy(Tank):
         for direction in directions:
             if direction == Direction.Up and y > 1:
                 new_pos_rect = self.rect.move(0, -8)
-                if new_pos_rect.collidelist(self.level.obstacle_rects) == -1:
+                if not self.level.collides(new_pos_rect):
                     new_direction = direction
                     break
             elif direction == Direction.Right and x < 24:
                 new_pos_rect = self.rect.move(8, 0)
-                if new_pos_rect.collidelist(self.level.obstacle_rects) == -1:
+                if not self.level.collides(new_pos_rect):
                     new_direction = direction
                     break
             elif direction == Direction.Down and y < 24:
                 new_pos_rect = self.rect.move(0, 8)
-                if new_pos_rect.collidelist(self.level.obstacle_rects) == -1:
+                if not self.level.collides(new_pos_rect):
                     new_direction = direction
                     break
             elif direction == Direction.Left and x > 1:
                 new_pos_rect = self.rect.move(-8, 0)
-                if new_pos_rect.collidelist(self.level.obstacle_rects) == -1:
+                if not self.level.collides(new_pos_rect):
                     new_direction = direction
                     break
 
@@ -255,29 +234,12 @@ class Enemy(Tank):
 
         self.rotate(new_direction, fix_direction)
 
-        positions = []
-        x = self.rect.left
-        y = self.rect.top
-
         if new_direction in (Direction.Right, Direction.Left):
-            axis_fix = self.get_nearest(y, 16) - y
+            axis_fix = self.get_nearest(self.rect.top, 16) - self.rect.top
         else:
-            axis_fix = self.get_nearest(x, 16) - x
+            axis_fix = self.get_nearest(self.rect.left, 16) - self.rect.left
         axis_fix = 0
 
-        pixels = self.get_nearest(random.randint(1, 12) * 32, 32) + axis_fix + 3
-
-        if new_direction == Direction.Up:
-            for px in range(0, pixels, self.speed):
-                positions.append([x, y - px])
-        elif new_direction == Direction.Right:
-            for px in range(0, pixels, self.speed):
-                positions.append([x + px, y])
-        elif new_direction == Direction.Down:
-            for px in range(0, pixels, self.speed):
-                positions.append([x, y + px])
-        elif new_direction == Direction.Left:
-            for px in range(0, pixels, self.speed):
-                positions.append([x - px, y])
-
-        return positions
+        pixels = self.get_nearest(self.game.random.randint(1, 12) * 32, 32) + axis_fix + 3
+
+        return Path(self.rect.topleft, new_direction, pixels, self.speed)
@@ -0,0 +1,194 @@
+"""
+Environment API for training agents.
+
+BattleCityEnv wraps a headless Simulation the way Gym environments do:
+reset starts a stage and step advances it one tick with one action per
+player. No window is opened and no sound is played, the SDL dummy drivers
+are used unless others are set.
+
+An action is an index into ACTIONS: standing still or one of the four
+directions, each with or without firing. Observations are the symbolic
+tensors of src/observation.py, written in place: keep a copy to hold on to
+one past the next step. With pixels=True a headless Game draws every step
+instead and the observation is its playfield, see src/pixels.py.
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+
+from src.batch import BatchedSimulation
+from src.constants import MAP_SIZE, Direction, EnemyBehaviour
+from src.game import Game
+from src.observation import ObservationEncoder
+from src.pixels import PixelObserver
+from src.simulation import Simulation
+
+ACTIONS = tuple((direction, fire) for fire in (False, True) for direction in (None,) + tuple(Direction))
+
+# score points worth a reward of 1
+REWARD_SCALE = 100
+
+
+class BattleCityEnv:
+    def __init__(self, enemy_behaviour=EnemyBehaviour.Wander, observation_size=MAP_SIZE, pixels=False,
+                 grayscale=False, downsample=1):
+        self.encoder = None
+        self.observer = None
+        if pixels:
+            # only the game knows how to draw, it redraws just what changed since the last step
+            self.sim = Game(dirty_rendering=True, enemy_behaviour=enemy_behaviour, headless=True)
+            self.observer = PixelObserver(self.sim, grayscale, downsample)
+        else:
+            self.sim = Simulation(enemy_behaviour=enemy_behaviour)
+            self.encoder = ObservationEncoder(observation_size)
+        self.scores = []
+        self.trophies = []
+        self.steps = 0
+
+    def reset(self, seed=None, stage=1, players=1):
+        """Start a new game on stage and return its first observation and info."""
+        sim = self.sim
+        sim.new_game(players, stage, seed)
+        if self.observer is not None:
+            sim.drawn_rects = None
+
+        self.scores = [player.score for player in sim.players]
+        self.trophies = [dict(player.trophies) for player in sim.players]
+        self.steps = 0
+        return self.get_observation(), self._get_info([0] * players, [{} for _ in range(players)])
+
+    def step(self, actions):
+        """
+        Advance one tick with an action index per player. Returns the
+        observation, the reward, done and info. The reward is the score
+        gained by all players in the tick over REWARD_SCALE, info holds each
+        player's own reward and the trophies gained. The episode is done
+        once the castle falls, the players run out of lives or the stage is
+        cleared.
+        """
+        sim = self.sim
+        sim.step([ACTIONS[action] for action in actions])
+        self.steps += 1
+
+        rewards = []
+        gained = []
+        for n, player in enumerate(sim.players):
+            rewards.append((player.score - self.scores[n]) / REWARD_SCALE)
+            gained.append({name: count - self.trophies[n][name] for name, count in player.trophies.items()
+                           if count != self.trophies[n][name]})
+            if gained[-1]:
+                self.trophies[n] = dict(player.trophies)
+            self.scores[n] = player.score
+
+        done = sim.game_over or not sim.active
+        return self.get_observation(), sum(rewards), done, self._get_info(rewards, gained)
+
+    def get_observation(self):
+        if self.observer is not None:
+            self.sim.draw()
+            return self.observer.observe()
+        return self.encoder.encode(self.sim)
+
+    def _get_info(self, rewards, trophies):
+        sim = self.sim
+        return {
+            "stage": sim.stage,
+            "steps": self.steps,
+            "rewards": rewards,
+            "trophies": trophies,
+            "scores": list(self.scores),
+            "lives": [player.lives for player in sim.players],
+            "enemies_left": len(sim.level.enemies_left) + len(sim.enemies),
+            "castle": sim.castle.active,
+            "cleared": not sim.active and not sim.game_over
+        }
+
+
+class BatchedBattleCityEnv:
+    """
+    count games stepped in lockstep on a BatchedSimulation. step takes a
+    (count, players) array of action indices and returns the observations of
+    every game stacked, one reward and one done flag per game and info. A finished
+    game starts over right away, its random generator carrying on.
+    """
+    def __init__(self, count, players=1, enemy_behaviour=EnemyBehaviour.Wander, observation_size=MAP_SIZE):
+        self.batch = BatchedSimulation(count, players, enemy_behaviour=enemy_behaviour)
+        self.encoder = ObservationEncoder(observation_size)
+        self.observations = np.zeros((count,) + self.encoder.shape, dtype=np.uint8)
+        self.players = players
+        self.stage = 1
+        self.scores = np.zeros((count, players), dtype=np.int64)
+        self.rewards = np.zeros(count, dtype=np.float32)
+        self.dones = np.zeros(count, dtype=bool)
+        self.episodes = 0
+
+    def reset(self, seed=None, stage=1):
+        """Start every game on stage, game n seeded with seed + n, and return the observation."""
+        self.stage = stage
+        for n in range(len(self.batch)):
+            self.batch.reset(n, None if seed is None else seed + n, stage, self.players)
+            self.scores[n] = 0
+        self.episodes = 0
+        return self.get_observation()
+
+    def step(self, actions):
+        self.batch.step([[ACTIONS[action] for action in row] for row in np.asarray(actions).tolist()])
+
+        for n, game in enumerate(self.batch.games):
+            scores = [player.score for player in game.players]
+            self.rewards[n] = (sum(scores) - self.scores[n].sum()) / REWARD_SCALE
+            self.scores[n] = scores
+            self.dones[n] = game.game_over or not game.active
+            if self.dones[n]:
+                self.episodes += 1
+                self.batch.reset(n, None, self.stage, self.players)
+                self.scores[n] = 0
+        return self.get_observation(), self.rewards, self.dones, {"episodes": self.episodes}
+
+    def get_observation(self):
+        for game, observation in zip(self.batch.games, self.observations):
+            self.encoder.encode(game, observation)
+        return self.observations
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    import time
+
+    parser = argparse.ArgumentParser(description="Step Battle city with random actions and report the throughput")
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--players", type=int, default=1, choices=[1, 2])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch", type=int, help="step this many games in lockstep on a BatchedBattleCityEnv")
+    parser.add_argument("--pixels", action="store_true", help="observe the drawn playfield instead of the symbols")
+    parser.add_argument("--grayscale", action="store_true", help="with --pixels, observe the luma only")
+    parser.add_argument("--downsample", type=int, default=1, help="with --pixels, average blocks of N x N pixels")
+    args = parser.parse_args()
+
+    if args.batch:
+        batched = BatchedBattleCityEnv(args.batch, args.players)
+        batched.reset(args.seed)
+        actions_rng = np.random.default_rng(args.seed)
+        steps = args.steps // args.batch * args.batch
+        start = time.perf_counter()
+        for _ in range(args.steps // args.batch):
+            batched.step(actions_rng.integers(len(ACTIONS), size=(args.batch, args.players)))
+        episodes = batched.episodes
+    else:
+        env = BattleCityEnv(pixels=args.pixels, grayscale=args.grayscale, downsample=args.downsample)
+        env.reset(args.seed, players=args.players)
+        rng = random.Random(args.seed)
+        steps = args.steps
+        episodes = 0
+        start = time.perf_counter()
+        for _ in range(steps):
+            observation, reward, done, info = env.step([rng.randrange(len(ACTIONS)) for _ in range(args.players)])
+            if done:
+                episodes += 1
+                env.reset(args.seed + episodes, players=args.players)
+    elapsed = time.perf_counter() - start
+    print(f"{steps} steps, {episodes} episodes in {elapsed:.2f}s ({steps / elapsed:.0f} steps/s)")
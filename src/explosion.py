@@ -1,29 +1,36 @@
+from src.constants import Sprite
+
+
 class Explosion:
     def __init__(self, game, position, interval=None, images=None):
         self.game = game
-        self.position = [position[0] - 16, position[1] - 16]
+        self.position = [0, 0]
+        self.reset(game, position, interval, images)
+
+    def reset(self, game, position, interval=None, images=None):
+        """Reuse a finished explosion, see Pool."""
+        self.position[0] = position[0] - 16
+        self.position[1] = position[1] - 16
         self.active = True
 
         if interval is None:
             interval = 100
 
         if images is None:
-            images = [
-                self.game.sprites.subsurface(0, 80 * 2, 32 * 2, 32 * 2),
-                self.game.sprites.subsurface(32 * 2, 80 * 2, 32 * 2, 32 * 2),
-                self.game.sprites.subsurface(64 * 2, 80 * 2, 32 * 2, 32 * 2)
-            ]
+            images = self.game.sprite_registry.get_frames(Sprite.Explosion)
 
-        images.reverse()
-        self.images = [] + images
-        self.image = self.images.pop()
-        self.game.gtimer.add(interval, lambda: self.update(), len(self.images) + 1)
+        # images are shared, step through them instead of copying
+        self.images = images
+        self.frame = 0
+        self.image = self.images[0]
+        self.game.gtimer.add(interval, self.update, len(self.images))
 
     def draw(self):
-        self.game.screen.blit(self.image, self.position)
+        return self.game.screen.blit(self.image, self.position)
 
     def update(self):
-        if len(self.images) > 0:
-            self.image = self.images.pop()
+        if self.frame + 1 < len(self.images):
+            self.frame += 1
+            self.image = self.images[self.frame]
         else:
             self.active = False
@@ -0,0 +1,187 @@
+import heapq
+
+from src.constants import MAP_SIZE, TILE_SIZE, Direction, TankState, Tile
+
+# a tank covers 2x2 tiles, so it can stand on MAP_SIZE - 1 positions per axis
+NODES = MAP_SIZE - 1
+INFINITY = float("inf")
+
+# extra cost of a brick tile on the way, roughly the time it takes to shoot it away
+BRICK_COST = 3
+
+DIRECTION_STEPS = ((Direction.Up, 0, -1), (Direction.Right, 1, 0), (Direction.Down, 0, 1), (Direction.Left, -1, 0))
+
+
+def _get_neighbors():
+    neighbors = []
+    for node in range(NODES * NODES):
+        x, y = node % NODES, node // NODES
+        neighbors.append([(direction, (y + dy) * NODES + x + dx) for direction, dx, dy in DIRECTION_STEPS
+                          if 0 <= x + dx < NODES and 0 <= y + dy < NODES])
+    return neighbors
+
+
+NEIGHBORS = _get_neighbors()
+
+
+def get_node_cost(tiles, node):
+    """Cost of moving a tank onto node: steel and water block it, bricks take time to shoot away."""
+    x, y = node % NODES, node // NODES
+    cost = 1
+    for cell in (y * MAP_SIZE + x, y * MAP_SIZE + x + 1, (y + 1) * MAP_SIZE + x, (y + 1) * MAP_SIZE + x + 1):
+        tile = tiles[cell]
+        if tile == Tile.Steel or tile == Tile.Water:
+            return INFINITY
+        if tile == Tile.Brick:
+            cost += BRICK_COST
+    return cost
+
+
+class FlowField:
+    """
+    Distance from every tank position to the castle, shared by all enemies.
+
+    Nodes are the tile-aligned positions of a 2x2-tile tank. Steel and water
+    block a node, bricks only make it more expensive. The field follows the
+    level: when tiles are removed the distances are lowered incrementally
+    from the changed nodes, anything else rebuilds the whole field.
+
+    With include_players the players' positions are targets too. The castle
+    keeps a field of its own, castle_distance, and distance starts from a
+    copy of it lowered outward from the players' nodes, so a player moving
+    only walks the part of the map closer to them than to the castle instead
+    of rebuilding everything.
+    """
+    def __init__(self, game, include_players=False):
+        self.game = game
+        self.include_players = include_players
+
+        self.level = None
+        self.map = None
+        self.castle_targets = None
+        self.player_targets = set()
+        self.targets = None
+        self.cost = [INFINITY] * (NODES * NODES)
+        self.castle_distance = [INFINITY] * (NODES * NODES)
+        # the castle's field itself when the players are not targets
+        self.distance = self.castle_distance
+
+    @staticmethod
+    def get_node(rect):
+        """The node a tank rect is closest to."""
+        x = min(max(int(round((rect.left - 3) / TILE_SIZE)), 0), NODES - 1)
+        y = min(max(int(round((rect.top - 3) / TILE_SIZE)), 0), NODES - 1)
+        return y * NODES + x
+
+    def _get_player_targets(self):
+        if not self.include_players:
+            return set()
+        return {self.get_node(player.rect) for player in self.game.players if player.state == TankState.Alive}
+
+    def _get_step_cost(self, node):
+        # targets such as the castle may not be passable themselves, stepping onto them still costs one move
+        cost = self.cost[node]
+        return 1 if cost == INFINITY else cost
+
+    def update(self):
+        level = self.game.level
+        castle_targets = {self.get_node(self.game.castle.rect)}
+        player_targets = self._get_player_targets()
+        if level is not self.level or castle_targets != self.castle_targets:
+            self.level = level
+            self.castle_targets = castle_targets
+            self.player_targets = player_targets
+            self.rebuild()
+            return
+
+        if level.map != self.map:
+            self._update_tiles()
+        if player_targets != self.player_targets:
+            self.player_targets = player_targets
+            self._seed_players()
+
+    def _update_tiles(self):
+        changed = {}
+        for cell, (old, new) in enumerate(zip(self.map, self.level.map)):
+            if old != new:
+                x, y = cell % MAP_SIZE, cell // MAP_SIZE
+                for node_y in range(max(y - 1, 0), min(y, NODES - 1) + 1):
+                    for node_x in range(max(x - 1, 0), min(x, NODES - 1) + 1):
+                        changed[node_y * NODES + node_x] = None
+        self.map = bytes(self.level.map)
+
+        costs = {node: get_node_cost(self.map, node) for node in changed}
+        if any(cost > self.cost[node] for node, cost in costs.items()):
+            self.rebuild()
+            return
+
+        opened = [node for node, cost in costs.items() if self.cost[node] == INFINITY and cost < INFINITY]
+        for node, cost in costs.items():
+            self.cost[node] = cost
+        self._lower(self.castle_distance, self.castle_targets, costs, opened)
+        if self.distance is not self.castle_distance:
+            self._lower(self.distance, self.targets, costs, opened)
+
+    def _lower(self, distance, targets, changed, opened):
+        """Bring a field up to date with the changed nodes, whose costs only went down."""
+        for node in opened:
+            if node not in targets:
+                # the node just opened up, reach it from its neighbors
+                distance[node] = min((distance[neighbor] + self._get_step_cost(neighbor)
+                                      for direction, neighbor in NEIGHBORS[node]), default=INFINITY)
+        heap = [(distance[node], node) for node in changed if distance[node] < INFINITY]
+        heapq.heapify(heap)
+        self._propagate(heap, distance)
+
+    def rebuild(self):
+        self.map = bytes(self.level.map)
+        self.cost = [get_node_cost(self.map, node) for node in range(NODES * NODES)]
+        self.castle_distance = [INFINITY] * (NODES * NODES)
+        heap = []
+        for node in sorted(self.castle_targets):
+            self.castle_distance[node] = 0
+            heap.append((0, node))
+        self._propagate(heap, self.castle_distance)
+        self._seed_players()
+
+    def _seed_players(self):
+        """Lay the players' targets over the castle's field, only where they are closer than the castle."""
+        self.targets = self.castle_targets | self.player_targets
+        if not self.player_targets:
+            self.distance = self.castle_distance
+            return
+
+        self.distance = self.castle_distance[:]
+        heap = []
+        for node in sorted(self.player_targets):
+            self.distance[node] = 0
+            heap.append((0, node))
+        self._propagate(heap, self.distance)
+
+    def _propagate(self, heap, distance):
+        """Dijkstra outward from the nodes in heap, only ever lowering distances."""
+        cost = self.cost
+        while heap:
+            node_distance, node = heapq.heappop(heap)
+            if node_distance > distance[node]:
+                continue
+            through = node_distance + self._get_step_cost(node)
+            for direction, neighbor in NEIGHBORS[node]:
+                if through < distance[neighbor] and cost[neighbor] < INFINITY:
+                    distance[neighbor] = through
+                    heapq.heappush(heap, (through, neighbor))
+
+    def get_direction(self, rect, current=None):
+        """
+        Direction to the neighbor closest to a target, preferring current on
+        ties. None when no target can be reached from rect.
+        """
+        self.update()
+        best, best_direction = INFINITY, None
+        for direction, neighbor in NEIGHBORS[self.get_node(rect)]:
+            if self.cost[neighbor] == INFINITY and neighbor not in self.targets:
+                continue
+            distance = self.distance[neighbor] + self._get_step_cost(neighbor)
+            if distance < best or (distance == best and direction == current):
+                best, best_direction = distance, direction
+        return best_direction
@@ -1,84 +1,118 @@
+import atexit
 import pygame
 import os
-import random
-
-from src.castle import Castle
-from src.level import Level
-from src.player import Player
-from src.enemy import Enemy
-from src.label import Label
-from src.timer import Timer
-
-from src.constants import Direction, Tile, GameSide, TankState, BonusType
-
-
-class Game:
-    def __init__(self):
-        pygame.init()
-        self.sprites = None
-        self.screen = None
-        self.players = []
-        self.enemies = []
-        self.bullets = []
-        self.bonuses = []
-        self.labels = []
-        self.castle = None
-        self.level = None
-
-        self.play_sounds = True
-        self.sounds = {}
-
-        self.gtimer = Timer()
-        self.clock = None
-
-        self.game_over = False
-        self.running = True
-        self.active = True
-        self.time_freeze = False
+import time
+
+from src.pixels import create_frame
+from src.profiler import FrameProfiler
+from src.replay import ReplayWriter
+from src.simulation import Simulation
+from src.sound_loader import SoundLoader
+from src.text_cache import TextCache
+
+from src.constants import TICK_RATE, Direction, EnemyBehaviour, Sprite, TankState, Tile
+
+SCREEN_SIZE = 480, 416
+PLAYFIELD = pygame.Rect(0, 0, 416, 416)
+
+
+class Game(Simulation):
+    def __init__(self, dirty_rendering=False, seed=None, record=None, enemy_behaviour=EnemyBehaviour.Wander,
+                 profile=False, profile_output=None, startup_start=None, headless=False):
+        # only the subsystems the game uses, the mixer is started with the sounds
+        pygame.display.init()
+        pygame.font.init()
+        # headless games draw into self.frame instead of a window and play no sound, see src/pixels.py
+        self.headless = headless
+        self.frame = None
+        if headless:
+            self.frame, self.screen = create_frame(SCREEN_SIZE)
+        else:
+            # the window has to exist before the sprites load so they get converted to its pixel format
+            self.screen = self._create_display()
+        Simulation.__init__(self, seed=seed, enemy_behaviour=enemy_behaviour)
+
+        # inputs of every tick are logged to this file when set, see src/replay.py
+        self.replay_writer = None
+        if record is not None:
+            self.replay_writer = ReplayWriter(record, self.seed, enemy_behaviour)
+            atexit.register(self.replay_writer.close)
+
+        # phases of every frame are timed, the report is printed on exit and with F9
+        if profile or profile_output is not None:
+            self.profiler = FrameProfiler(profile_output)
+            atexit.register(self.profiler.dump)
+
+        # redraw and push to the display only the areas that changed since the previous frame
+        self.dirty_rendering = dirty_rendering
+        self.drawn_rects = None
+        self.drawn_map = None
+        self.drawn_water = None
+        self.drawn_sidebar = None
+
+        self.play_sounds = not headless
+        self.sound_loader = None
+
+        # perf_counter at launch when measuring the startup time, the game quits after the first intro frame
+        self.startup_start = startup_start
 
-        self.stage = 0
-        self.players_number = 1
+        self.clock = None
 
         self._initialize_game()
 
-    def _initialize_game(self):
+    @staticmethod
+    def _create_display():
         os.environ['SDL_VIDEO_WINDOW_POS'] = 'center'
 
-        if self.play_sounds:
-            pygame.mixer.pre_init(44100, -16, 1, 512)
-
         pygame.display.set_caption("Battle City")
 
-        size = 480, 416
+        return pygame.display.set_mode(SCREEN_SIZE)
 
-        self.screen = pygame.display.set_mode(size)
+    def _initialize_game(self):
+        if self.play_sounds:
+            pygame.mixer.pre_init(44100, -16, 1, 512)
 
         self.clock = pygame.time.Clock()
-        self.sprites = pygame.transform.scale(pygame.image.load("../sprites/sprites.gif"), [192, 224])
-        pygame.display.set_icon(self.sprites.subsurface(0, 0, 13 * 2, 13 * 2))
+        pygame.display.set_icon(self.sprite_registry.get(Sprite.Player))
         if self.play_sounds:
             pygame.mixer.init(44100, -16, 1, 512)
             self._load_sounds()
 
-        self.castle = Castle(self)
-
-        self.enemy_life_image = self.sprites.subsurface(81 * 2, 57 * 2, 7 * 2, 7 * 2)
-        self.player_life_image = self.sprites.subsurface(89 * 2, 56 * 2, 7 * 2, 8 * 2)
-        self.flag_image = self.sprites.subsurface(64 * 2, 49 * 2, 16 * 2, 15 * 2)
-        self.player_image = pygame.transform.rotate(self.sprites.subsurface(0, 0, 13 * 2, 13 * 2), 270)
+        self.enemy_life_image = self.sprite_registry.get(Sprite.EnemyLife)
+        self.player_life_image = self.sprite_registry.get(Sprite.PlayerLife)
+        self.flag_image = self.sprite_registry.get(Sprite.Flag)
+        self.player_image = self.sprite_registry.get(Sprite.Player, Direction.Right)
 
         self.font = pygame.font.Font("../fonts/font.ttf", 16)
+        self.text = TextCache(self.font)
+
+        # the sidebar is rendered into its own surface and only redrawn when what it shows changes
+        self.sidebar = pygame.Surface((64, 416))
+        self.sidebar_state = None
 
         self.im_game_over = pygame.Surface((64, 40))
         self.im_game_over.set_colorkey((0, 0, 0))
-        self.im_game_over.blit(self.font.render("GAME", False, (127, 64, 64)), [0, 0])
-        self.im_game_over.blit(self.font.render("OVER", False, (127, 64, 64)), [0, 20])
+        self.im_game_over.blit(self.text.render("GAME", False, (127, 64, 64)), [0, 0])
+        self.im_game_over.blit(self.text.render("OVER", False, (127, 64, 64)), [0, 20])
         self.game_over_y = 416 + 40
 
     def _load_sounds(self):
         sound_names = ["gamestart", "gameover", "score", "background", "fire", "bonus", "explosion", "brick", "steel"]
-        for name in sound_names:
-            self.sounds[name] = pygame.mixer.Sound(f"../sounds/{name}.ogg")
+        # decoded in the background, sounds played before they are ready are skipped
+        self.sound_loader = SoundLoader({name: f"../sounds/{name}.ogg" for name in sound_names})
+        self.sounds = self.audio.sounds = self.sound_loader.sounds
+        self.sound_loader.start()
+
+    def _report_startup(self):
+        print(f"First intro frame after {(time.perf_counter() - self.startup_start) * 1000:.1f} ms")
+        if self.sound_loader is not None:
+            self.sound_loader.join()
+            if self.sound_loader.elapsed is None:
+                print("Sounds failed to decode, the ones not decoded stay silent")
+            else:
+                print(f"Sounds decoded in {self.sound_loader.elapsed * 1000:.1f} ms, "
+                      f"ready {(time.perf_counter() - self.startup_start) * 1000:.1f} ms after launch")
+        quit()
 
     def load_menu(self):
         self.load_intro_screen()
@@ -104,120 +138,55 @@ class Game:
                     elif event.key == pygame.K_RETURN:
                         main_loop = False
 
-        self.players.clear()
-        self._load_next_level()
+        if self.replay_writer is not None:
+            self.replay_writer.start_game(self.players_number)
+        self.new_game(self.players_number)
+        self._play_stage()
 
     def _load_next_level(self):
-        from src.constants import BulletState
-        self._clear_game_objects_for_next_level()
-        self.stage += 1
-        self.level = Level(self, self.stage)
-        self.time_freeze = False
-
-        enemies_count_on_level = self._get_enemies_count_by_level()
-
-        self.level.enemies_left = ([0] * enemies_count_on_level[0] +
-                                   [1] * enemies_count_on_level[1] +
-                                   [2] * enemies_count_on_level[2] +
-                                   [3] * enemies_count_on_level[3])
-        random.shuffle(self.level.enemies_left)
-
-        if self.play_sounds:
-            self.sounds["gamestart"].play()
-            self.gtimer.add(4330, lambda: self.sounds["background"].play(-1), 1)
-
-        self._reload_players()
-
-        self.gtimer.add(3000, lambda: self._spawn_enemy())
-
-        self.game_over = False
-        self.running = True
-        self.active = True
+        self.start_stage()
+        self._play_stage()
 
+    def _play_stage(self):
+        self.drawn_rects = None
         self.draw()
 
         while self.running:
-            time_passed = self.clock.tick(50)
+            time_passed = self.clock.tick(TICK_RATE)
+            profiler = self.profiler
+            if profiler is not None:
+                profiler.begin(self.stage)
 
+            fire = [False] * len(self.players)
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     quit()
                 elif event.type == pygame.KEYDOWN and not self.game_over and self.active:
-                    self._handle_key_down(event)
+                    self._handle_key_down(event, fire)
                 elif event.type == pygame.KEYUP and not self.game_over and self.active:
                     self._handle_key_up(event)
 
-            for player in self.players:
-                if player.state == TankState.Alive and not self.game_over and self.active:
-                    self._handle_player_movement(player)
-                player.update(time_passed)
-
-            for enemy in self.enemies:
-                if enemy.state == TankState.Dead and not self.game_over and self.active:
-                    self.enemies.remove(enemy)
-                    if len(self.level.enemies_left) == 0 and len(self.enemies) == 0:
-                        self._finish_level()
-                else:
-                    enemy.update(time_passed)
-
-            if not self.game_over and self.active:
-                for player in self.players:
-                    if player.state == TankState.Alive:
-                        if player.bonus is not None and player.side == GameSide.Player:
-                            self._trigger_bonus(player.bonus, player)
-                            player.bonus = None
-                    elif player.state == TankState.Dead:
-                        self.superpowers = 0
-                        player.lives -= 1
-                        if player.lives > 0:
-                            self._respawn_player(player)
-                        else:
-                            self._game_over()
-
-            for bullet in self.bullets[:]:
-                if bullet.state == BulletState.Removed:
-                    self.bullets.remove(bullet)
-                else:
-                    bullet.update()
-
-            for bonus in self.bonuses[:]:
-                if not bonus.active:
-                    self.bonuses.remove(bonus)
-
-            for label in self.labels[:]:
-                if not label.active:
-                    self.labels.remove(label)
-
-            if not self.game_over:
-                if not self.castle.active:
-                    self._game_over()
-
-            self.gtimer.update(time_passed)
+            inputs = [self._get_player_input(player, fire[n]) for n, player in enumerate(self.players)]
+            if self.replay_writer is not None:
+                self.replay_writer.write_tick(inputs, time_passed)
+            if profiler is not None:
+                profiler.mark("events")
+            self.step(inputs, time_passed)
+            self.audio.flush()
             self.draw()
+            if profiler is not None:
+                profiler.mark("draw")
+                profiler.end()
 
-    def _get_enemies_count_by_level(self):
-        from src.constants import ENEMIES_BY_LEVEL
-
-        if self.stage <= 35:
-            enemies = ENEMIES_BY_LEVEL[self.stage - 1]
-        else:
-            enemies = ENEMIES_BY_LEVEL[34]
-        return enemies
-
-    def _clear_game_objects_for_next_level(self):
-        del self.bullets[:]
-        del self.enemies[:]
-        del self.bonuses[:]
-        self.castle.rebuild()
-        del self.gtimer.timers[:]
-
-    def _handle_key_down(self, event):
+    def _handle_key_down(self, event, fire):
         if event.key == pygame.K_q:
             quit()
         elif event.key == pygame.K_m:
             self._toggle_sound()
+        elif event.key == pygame.K_F9 and self.profiler is not None:
+            self.profiler.dump()
 
-        for player in self.players:
+        for n, player in enumerate(self.players):
             if player.state == TankState.Alive:
                 try:
                     index = player.controls.index(event.key)
@@ -225,8 +194,7 @@ class Game:
                     pass
                 else:
                     if index == 0:
-                        if player.fire() and self.play_sounds:
-                            self.sounds["fire"].play()
+                        fire[n] = True
                     elif 1 <= index <= 4:
                         player.pressed[index - 1] = True
 
@@ -241,130 +209,59 @@ class Game:
                     if 1 <= index <= 4:
                         player.pressed[index - 1] = False
 
-    def _handle_player_movement(self, player):
+    @staticmethod
+    def _get_player_input(player, fire):
         if player.pressed[0]:
-            player.move(Direction.Up)
+            return Direction.Up, fire
         elif player.pressed[1]:
-            player.move(Direction.Right)
+            return Direction.Right, fire
         elif player.pressed[2]:
-            player.move(Direction.Down)
+            return Direction.Down, fire
         elif player.pressed[3]:
-            player.move(Direction.Left)
+            return Direction.Left, fire
+        return None, fire
 
     def _toggle_sound(self):
         self.play_sounds = not self.play_sounds
         if not self.play_sounds:
-            pygame.mixer.stop()
-        else:
-            self.sounds["background"].play(-1)
-
-    def _trigger_bonus(self, bonus, player):
-        if self.play_sounds:
-            self.sounds["bonus"].play()
-
-        player.trophies["bonus"] += 1
-        player.score += 500
-
-        if bonus.bonus == BonusType.Grenade:
-            for enemy in self.enemies:
-                enemy.explode()
-        elif bonus.bonus == BonusType.Helmet:
-            self._cover_player_with_shield(player, True, 10000)
-        elif bonus.bonus == BonusType.Shovel:
-            self.level.build_castle(Tile.Steel)
-            self.gtimer.add(10000, lambda: self.level.build_castle(Tile.Brick), 1)
-        elif bonus.bonus == BonusType.Star:
-            player.superpowers += 1
-            if player.superpowers == 2:
-                player.max_active_bullets = 2
-        elif bonus.bonus == BonusType.Tank:
-            player.lives += 1
-        elif bonus.bonus == BonusType.Timer:
-            self.toggle_enemy_freeze(True)
-            self.gtimer.add(10000, lambda: self.toggle_enemy_freeze(False), 1)
-        self.bonuses.remove(bonus)
-
-        self.labels.append(Label(self, bonus.rect.topleft, "500", 500))
-
-    def _cover_player_with_shield(self, player, shield=True, duration=None):
-        player.shielded = shield
-        if shield:
-            player.timer_uuid_shield = self.gtimer.add(100, lambda: player.toggle_shield_image())
+            self.audio.stop_all()
         else:
-            self.gtimer.destroy(player.timer_uuid_shield)
-
-        if shield and duration is not None:
-            self.gtimer.add(duration, lambda: self._cover_player_with_shield(player, False), 1)
-
-    def _spawn_enemy(self):
-        if len(self.enemies) >= self.level.max_active_enemies:
-            return
-        if len(self.level.enemies_left) < 1 or self.time_freeze:
-            return
-        enemy = Enemy(self, self.level, 1)
-        self.enemies.append(enemy)
-
-    def _reload_players(self):
-        from src.constants import TILE_SIZE
-        if len(self.players) == 0:
-            # first player
-            x = 8 * TILE_SIZE + (TILE_SIZE * 2 - 26) / 2
-            y = 24 * TILE_SIZE + (TILE_SIZE * 2 - 26) / 2
-
-            player = Player(self, self.level, 0, [x, y], Direction.Up, (0, 0, 13 * 2, 13 * 2))
-            self.players.append(player)
-
-            # second player
-            if self.players_number == 2:
-                x = 16 * TILE_SIZE + (TILE_SIZE * 2 - 26) / 2
-                y = 24 * TILE_SIZE + (TILE_SIZE * 2 - 26) / 2
-                player = Player(self, self.level, 0, [x, y], Direction.Up, (16 * 2, 0, 13 * 2, 13 * 2))
-                player.controls = [pygame.K_f, pygame.K_w, pygame.K_d, pygame.K_s, pygame.K_a]
-                self.players.append(player)
-
-        for player in self.players:
-            player.level = self.level
-            self._respawn_player(player, True)
-
-    def _respawn_player(self, player, clear_scores=False):
-        player.reset()
-
-        if clear_scores:
-            player.trophies = {"bonus": 0, "enemy0": 0, "enemy1": 0, "enemy2": 0, "enemy3": 0}
-
-        self._cover_player_with_shield(player, True, 4000)
+            self.audio.play("background", -1)
 
     def _game_over(self):
-        if self.play_sounds:
-            for sound in self.sounds.values():
-                sound.stop()
-            self.sounds["gameover"].play()
-
         self.game_over_y = 416 + 40
-
-        self.game_over = True
-        self.gtimer.add(3000, lambda: self.show_scores(), 1)
+        Simulation._game_over(self)
 
     def _finish_level(self):
-        if self.play_sounds:
-            self.sounds["background"].stop()
-
-        self.active = False
-        self.gtimer.add(3000, lambda: self.show_scores(), 1)
-
-        print(f"Stage {self.stage} completed")
+        Simulation._finish_level(self)
+        if not self.headless:
+            print(f"Stage {self.stage} completed")
+
+    def _end_stage(self):
+        # the score screen waits on the clock, headless games go on to the next stage right away
+        if self.headless:
+            Simulation._end_stage(self)
+        else:
+            self.show_scores()
 
     def _draw_sidebar(self):
-        x = 416
+        state = self._get_sidebar_state()
+        if state != self.sidebar_state:
+            self.sidebar_state = state
+            self._render_sidebar()
+        self.screen.blit(self.sidebar, [416, 0])
+
+    def _render_sidebar(self):
+        x = 0
         y = 0
-        self.screen.fill([100, 100, 100], pygame.Rect([416, 0], [64, 416]))
+        self.sidebar.fill([100, 100, 100])
 
         xpos = x + 16
         ypos = y + 16
 
         # draw enemy lives
         for n in range(len(self.level.enemies_left) + len(self.enemies)):
-            self.screen.blit(self.enemy_life_image, [xpos, ypos])
+            self.sidebar.blit(self.enemy_life_image, [xpos, ypos])
             if n % 2 == 1:
                 xpos = x + 16
                 ypos += 17
@@ -376,54 +273,115 @@ class Game:
             text_color = pygame.Color('black')
             for n in range(len(self.players)):
                 if n == 0:
-                    self.screen.blit(self.font.render(str(n + 1) + "P", False, text_color), [x + 16, y + 200])
-                    self.screen.blit(self.font.render(str(self.players[n].lives), False, text_color), [x + 31, y + 215])
-                    self.screen.blit(self.player_life_image, [x + 17, y + 215])
+                    self.sidebar.blit(self.text.render(str(n + 1) + "P", False, text_color), [x + 16, y + 200])
+                    self.sidebar.blit(self.text.render(str(self.players[n].lives), False, text_color), [x + 31, y + 215])
+                    self.sidebar.blit(self.player_life_image, [x + 17, y + 215])
                 else:
-                    self.screen.blit(self.font.render(str(n + 1) + "P", False, text_color), [x + 16, y + 240])
-                    self.screen.blit(self.font.render(str(self.players[n].lives), False, text_color), [x + 31, y + 255])
-                    self.screen.blit(self.player_life_image, [x + 17, y + 255])
+                    self.sidebar.blit(self.text.render(str(n + 1) + "P", False, text_color), [x + 16, y + 240])
+                    self.sidebar.blit(self.text.render(str(self.players[n].lives), False, text_color), [x + 31, y + 255])
+                    self.sidebar.blit(self.player_life_image, [x + 17, y + 255])
 
-            self.screen.blit(self.flag_image, [x + 17, y + 280])
-            self.screen.blit(self.font.render(str(self.stage), False, text_color), [x + 17, y + 312])
+            self.sidebar.blit(self.flag_image, [x + 17, y + 280])
+            self.sidebar.blit(self.text.render(str(self.stage), False, text_color), [x + 17, y + 312])
 
     def draw(self):
-        self.screen.fill([0, 0, 0])
+        if self.dirty_rendering and self.drawn_rects is not None:
+            self._draw_dirty()
+            return
+
+        self.level.draw_ground()
+
+        self.drawn_rects = self._draw_objects()
+
+        self.level.draw_grass()
 
-        self.level.draw([Tile.Empty, Tile.Brick, Tile.Steel, Tile.Frozen, Tile.Water])
+        self._draw_game_over()
 
-        self.castle.draw()
+        self._draw_sidebar()
+
+        self.drawn_map = bytes(self.level.map)
+        self.drawn_water = self.level.tile_water
+        self.drawn_sidebar = self._get_sidebar_state()
+
+        self._flip()
+
+    def _flip(self, rects=None):
+        """Push the frame, or the rects of it, to the window. Headless frames are already in self.frame."""
+        if self.headless:
+            return
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+
+    def _draw_dirty(self):
+        """
+        Redraw only what changed since the previous frame: the areas objects
+        were drawn at, the areas they are drawn at now and the changed tiles.
+        """
+        dirty = [rect.clip(PLAYFIELD) for rect in self.drawn_rects + self._get_changed_tiles()]
+
+        for rect in dirty:
+            self.level.draw_ground(rect)
+
+        # objects near the right edge must not paint over the sidebar
+        self.screen.set_clip(PLAYFIELD)
+        self.drawn_rects = self._draw_objects()
+        for rect in dirty + self.drawn_rects:
+            self.level.draw_grass(rect.clip(PLAYFIELD))
+        self._draw_game_over()
+        self.screen.set_clip(None)
+
+        dirty += self.drawn_rects
+
+        sidebar = self._get_sidebar_state()
+        if sidebar != self.drawn_sidebar:
+            self.drawn_sidebar = sidebar
+            self._draw_sidebar()
+            dirty.append(pygame.Rect([416, 0], [64, 416]))
+
+        self._flip(dirty)
+
+    def _draw_objects(self):
+        rects = [self.castle.draw()]
 
         for enemy in self.enemies:
-            enemy.draw()
+            rects.append(enemy.draw())
 
         for player in self.players:
-            player.draw()
+            rects.append(player.draw())
 
         for label in self.labels:
-            label.draw()
+            rects.append(label.draw())
 
         for bullet in self.bullets:
-            bullet.draw()
+            rects.append(bullet.draw())
 
         for bonus in self.bonuses:
-            bonus.draw()
+            rects.append(bonus.draw())
 
-        self.level.draw([Tile.Grass])
+        return [rect for rect in rects if rect is not None]
 
+    def _draw_game_over(self):
         if self.game_over:
             if self.game_over_y > 188:
                 self.game_over_y -= 4
-            self.screen.blit(self.im_game_over, [176, self.game_over_y])  # 176=(416-64)/2
-
-        self._draw_sidebar()
-
-        pygame.display.flip()
-
-    def toggle_enemy_freeze(self, freeze=True):
-        for enemy in self.enemies:
-            enemy.paused = freeze
-        self.time_freeze = freeze
+            self.drawn_rects.append(self.screen.blit(self.im_game_over, [176, self.game_over_y]))  # 176=(416-64)/2
+
+    def _get_changed_tiles(self):
+        changed = []
+        level_map = self.level.map
+        if level_map != self.drawn_map:
+            changed = [self.level.tile_rects[cell] for cell, (old, new) in enumerate(zip(self.drawn_map, level_map))
+                       if old != new]
+            self.drawn_map = bytes(level_map)
+        if self.level.tile_water is not self.drawn_water:
+            changed += [self.level.tile_rects[cell] for cell, tile in enumerate(level_map) if tile == Tile.Water]
+            self.drawn_water = self.level.tile_water
+        return changed
+
+    def _get_sidebar_state(self):
+        return len(self.level.enemies_left) + len(self.enemies), [player.lives for player in self.players], self.stage
 
     def load_hiscore(self):
         filename = ".hiscore"
@@ -450,11 +408,10 @@ class Game:
 
     def show_scores(self):
         self.running = False
-        del self.gtimer.timers[:]
+        self.gtimer.clear()
 
         if self.play_sounds:
-            for sound in self.sounds:
-                self.sounds[sound].stop()
+            self.audio.stop_all()
 
         hiscore = self.load_hiscore()
 
@@ -465,17 +422,9 @@ class Game:
             hiscore = self.players[1].score
             self.save_hiscore(hiscore)
 
-        img_tanks = [
-            self.sprites.subsurface(32 * 2, 0, 13 * 2, 15 * 2),
-            self.sprites.subsurface(48 * 2, 0, 13 * 2, 15 * 2),
-            self.sprites.subsurface(64 * 2, 0, 13 * 2, 15 * 2),
-            self.sprites.subsurface(80 * 2, 0, 13 * 2, 15 * 2)
-        ]
+        img_tanks = self.sprite_registry.get_frames(Sprite.Enemy, 4)
 
-        img_arrows = [
-            self.sprites.subsurface(81 * 2, 48 * 2, 7 * 2, 7 * 2),
-            self.sprites.subsurface(88 * 2, 48 * 2, 7 * 2, 7 * 2)
-        ]
+        img_arrows = self.sprite_registry.get_frames(Sprite.Arrow)
 
         self.screen.fill([0, 0, 0])
 
@@ -484,21 +433,21 @@ class Game:
         purple = pygame.Color(127, 64, 64)
         pink = pygame.Color(191, 160, 128)
 
-        self.screen.blit(self.font.render("HI-SCORE", False, purple), [105, 35])
-        self.screen.blit(self.font.render(str(hiscore), False, pink), [295, 35])
+        self.screen.blit(self.text.render("HI-SCORE", False, purple), [105, 35])
+        self.screen.blit(self.text.render(str(hiscore), False, pink), [295, 35])
 
-        self.screen.blit(self.font.render("STAGE" + str(self.stage).rjust(3), False, white), [170, 65])
+        self.screen.blit(self.text.render("STAGE" + str(self.stage).rjust(3), False, white), [170, 65])
 
-        self.screen.blit(self.font.render("I-PLAYER", False, purple), [25, 95])
+        self.screen.blit(self.text.render("I-PLAYER", False, purple), [25, 95])
 
         # player 1 global score
-        self.screen.blit(self.font.render(str(self.players[0].score).rjust(8), False, pink), [25, 125])
+        self.screen.blit(self.text.render(str(self.players[0].score).rjust(8), False, pink), [25, 125])
 
         if self.players_number == 2:
-            self.screen.blit(self.font.render("II-PLAYER", False, purple), [310, 95])
+            self.screen.blit(self.text.render("II-PLAYER", False, purple), [310, 95])
 
             # player 2 global score
-            self.screen.blit(self.font.render(str(self.players[1].score).rjust(8), False, pink), [325, 125])
+            self.screen.blit(self.text.render(str(self.players[1].score).rjust(8), False, pink), [325, 125])
 
         # tanks and arrows
         for i in range(4):
@@ -507,12 +456,12 @@ class Game:
             if self.players_number == 2:
                 self.screen.blit(img_arrows[1], [258, 168 + (i * 45)])
 
-        self.screen.blit(self.font.render("TOTAL", False, white), [70, 335])
+        self.screen.blit(self.text.render("TOTAL", False, white), [70, 335])
 
         # total underline
         pygame.draw.line(self.screen, white, [170, 330], [307, 330], 4)
 
-        pygame.display.flip()
+        self._flip()
 
         self.clock.tick(1)
         self.clock.tick(1)
@@ -527,19 +476,20 @@ class Game:
 
             for n in range(tanks + 1):
                 if n > 0 and self.play_sounds:
-                    self.sounds["score"].play()
+                    self.audio.play("score")
+                    self.audio.flush()
 
                 # erase previous text
-                self.screen.blit(self.font.render(str(n - 1).rjust(2), False, black), [170, 168 + (i * 45)])
+                self.screen.blit(self.text.render(str(n - 1).rjust(2), False, black), [170, 168 + (i * 45)])
                 # print new number of enemies
-                self.screen.blit(self.font.render(str(n).rjust(2), False, white), [170, 168 + (i * 45)])
+                self.screen.blit(self.text.render(str(n).rjust(2), False, white), [170, 168 + (i * 45)])
                 # erase previous text
-                self.screen.blit(self.font.render(str((n - 1) * (i + 1) * 100).rjust(4) + " PTS", False, black),
+                self.screen.blit(self.text.render(str((n - 1) * (i + 1) * 100).rjust(4) + " PTS", False, black),
                                  [25, 168 + (i * 45)])
                 # print new total points per enemy
-                self.screen.blit(self.font.render(str(n * (i + 1) * 100).rjust(4) + " PTS", False, white),
+                self.screen.blit(self.text.render(str(n * (i + 1) * 100).rjust(4) + " PTS", False, white),
                                  [25, 168 + (i * 45)])
-                pygame.display.flip()
+                self._flip()
                 self.clock.tick(interval)
 
             if self.players_number == 2:
@@ -548,29 +498,30 @@ class Game:
                 for n in range(tanks + 1):
 
                     if n > 0 and self.play_sounds:
-                        self.sounds["score"].play()
+                        self.audio.play("score")
+                        self.audio.flush()
 
-                    self.screen.blit(self.font.render(str(n - 1).rjust(2), False, black), [277, 168 + (i * 45)])
-                    self.screen.blit(self.font.render(str(n).rjust(2), False, white), [277, 168 + (i * 45)])
+                    self.screen.blit(self.text.render(str(n - 1).rjust(2), False, black), [277, 168 + (i * 45)])
+                    self.screen.blit(self.text.render(str(n).rjust(2), False, white), [277, 168 + (i * 45)])
 
-                    self.screen.blit(self.font.render(str((n - 1) * (i + 1) * 100).rjust(4) + " PTS", False, black),
+                    self.screen.blit(self.text.render(str((n - 1) * (i + 1) * 100).rjust(4) + " PTS", False, black),
                                      [325, 168 + (i * 45)])
-                    self.screen.blit(self.font.render(str(n * (i + 1) * 100).rjust(4) + " PTS", False, white),
+                    self.screen.blit(self.text.render(str(n * (i + 1) * 100).rjust(4) + " PTS", False, white),
                                      [325, 168 + (i * 45)])
 
-                    pygame.display.flip()
+                    self._flip()
                     self.clock.tick(interval)
 
             self.clock.tick(interval)
 
         # total tanks
         tanks = sum([i for i in self.players[0].trophies.values()]) - self.players[0].trophies["bonus"]
-        self.screen.blit(self.font.render(str(tanks).rjust(2), False, white), [170, 335])
+        self.screen.blit(self.text.render(str(tanks).rjust(2), False, white), [170, 335])
         if self.players_number == 2:
             tanks = sum([i for i in self.players[1].trophies.values()]) - self.players[1].trophies["bonus"]
-            self.screen.blit(self.font.render(str(tanks).rjust(2), False, white), [277, 335])
+            self.screen.blit(self.text.render(str(tanks).rjust(2), False, white), [277, 335])
 
-        pygame.display.flip()
+        self._flip()
 
         self.clock.tick(1)
         self.clock.tick(1)
@@ -586,7 +537,7 @@ class Game:
         self.screen.fill([0, 0, 0])
         self.write_text_in_bricks("game", [125, 140])
         self.write_text_in_bricks("over", [125, 220])
-        pygame.display.flip()
+        self._flip()
 
         while True:
             self.clock.tick(50)
@@ -613,11 +564,13 @@ class Game:
                         break
 
             self.screen.blit(screen_cp, [0, y])
-            pygame.display.flip()
+            self._flip()
+            if self.startup_start is not None:
+                self._report_startup()
             y -= 5
 
         self.screen.blit(screen_cp, [0, 0])
-        pygame.display.flip()
+        self._flip()
 
     def draw_intro_screen(self, put_on_surface=True):
         self.screen.fill([0, 0, 0])
@@ -625,13 +578,13 @@ class Game:
         if pygame.font.get_init():
             hiscore = self.load_hiscore()
 
-            self.screen.blit(self.font.render("HI-" + str(hiscore), True, pygame.Color('white')), [170, 35])
+            self.screen.blit(self.text.render("HI-" + str(hiscore), True, pygame.Color('white')), [170, 35])
 
-            self.screen.blit(self.font.render("1 PLAYER", True, pygame.Color('white')), [165, 250])
-            self.screen.blit(self.font.render("2 PLAYERS", True, pygame.Color('white')), [165, 275])
+            self.screen.blit(self.text.render("1 PLAYER", True, pygame.Color('white')), [165, 250])
+            self.screen.blit(self.text.render("2 PLAYERS", True, pygame.Color('white')), [165, 275])
 
-            self.screen.blit(self.font.render("(c) 1980 1985 NAMCO LTD.", True, pygame.Color('white')), [50, 350])
-            self.screen.blit(self.font.render("ALL RIGHTS RESERVED", True, pygame.Color('white')), [85, 380])
+            self.screen.blit(self.text.render("(c) 1980 1985 NAMCO LTD.", True, pygame.Color('white')), [50, 350])
+            self.screen.blit(self.text.render("ALL RIGHTS RESERVED", True, pygame.Color('white')), [85, 380])
 
         if self.players_number == 1:
             self.screen.blit(self.player_image, [125, 245])
@@ -642,11 +595,11 @@ class Game:
         self.write_text_in_bricks("city", [129, 160])
 
         if put_on_surface:
-            pygame.display.flip()
+            self._flip()
 
     def write_text_in_bricks(self, text, pos):
         from src.constants import ALPHABET
-        bricks = self.sprites.subsurface(56 * 2, 64 * 2, 8 * 2, 8 * 2)
+        bricks = self.sprite_registry.get(Sprite.LetterBrick)
         brick1 = bricks.subsurface((0, 0, 8, 8))
         brick2 = bricks.subsurface((8, 0, 8, 8))
         brick3 = bricks.subsurface((8, 8, 8, 8))
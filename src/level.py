@@ -1,128 +1,173 @@
-import os
 import pygame
 
-from src.my_rectangle import RectangleWithType
-
-from src.constants import TILE_SIZE, Tile
+from src.constants import CASTLE_TILES, MAP_SIZE, OBSTACLE_TILES, TILE_SIZE, Sprite, Tile
+from src.level_pack import get_default_enemy_counts, load_level_data
 
 
 class Level:
     def __init__(self, game, level_number=None):
         self.game = game
         self.max_active_enemies = 4
-        self.map = []
-
-        tile_images = [
-            pygame.Surface((8 * 2, 8 * 2)),
-            self.game.sprites.subsurface(48 * 2, 64 * 2, 8 * 2, 8 * 2),
-            self.game.sprites.subsurface(48 * 2, 72 * 2, 8 * 2, 8 * 2),
-            self.game.sprites.subsurface(56 * 2, 72 * 2, 8 * 2, 8 * 2),
-            self.game.sprites.subsurface(64 * 2, 64 * 2, 8 * 2, 8 * 2),
-            self.game.sprites.subsurface(64 * 2, 64 * 2, 8 * 2, 8 * 2),
-            self.game.sprites.subsurface(72 * 2, 64 * 2, 8 * 2, 8 * 2),
-            self.game.sprites.subsurface(64 * 2, 72 * 2, 8 * 2, 8 * 2)
-        ]
-        self.tile_empty = tile_images[0]
-        self.tile_brick = tile_images[1]
-        self.tile_steel = tile_images[2]
-        self.tile_grass = tile_images[3]
-        self.tile_water = tile_images[4]
-        self.tile_water1 = tile_images[4]
-        self.tile_water2 = tile_images[5]
-        self.tile_froze = tile_images[6]
-
-        self.obstacle_rects = []
+        # one Tile value per cell, row by row
+        self.map = bytearray(MAP_SIZE * MAP_SIZE)
+        # the map as loaded, before any tile was shot, and its reachability analysis
+        self.loaded_map = bytes(self.map)
+        self.analysis = None
+        # enemies of each type the stage sends, a compiled level may bring its own
+        self.enemy_counts = get_default_enemy_counts(level_number or 1)
+        self.tile_rects = [pygame.Rect(cell % MAP_SIZE * TILE_SIZE, cell // MAP_SIZE * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+                           for cell in range(MAP_SIZE * MAP_SIZE)]
+
+        registry = self.game.sprite_registry
+        self.tile_brick = registry.get(Sprite.Tile, variant=Tile.Brick)
+        self.tile_steel = registry.get(Sprite.Tile, variant=Tile.Steel)
+        self.tile_grass = registry.get(Sprite.Tile, variant=Tile.Grass)
+        self.tile_water1, self.tile_water2 = registry.get_frames(Sprite.Water)
+        self.tile_water = self.tile_water1
+        self.tile_froze = registry.get(Sprite.Tile, variant=Tile.Frozen)
+
+        # cell index -> tile rect of every tile tanks and bullets can't pass
+        self.obstacle_rects = {}
+
+        # terrain pre-rendered into one surface per water frame plus a grass overlay,
+        # baked on first draw so headless runs never pay for it
+        self.backgrounds = None
+        self.background = None
+        self.grass_layer = None
 
         level_number = 1 if level_number is None or level_number == 0 else level_number % 36
 
         self.load_level(level_number)
-        self.obstacle_rects = []
         self.update_obstacle_rects()
         self.game.gtimer.add(500, lambda: self.toggle_waves())
 
+    @staticmethod
+    def get_cell(pos):
+        x, y = int(pos[0]) // TILE_SIZE, int(pos[1]) // TILE_SIZE
+        if 0 <= x < MAP_SIZE and 0 <= y < MAP_SIZE:
+            return y * MAP_SIZE + x
+        return None
+
+    def set_tile(self, cell, tile):
+        self.map[cell] = tile
+        if tile in OBSTACLE_TILES:
+            self.obstacle_rects[cell] = self.tile_rects[cell]
+        else:
+            self.obstacle_rects.pop(cell, None)
+        if self.backgrounds is not None:
+            self._bake_cell(cell)
+
     def hit_tile(self, pos, power=1, sound=False):
-        for tile in self.map:
-            if tile.topleft == pos:
-                if tile.type == Tile.Brick:
-                    if self.game.play_sounds and sound:
-                        self.game.sounds["brick"].play()
-                    self.map.remove(tile)
-                    self.update_obstacle_rects()
-                    return True
-                elif tile.type == Tile.Steel:
-                    if self.game.play_sounds and sound:
-                        self.game.sounds["steel"].play()
-                    if power == 2:
-                        self.map.remove(tile)
-                        self.update_obstacle_rects()
+        cell = self.get_cell(pos)
+        if cell is None:
+            return False
+
+        tile = self.map[cell]
+        if tile == Tile.Brick:
+            if self.game.play_sounds and sound:
+                self.game.audio.play("brick")
+            self.set_tile(cell, Tile.Empty)
+            return True
+        elif tile == Tile.Steel:
+            if self.game.play_sounds and sound:
+                self.game.audio.play("steel")
+            if power == 2:
+                self.set_tile(cell, Tile.Empty)
+            return True
+        return False
+
+    def get_obstacles(self, rect):
+        """Tile rects of the obstacles overlapping rect, looked up only in the cells rect covers."""
+        obstacles = []
+        for y in range(max(rect.top // TILE_SIZE, 0), min((rect.bottom - 1) // TILE_SIZE, MAP_SIZE - 1) + 1):
+            for x in range(max(rect.left // TILE_SIZE, 0), min((rect.right - 1) // TILE_SIZE, MAP_SIZE - 1) + 1):
+                obstacle = self.obstacle_rects.get(y * MAP_SIZE + x)
+                if obstacle is not None:
+                    obstacles.append(obstacle)
+        return obstacles
+
+    def collides(self, rect):
+        if rect.colliderect(self.game.castle.rect):
+            return True
+        for y in range(max(rect.top // TILE_SIZE, 0), min((rect.bottom - 1) // TILE_SIZE, MAP_SIZE - 1) + 1):
+            for x in range(max(rect.left // TILE_SIZE, 0), min((rect.right - 1) // TILE_SIZE, MAP_SIZE - 1) + 1):
+                if y * MAP_SIZE + x in self.obstacle_rects:
                     return True
-                else:
-                    return False
+        return False
 
     def toggle_waves(self):
         if self.tile_water == self.tile_water1:
             self.tile_water = self.tile_water2
         else:
             self.tile_water = self.tile_water1
+        if self.backgrounds is not None:
+            self.background = self.backgrounds[self.tile_water is self.tile_water2]
 
     def load_level(self, level_number=1):
-        filename = f"../levels/{level_number}"
-        if not os.path.isfile(filename):
+        data = load_level_data(level_number)
+        if data is None:
             return False
-        with open(filename, "r") as f:
-            data = f.read().split("\n")
-            self.map = []
-            x, y = 0, 0
-            for row in data:
-                for ch in row:
-                    if ch == "#":
-                        self.map.append(RectangleWithType(x, y, TILE_SIZE, TILE_SIZE, Tile.Brick))
-                    elif ch == "@":
-                        self.map.append(RectangleWithType(x, y, TILE_SIZE, TILE_SIZE, Tile.Steel))
-                    elif ch == "~":
-                        self.map.append(RectangleWithType(x, y, TILE_SIZE, TILE_SIZE, Tile.Water))
-                    elif ch == "%":
-                        self.map.append(RectangleWithType(x, y, TILE_SIZE, TILE_SIZE, Tile.Grass))
-                    elif ch == "-":
-                        self.map.append(RectangleWithType(x, y, TILE_SIZE, TILE_SIZE, Tile.Frozen))
-                    x += TILE_SIZE
-                x = 0
-                y += TILE_SIZE
+        self.map = data.map
+        self.loaded_map = bytes(data.map)
+        self.analysis = None
+        if data.enemy_counts is not None:
+            self.enemy_counts = data.enemy_counts
+        self.max_active_enemies = data.max_active_enemies
         return True
 
-    def draw(self, tiles=None):
-        if tiles is None:
-            tiles = [Tile.Brick, Tile.Steel, Tile.Water, Tile.Grass, Tile.Frozen]
-
-        for tile in self.map:
-            if tile.type in tiles:
-                if tile.type == Tile.Brick:
-                    self.game.screen.blit(self.tile_brick, tile.topleft)
-                elif tile.type == Tile.Steel:
-                    self.game.screen.blit(self.tile_steel, tile.topleft)
-                elif tile.type == Tile.Water:
-                    self.game.screen.blit(self.tile_water, tile.topleft)
-                elif tile.type == Tile.Frozen:
-                    self.game.screen.blit(self.tile_froze, tile.topleft)
-                elif tile.type == Tile.Grass:
-                    self.game.screen.blit(self.tile_grass, tile.topleft)
+    def get_analysis(self):
+        """Distances between the spawn slots, the start positions and the castle on the map as loaded."""
+        if self.analysis is None:
+            from src.level_analyzer import load_analysis
+            self.analysis = load_analysis(self.loaded_map)
+        return self.analysis
+
+    def _bake(self):
+        self.backgrounds = [pygame.Surface((MAP_SIZE * TILE_SIZE, MAP_SIZE * TILE_SIZE)) for _ in range(2)]
+        self.grass_layer = pygame.Surface((MAP_SIZE * TILE_SIZE, MAP_SIZE * TILE_SIZE), pygame.SRCALPHA)
+        for cell in range(len(self.map)):
+            self._bake_cell(cell)
+        self.background = self.backgrounds[self.tile_water is self.tile_water2]
+
+    def _bake_cell(self, cell):
+        tile = self.map[cell]
+        rect = self.tile_rects[cell]
+        for background, water in zip(self.backgrounds, (self.tile_water1, self.tile_water2)):
+            background.fill([0, 0, 0], rect)
+            if tile == Tile.Brick:
+                background.blit(self.tile_brick, rect)
+            elif tile == Tile.Steel:
+                background.blit(self.tile_steel, rect)
+            elif tile == Tile.Water:
+                background.blit(water, rect)
+            elif tile == Tile.Frozen:
+                background.blit(self.tile_froze, rect)
+        self.grass_layer.fill([0, 0, 0, 0], rect)
+        if tile == Tile.Grass:
+            self.grass_layer.blit(self.tile_grass, rect)
+
+    def draw_ground(self, area=None):
+        if self.backgrounds is None:
+            self._bake()
+        if area is None:
+            self.game.screen.blit(self.background, [0, 0])
+        else:
+            self.game.screen.blit(self.background, area, area)
+
+    def draw_grass(self, area=None):
+        if self.backgrounds is None:
+            self._bake()
+        if area is None:
+            self.game.screen.blit(self.grass_layer, [0, 0])
+        else:
+            self.game.screen.blit(self.grass_layer, area, area)
 
     def update_obstacle_rects(self):
-        self.obstacle_rects = [self.game.castle.rect]
-        for tile in self.map:
-            if tile.type in (Tile.Brick, Tile.Steel, Tile.Water):
-                self.obstacle_rects.append(tile)
+        self.obstacle_rects = {}
+        for cell, tile in enumerate(self.map):
+            if tile in OBSTACLE_TILES:
+                self.obstacle_rects[cell] = self.tile_rects[cell]
 
     def build_castle(self, tile):
-        from src.constants import CASTLE_TILES
-        obsolete = []
-        for i, rect in enumerate(self.map):
-            if rect.topleft in CASTLE_TILES:
-                obsolete.append(rect)
-        for rect in obsolete:
-            self.map.remove(rect)
-
         for pos in CASTLE_TILES:
-            self.map.append(RectangleWithType(pos[0], pos[1], TILE_SIZE, TILE_SIZE, tile))
-
-        self.update_obstacle_rects()
+            self.set_tile(self.get_cell(pos), tile)
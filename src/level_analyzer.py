@@ -0,0 +1,195 @@
+"""
+Level reachability.
+
+The analyzer finds how a tank gets from each enemy spawn slot and each
+player start position to everywhere else on a level, the castle included.
+Tanks are moved as 26px tanks between the 2x2-tile nodes of the flow field:
+steel and water block a node, bricks only make it more expensive since they
+can be shot away. The nodes covering the castle block tanks too, the castle
+counts as reached from any node next to them.
+
+Distance maps are cached in levels/cache, keyed by the tiles of the level,
+so the game and bots get them without searching again.
+
+Check every level of a directory, text levels and packs alike, from src with:
+PYTHONPATH=.. python -m src.level_analyzer [DIRECTORY]
+"""
+import concurrent.futures
+import hashlib
+import heapq
+import os
+
+import numpy as np
+
+from src.constants import MAP_SIZE, PLAYER_POSITIONS, SPAWN_POSITIONS, TANK_OFFSET, TILE_SIZE
+from src.flow_field import INFINITY, NEIGHBORS, NODES, get_node_cost
+from src.level_pack import TEXT_LEVELS_PATH, LevelPack, get_text_levels, parse_text_level
+
+CACHE_PATH = "../levels/cache"
+ANALYZER_VERSION = 1
+
+# distance maps are stored as uint16, nodes that can't be reached hold UNREACHABLE
+UNREACHABLE = 0xffff
+
+
+def _get_position_node(position):
+    x, y = position
+    return (y - TANK_OFFSET) // TILE_SIZE * NODES + (x - TANK_OFFSET) // TILE_SIZE
+
+
+# nodes a tank can't stand on because they overlap the castle
+CASTLE_NODES = frozenset(y * NODES + x for y in range(MAP_SIZE - 3, NODES) for x in range(11, 14))
+# nodes from which a tank touches the castle
+CASTLE_SIDES = tuple(sorted({neighbor for node in CASTLE_NODES for direction, neighbor in NEIGHBORS[node]}
+                            - CASTLE_NODES))
+
+SPAWNS = tuple(f"spawn{n}" for n in range(len(SPAWN_POSITIONS)))
+PLAYERS = tuple(f"player{n}" for n in range(len(PLAYER_POSITIONS)))
+CASTLE = "castle"
+
+# name -> node the distance map of that point starts from
+POINTS = dict(zip(SPAWNS + PLAYERS, map(_get_position_node, SPAWN_POSITIONS + PLAYER_POSITIONS)))
+SOURCES = SPAWNS + PLAYERS + (CASTLE,)
+
+
+def get_tiles_key(tiles):
+    return hashlib.sha1(bytes([ANALYZER_VERSION]) + bytes(tiles)).hexdigest()
+
+
+def _get_costs(tiles):
+    costs = [get_node_cost(tiles, node) for node in range(NODES * NODES)]
+    for node in CASTLE_NODES:
+        costs[node] = INFINITY
+    return costs
+
+
+def _get_distances(costs, starts):
+    """Dijkstra from the passable nodes of starts, a distance being the cost of the nodes entered on the way."""
+    distance = [INFINITY] * (NODES * NODES)
+    heap = []
+    for node in starts:
+        if costs[node] < INFINITY:
+            distance[node] = 0
+            heap.append((0, node))
+    heapq.heapify(heap)
+
+    while heap:
+        node_distance, node = heapq.heappop(heap)
+        if node_distance > distance[node]:
+            continue
+        for direction, neighbor in NEIGHBORS[node]:
+            through = node_distance + costs[neighbor]
+            if through < distance[neighbor]:
+                distance[neighbor] = through
+                heapq.heappush(heap, (through, neighbor))
+    return distance
+
+
+class LevelAnalysis:
+    """
+    Distance maps of a level, one NODES x NODES uint16 array per point of
+    SOURCES, UNREACHABLE where a tank from that point can't get.
+    """
+    def __init__(self, distances):
+        self.distances = distances
+
+    @classmethod
+    def from_tiles(cls, tiles):
+        costs = _get_costs(tiles)
+        distances = np.full((len(SOURCES), NODES, NODES), UNREACHABLE, np.uint16)
+        for n, source in enumerate(SOURCES):
+            starts = CASTLE_SIDES if source == CASTLE else (POINTS[source],)
+            for node, distance in enumerate(_get_distances(costs, starts)):
+                if distance < INFINITY:
+                    distances[n, node // NODES, node % NODES] = min(distance, UNREACHABLE - 1)
+        return cls(distances)
+
+    def get_distance_map(self, source):
+        """Distance from source to every node, indexed [y, x]."""
+        return self.distances[SOURCES.index(source)]
+
+    def get_distance(self, source, target):
+        """Distance from one point of SOURCES to another, None when there is no way."""
+        distance_map = self.get_distance_map(source).ravel()
+        if target == CASTLE:
+            distance = int(distance_map[list(CASTLE_SIDES)].min())
+        else:
+            distance = int(distance_map[POINTS[target]])
+        return None if distance == UNREACHABLE else distance
+
+    def get_problems(self):
+        """What makes the level unplayable, an empty list for a sound level."""
+        problems = []
+        for spawn in SPAWNS:
+            if self.get_distance(spawn, spawn) is None:
+                problems.append(f"{spawn} is inside steel or water")
+            elif self.get_distance(spawn, CASTLE) is None:
+                problems.append(f"{spawn} can't reach the castle")
+        for player in PLAYERS:
+            if self.get_distance(player, player) is None:
+                problems.append(f"{player} starts inside steel or water")
+            elif self.get_distance(player, CASTLE) is None and all(self.get_distance(player, spawn) is None
+                                                                    for spawn in SPAWNS):
+                problems.append(f"{player} is walled in")
+        return problems
+
+
+def load_analysis(tiles, cache_path=CACHE_PATH):
+    """The analysis of a level's tiles, from the cache when it has been done before."""
+    filename = os.path.join(cache_path, get_tiles_key(tiles) + ".npy")
+    if os.path.isfile(filename):
+        distances = np.load(filename)
+        if distances.shape == (len(SOURCES), NODES, NODES):
+            return LevelAnalysis(distances)
+
+    analysis = LevelAnalysis.from_tiles(tiles)
+    os.makedirs(cache_path, exist_ok=True)
+    # written under a temporary name first, parallel workers may analyze the same level
+    temporary = f"{filename}.{os.getpid()}.npy"
+    np.save(temporary, analysis.distances)
+    os.replace(temporary, filename)
+    return analysis
+
+
+def _analyze(entry):
+    name, tiles, cache_path = entry
+    return name, load_analysis(tiles, cache_path).get_problems()
+
+
+def get_directory_levels(directory):
+    """Name -> tiles of the text levels of directory and of the levels in its packs."""
+    levels = {}
+    for level_number, path in sorted(get_text_levels(directory).items()):
+        with open(path, "r") as f:
+            levels[path] = bytes(parse_text_level(f.read()))
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".pack"):
+            pack = LevelPack(os.path.join(directory, name))
+            for level_id in pack.ids:
+                levels[f"{pack.filename}:{level_id}"] = bytes(pack.get(level_id).map)
+            pack.close()
+    return levels
+
+
+def analyze_directory(directory=TEXT_LEVELS_PATH, cache_path=CACHE_PATH, jobs=None):
+    """Name -> problems of every level in directory, analyzed by jobs processes."""
+    entries = [(name, tiles, cache_path) for name, tiles in get_directory_levels(directory).items()]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        return dict(executor.map(_analyze, entries))
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Check that tanks can get around Battle city levels")
+    parser.add_argument("directory", nargs="?", default=TEXT_LEVELS_PATH, help="directory of text levels and packs")
+    parser.add_argument("--cache", default=CACHE_PATH, help="directory the distance maps are cached in")
+    parser.add_argument("--jobs", type=int, help="worker processes, one per CPU by default")
+    args = parser.parse_args()
+
+    results = analyze_directory(args.directory, args.cache, args.jobs)
+    for level_name, level_problems in results.items():
+        print(f"{level_name}: {'; '.join(level_problems) if level_problems else 'ok'}")
+    if any(results.values()):
+        sys.exit(1)
@@ -0,0 +1,200 @@
+"""
+Compiled levels.
+
+A compiled level is a small header followed by the map, one Tile value per
+cell row by row. A pack bundles any number of them behind an index sorted by
+level id, so one level is read with a seek without parsing the others.
+
+File layout, little-endian:
+    level       b"BCLV", version byte, map size byte, enemies of each of the
+                four types as bytes, all zero when the stage picks them,
+                max active enemies byte, map bytes
+    pack        b"BCPK", version byte, level count as uint16, then per level
+                its id as uint16, offset and length as uint32, then the levels
+
+Compile the text levels from src with: PYTHONPATH=.. python -m src.level_pack
+"""
+import bisect
+import os
+import struct
+
+from src.constants import ENEMIES_BY_LEVEL, MAP_SIZE, Tile
+
+TEXT_LEVELS_PATH = "../levels"
+PACK_PATH = "../levels/levels.pack"
+
+LEVEL_MAGIC = b"BCLV"
+PACK_MAGIC = b"BCPK"
+LEVEL_VERSION = 2
+PACK_VERSION = 1
+LEVEL_HEADER = struct.Struct("<4sBB4BB")
+PACK_HEADER = struct.Struct("<4sBH")
+INDEX_ENTRY = struct.Struct("<HII")
+
+MAX_ACTIVE_ENEMIES = 4
+
+TILE_CHARS = {
+    "#": Tile.Brick,
+    "@": Tile.Steel,
+    "~": Tile.Water,
+    "%": Tile.Grass,
+    "-": Tile.Frozen
+}
+
+
+class LevelData:
+    def __init__(self, tiles, enemy_counts, max_active_enemies=MAX_ACTIVE_ENEMIES):
+        # one Tile value per cell, row by row
+        self.map = bytearray(tiles)
+        # enemies of each type, as in ENEMIES_BY_LEVEL, None for a level which leaves them to the stage
+        self.enemy_counts = None if enemy_counts is None else tuple(enemy_counts)
+        self.max_active_enemies = max_active_enemies
+
+
+def parse_text_level(text):
+    """The map of a text level: one row per line, unknown characters are empty cells."""
+    tiles = bytearray(MAP_SIZE * MAP_SIZE)
+    for y, row in enumerate(text.split("\n")[:MAP_SIZE]):
+        for x, ch in enumerate(row[:MAP_SIZE]):
+            tiles[y * MAP_SIZE + x] = TILE_CHARS.get(ch, Tile.Empty)
+    return tiles
+
+
+# enemy counts of a compiled level that leaves them to the stage, a level always sends some enemies
+STAGE_ENEMY_COUNTS = (0, 0, 0, 0)
+
+
+def get_default_enemy_counts(level_number):
+    return ENEMIES_BY_LEVEL[min(max(level_number, 1), len(ENEMIES_BY_LEVEL)) - 1]
+
+
+def encode_level(level):
+    enemy_counts = STAGE_ENEMY_COUNTS if level.enemy_counts is None else level.enemy_counts
+    header = LEVEL_HEADER.pack(LEVEL_MAGIC, LEVEL_VERSION, MAP_SIZE, *enemy_counts, level.max_active_enemies)
+    return header + level.map
+
+
+def decode_level(data):
+    magic, version, map_size, *enemy_counts, max_active_enemies = LEVEL_HEADER.unpack_from(data)
+    if magic != LEVEL_MAGIC or version != LEVEL_VERSION or map_size != MAP_SIZE:
+        raise ValueError(f"Not a version {LEVEL_VERSION} {MAP_SIZE}x{MAP_SIZE} level")
+    tiles = data[LEVEL_HEADER.size:LEVEL_HEADER.size + MAP_SIZE * MAP_SIZE]
+    if len(tiles) != MAP_SIZE * MAP_SIZE:
+        raise ValueError("Truncated level")
+    return LevelData(tiles, None if tuple(enemy_counts) == STAGE_ENEMY_COUNTS else enemy_counts, max_active_enemies)
+
+
+def write_pack(filename, levels):
+    """Write a pack of levels, a dict of level id -> LevelData."""
+    records = [(level_id, encode_level(level)) for level_id, level in sorted(levels.items())]
+    offset = PACK_HEADER.size + INDEX_ENTRY.size * len(records)
+    with open(filename, "wb") as f:
+        f.write(PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(records)))
+        for level_id, record in records:
+            f.write(INDEX_ENTRY.pack(level_id, offset, len(record)))
+            offset += len(record)
+        for level_id, record in records:
+            f.write(record)
+
+
+class LevelPack:
+    """
+    A pack file opened for random access. Only the index is read up front,
+    every get seeks to one level and decodes it.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = open(filename, "rb")
+        magic, version, count = PACK_HEADER.unpack(self.file.read(PACK_HEADER.size))
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            self.file.close()
+            raise ValueError(f"{filename} is not a version {PACK_VERSION} level pack")
+
+        index = self.file.read(INDEX_ENTRY.size * count)
+        entries = [INDEX_ENTRY.unpack_from(index, n * INDEX_ENTRY.size) for n in range(count)]
+        self.ids = [entry[0] for entry in entries]
+        self.locations = [entry[1:] for entry in entries]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, level_id):
+        return self._find(level_id) is not None
+
+    def _find(self, level_id):
+        n = bisect.bisect_left(self.ids, level_id)
+        if n < len(self.ids) and self.ids[n] == level_id:
+            return n
+        return None
+
+    def get(self, level_id):
+        """The LevelData of a level id, None when the pack doesn't have it."""
+        n = self._find(level_id)
+        if n is None:
+            return None
+        offset, length = self.locations[n]
+        self.file.seek(offset)
+        return decode_level(self.file.read(length))
+
+    def close(self):
+        self.file.close()
+
+
+def get_text_levels(directory=TEXT_LEVELS_PATH):
+    """Level number -> path of the text levels in directory, named by their number."""
+    return {int(name): os.path.join(directory, name) for name in os.listdir(directory) if name.isdigit()}
+
+
+def compile_levels(directory=TEXT_LEVELS_PATH, filename=PACK_PATH):
+    """Pack every text level of directory, leaving their enemy counts to the stage they are played on."""
+    levels = {}
+    for level_number, path in get_text_levels(directory).items():
+        with open(path, "r") as f:
+            levels[level_number] = LevelData(parse_text_level(f.read()), None)
+    write_pack(filename, levels)
+    return levels
+
+
+_pack = None
+
+
+def get_pack():
+    """
+    The shipped pack, opened once. None when there is no pack or a text
+    level was edited after it was compiled, the text levels are read then.
+    """
+    global _pack
+    if _pack is None:
+        _pack = False
+        if os.path.isfile(PACK_PATH):
+            built = os.path.getmtime(PACK_PATH)
+            if all(os.path.getmtime(path) <= built for path in get_text_levels().values()):
+                _pack = LevelPack(PACK_PATH)
+    return _pack or None
+
+
+def load_level_data(level_number):
+    """A level from the pack, or from its text file. None when neither has it."""
+    pack = get_pack()
+    if pack is not None:
+        level = pack.get(level_number)
+        if level is not None:
+            return level
+
+    filename = os.path.join(TEXT_LEVELS_PATH, str(level_number))
+    if not os.path.isfile(filename):
+        return None
+    with open(filename, "r") as f:
+        return LevelData(parse_text_level(f.read()), None)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile Battle city text levels into a level pack")
+    parser.add_argument("--levels", default=TEXT_LEVELS_PATH, help="directory of the text levels")
+    parser.add_argument("--output", default=PACK_PATH, help="pack file to write")
+    args = parser.parse_args()
+
+    compiled = compile_levels(args.levels, args.output)
+    print(f"Packed {len(compiled)} levels into {args.output} ({os.path.getsize(args.output)} bytes)")
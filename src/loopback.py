@@ -0,0 +1,101 @@
+"""
+Loopback harness for the multiplayer server.
+
+Starts a Server and bots playing random inputs in one process, talking
+over TCP on localhost, and checks that the state every client rebuilds from
+the snapshots is the state the server had at that tick. Reports the
+snapshot sizes, the bandwidth per client and the server time per match.
+
+Run from src with: PYTHONPATH=.. python -m src.loopback [--matches N] [--players 1|2] [--ticks N]
+"""
+import asyncio
+import random
+import time
+
+from src.client import Client
+from src.constants import TICK_RATE, Direction
+from src.protocol import PLAYER, SPECTATOR, SPECTATOR_SLOT
+from src.server import Server
+
+
+class Bot(Client):
+    """A client without a window, holding a random direction and firing at random."""
+    def __init__(self, seed, role=PLAYER, expected=None):
+        Client.__init__(self, role, render=False)
+        self.random = random.Random(seed)
+        # match number -> tick -> WorldState of the server
+        self.expected = expected
+        self.mismatches = 0
+        self.direction = None
+
+    def update(self):
+        if self.random.random() < 0.05:
+            self.direction = self.random.choice((None,) + tuple(Direction))
+        self.send_input(self.direction, self.random.random() < 0.1)
+
+    def apply(self, snapshot):
+        Client.apply(self, snapshot)
+        if self.expected is not None and self.state != self.expected[self.match][snapshot.tick]:
+            self.mismatches += 1
+
+
+async def run_loopback(matches=4, players=2, ticks=500, seed=0, spectators=1, tick_rate=TICK_RATE):
+    expected = {}
+    hosted = {}
+
+    def record(match, state):
+        hosted[match.number] = match
+        expected.setdefault(match.number, {})[match.tick] = state
+
+    server = Server(players, seed, tick_rate=tick_rate, on_tick=record)
+    port = await server.start(port=0)
+
+    bots = [Bot(seed + n, PLAYER, expected) for n in range(matches * players)]
+    tasks = []
+    for bot in bots:
+        task = asyncio.create_task(bot.run(port=port))
+        tasks.append(task)
+        # each bot joins before the next one, so they fill the matches in order
+        while bot.slot is None and not task.done():
+            await asyncio.sleep(0)
+    for n in range(spectators):
+        spectator = Bot(seed - n - 1, SPECTATOR, expected)
+        bots.append(spectator)
+        tasks.append(asyncio.create_task(spectator.run(port=port)))
+
+    start = time.perf_counter()
+    while any(match.tick < ticks for match in server.matches if match.started):
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    await server.stop()
+    await asyncio.gather(*tasks)
+    return [hosted[number] for number in sorted(hosted)], bots, elapsed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run bots against a local server and check what they receive")
+    parser.add_argument("--matches", type=int, default=4)
+    parser.add_argument("--players", type=int, default=2, choices=[1, 2])
+    parser.add_argument("--ticks", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spectators", type=int, default=1)
+    parser.add_argument("--tick-rate", type=int, default=TICK_RATE,
+                        help="ticks per second of wall time, raise it to run the matches faster than real time")
+    args = parser.parse_args()
+
+    hosted, bots, elapsed = asyncio.run(run_loopback(args.matches, args.players, args.ticks, args.seed,
+                                                    args.spectators, args.tick_rate))
+
+    for match in hosted:
+        ticks = match.tick
+        print(f"match {match.number}: {ticks} ticks{', game over' if match.sim.game_over else ''}, "
+              f"{match.snapshot_bytes / ticks:.1f} bytes per snapshot "
+              f"({match.snapshot_bytes / ticks * TICK_RATE * 8 / 1000:.1f} kbit/s per client at {TICK_RATE} Hz), "
+              f"{match.busy_time / ticks * 1000:.3f} ms of server time per tick")
+    for bot in bots:
+        role = "spectator" if bot.slot == SPECTATOR_SLOT else f"player {bot.slot + 1}"
+        print(f"match {bot.match} {role}: {bot.snapshots} snapshots, {bot.bytes_received} bytes, "
+              f"up to tick {bot.tick}, {bot.mismatches} mismatches")
+    print(f"{sum(bot.mismatches for bot in bots)} mismatches in {elapsed:.2f}s")
@@ -1,5 +1,42 @@
+import time
+
+# taken before pygame is imported, for --startup-time
+LAUNCHED = time.perf_counter()
+
+import argparse
+
 from game import Game
+from src.constants import EnemyBehaviour
+
+
+def get_seed(text):
+    """A --seed value, replays store it as an unsigned 64-bit number."""
+    seed = int(text)
+    if not 0 <= seed < 2 ** 64:
+        raise argparse.ArgumentTypeError(f"{seed} is not between 0 and 2**64 - 1")
+    return seed
+
 
 if __name__ == "__main__":
-    game = Game()
+    parser = argparse.ArgumentParser(description="Battle city")
+    parser.add_argument("--dirty-rendering", action="store_true",
+                        help="redraw and update only the parts of the screen that changed")
+    parser.add_argument("--seed", type=get_seed,
+                        help="seed of the game's random generator, random by default")
+    parser.add_argument("--record", metavar="FILE",
+                        help="log the seed and every tick's inputs to a replay file")
+    parser.add_argument("--enemies", choices=[behaviour.name.lower() for behaviour in EnemyBehaviour], default="wander",
+                        help="how enemies find their way: randomly, to the castle or to the castle and the players")
+    parser.add_argument("--profile", action="store_true",
+                        help="time the phases of every frame and print their percentiles on exit or with F9")
+    parser.add_argument("--profile-output", metavar="FILE",
+                        help="also write the frame profile to a JSON file, implies --profile")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="print the time from launch to the first intro frame and to decoded sounds, then quit")
+    args = parser.parse_args()
+
+    game = Game(dirty_rendering=args.dirty_rendering, seed=args.seed, record=args.record,
+                enemy_behaviour=EnemyBehaviour[args.enemies.capitalize()],
+                profile=args.profile, profile_output=args.profile_output,
+                startup_start=LAUNCHED if args.startup_time else None)
     game.load_menu()
@@ -0,0 +1,87 @@
+"""
+Symbolic observations.
+
+ObservationEncoder writes the state of a Simulation into a uint8 tensor of
+CHANNELS x size x size cells, size being the 26 tiles of the map or 52
+half tiles. Tile channels hold 1 where the tile is. Every other channel
+holds 0 where nothing is and value + 1 over the cells an object covers:
+the direction of tanks and bullets, the EnemyType of enemies, the BonusType
+of bonuses and the CastleState of the castle.
+
+The tensor is allocated once, or passed in by the caller, and filled in
+place at every encode.
+"""
+import numpy as np
+
+from src.constants import MAP_SIZE, TILE_SIZE, BulletState, GameSide, TankState, Tile
+
+TILE_CHANNELS = (Tile.Brick, Tile.Steel, Tile.Water, Tile.Grass, Tile.Frozen)
+CHANNELS = tuple(f"tile_{tile.name.lower()}" for tile in TILE_CHANNELS) + (
+    "player0", "player1", "enemy_direction", "enemy_type", "player_bullets", "enemy_bullets", "bonus", "castle")
+CHANNEL_INDEX = {name: n for n, name in enumerate(CHANNELS)}
+# tile values to compare the grid with, one per tile channel
+TILE_VALUES = np.array(TILE_CHANNELS, dtype=np.uint8)[:, None, None]
+
+RESOLUTIONS = (MAP_SIZE, MAP_SIZE * 2)
+
+
+class ObservationEncoder:
+    def __init__(self, size=MAP_SIZE):
+        if size not in RESOLUTIONS:
+            raise ValueError(f"Observations are {' or '.join(map(str, RESOLUTIONS))} cells wide, not {size}")
+        self.size = size
+        self.scale = size // MAP_SIZE
+        self.cell_size = TILE_SIZE // self.scale
+        self.shape = (len(CHANNELS), size, size)
+        self.buffer = np.zeros(self.shape, dtype=np.uint8)
+        # scratch for the tile comparisons, so encoding allocates nothing
+        self.tile_mask = np.zeros((len(TILE_CHANNELS), MAP_SIZE, MAP_SIZE), dtype=bool)
+
+    def encode(self, sim, out=None):
+        """Write sim into out, the encoder's own buffer by default, and return it."""
+        out = self.buffer if out is None else out
+        grid = np.frombuffer(sim.level.map, dtype=np.uint8).reshape(MAP_SIZE, MAP_SIZE)
+
+        tiles = len(TILE_CHANNELS)
+        if self.scale == 1:
+            np.equal(grid, TILE_VALUES, out=out[:tiles].view(np.bool_))
+        else:
+            np.equal(grid, TILE_VALUES, out=self.tile_mask)
+            # every tile covers scale x scale cells
+            cells = out[:tiles].reshape(tiles, MAP_SIZE, self.scale, MAP_SIZE, self.scale)
+            np.copyto(cells, self.tile_mask[:, :, None, :, None])
+
+        out[tiles:] = 0
+
+        for n, player in enumerate(sim.players[:2]):
+            if player.state == TankState.Alive:
+                self._fill(out, f"player{n}", player.rect, player.direction + 1)
+
+        enemy_direction = CHANNEL_INDEX["enemy_direction"]
+        enemy_type = CHANNEL_INDEX["enemy_type"]
+        for enemy in sim.enemies:
+            if enemy.state == TankState.Alive:
+                self._fill_channel(out[enemy_direction], enemy.rect, enemy.direction + 1)
+                self._fill_channel(out[enemy_type], enemy.rect, enemy.type + 1)
+
+        for bullet in sim.bullets:
+            if bullet.state == BulletState.Active:
+                self._fill(out, "player_bullets" if bullet.owner == GameSide.Player else "enemy_bullets",
+                           bullet.rect, bullet.direction + 1)
+
+        for bonus in sim.bonuses:
+            if bonus.active:
+                self._fill(out, "bonus", bonus.rect, bonus.bonus + 1)
+
+        self._fill(out, "castle", sim.castle.rect, sim.castle.state + 1)
+        return out
+
+    def _fill(self, out, channel, rect, value):
+        self._fill_channel(out[CHANNEL_INDEX[channel]], rect, value)
+
+    def _fill_channel(self, channel, rect, value):
+        """Set the cells rect covers, clipped to the map."""
+        x0, y0 = max(rect.left // self.cell_size, 0), max(rect.top // self.cell_size, 0)
+        x1, y1 = (rect.right - 1) // self.cell_size + 1, (rect.bottom - 1) // self.cell_size + 1
+        if x1 > x0 and y1 > y0:
+            channel[y0:y1, x0:x1] = value
@@ -0,0 +1,30 @@
+from src.constants import Direction
+
+
+class Path:
+    """
+    Straight run of a tank, handed out one position per tick.
+
+    Only the origin, the direction, the length and the speed are stored, the
+    positions are computed as the cursor advances. Positions are `speed`
+    pixels apart and never go past `length`. With from_origin the first
+    position is the origin itself, otherwise it is one step away and the last
+    one lands exactly on `length`.
+    """
+    def __init__(self, origin, direction, length, speed, from_origin=True):
+        self.x, self.y = origin
+        self.dx = (direction == Direction.Right) - (direction == Direction.Left)
+        self.dy = (direction == Direction.Down) - (direction == Direction.Up)
+        self.length = length
+        self.speed = speed
+        self.first = 0 if from_origin else 1
+        self.count = -(-length // speed)
+        self.cursor = 0
+
+    def __len__(self):
+        return self.count - self.cursor
+
+    def pop(self):
+        offset = min((self.first + self.cursor) * self.speed, self.length)
+        self.cursor += 1
+        return self.x + self.dx * offset, self.y + self.dy * offset
@@ -0,0 +1,100 @@
+"""
+Pixel observations.
+
+Game(headless=True) draws into an offscreen surface built on a NumPy array
+instead of a window: the array is the surface's own memory, so every frame
+Game.draw renders is readable right away without a flip or a copy.
+PixelObserver exposes the playfield, the 416x416 part of the frame left of
+the sidebar, as an RGB view of that array, and writes it grayscale and/or
+downsampled by an integer factor into a buffer allocated once or passed in
+by the caller.
+"""
+import numpy as np
+import pygame
+
+from src.constants import MAP_SIZE, TILE_SIZE
+
+# XRGB8888 as the bytes lie in memory on little-endian machines, the format of the atlas sprites
+FRAME_FORMAT = "BGRA"
+# channels of a FRAME_FORMAT pixel read as RGB
+RGB_CHANNELS = slice(2, None, -1)
+
+PLAYFIELD_SIZE = MAP_SIZE * TILE_SIZE
+
+# ITU-R BT.601 luma weights in 1/256ths, summing to 256, for the channels of a FRAME_FORMAT pixel
+GRAY_WEIGHTS = np.array([29, 150, 77, 0], dtype=np.uint32)
+
+
+def create_frame(size):
+    """A (height, width, 4) uint8 array and a surface of size drawing straight into it."""
+    width, height = size
+    frame = np.zeros((height, width, 4), dtype=np.uint8)
+    frame[:, :, 3] = 255
+    return frame, pygame.image.frombuffer(frame, size, FRAME_FORMAT)
+
+
+class PixelObserver:
+    """
+    Reads the playfield of the frames a headless Game draws.
+
+    view is the playfield as a (416, 416, 3) RGB view of game.frame, rows
+    first. observe writes it into out: as is, or averaged over factor x
+    factor blocks when downsample is more than 1, and as a single luma
+    channel when grayscale is set.
+    """
+    def __init__(self, game, grayscale=False, downsample=1):
+        if game.frame is None:
+            raise ValueError("Pixel observations need a Game created with headless=True")
+        if downsample < 1 or PLAYFIELD_SIZE % downsample:
+            raise ValueError(f"The {PLAYFIELD_SIZE}px playfield cannot be downsampled by {downsample}")
+        self.grayscale = grayscale
+        self.downsample = downsample
+
+        self.view = game.frame[:PLAYFIELD_SIZE, :PLAYFIELD_SIZE, RGB_CHANNELS]
+        # whole pixels, the padding byte included: contiguous rows sum much faster than the RGB view
+        self.pixels = game.frame[:PLAYFIELD_SIZE, :PLAYFIELD_SIZE]
+
+        size = PLAYFIELD_SIZE // downsample
+        self.shape = (size, size) if grayscale else (size, size, 3)
+        self.buffer = np.zeros(self.shape, dtype=np.uint8)
+
+        # sums of the rows and then the columns of each block, so observing allocates nothing
+        dtype = np.uint16 if downsample * downsample * 255 <= np.iinfo(np.uint16).max else np.uint32
+        self.row_sums = np.zeros((size, PLAYFIELD_SIZE, 4), dtype=dtype)
+        self.sums = np.zeros((size, size, 4), dtype=dtype)
+        self.luma = np.zeros((size, size), dtype=np.uint32)
+
+    def observe(self, out=None):
+        """Write the playfield of the last drawn frame into out, the observer's own buffer by default, and return it."""
+        out = self.buffer if out is None else out
+        factor = self.downsample
+
+        if factor == 1:
+            if not self.grayscale:
+                np.copyto(out, self.view)
+                return out
+            pixels = self.pixels
+        else:
+            pixels = self._sum_blocks()
+
+        if self.grayscale:
+            np.matmul(pixels, GRAY_WEIGHTS, out=self.luma)
+            np.floor_divide(self.luma, 256 * factor * factor, out=out, casting="unsafe")
+        else:
+            np.floor_divide(pixels[:, :, RGB_CHANNELS], factor * factor, out=out, casting="unsafe")
+        return out
+
+    def _sum_blocks(self):
+        """Sum the pixels of every factor x factor block, a strided add per row and column of the block."""
+        factor = self.downsample
+        pixels = self.pixels
+        rows = self.row_sums
+        np.copyto(rows, pixels[0::factor])
+        for n in range(1, factor):
+            np.add(rows, pixels[n::factor], out=rows)
+
+        sums = self.sums
+        np.copyto(sums, rows[:, 0::factor])
+        for n in range(1, factor):
+            np.add(sums, rows[:, n::factor], out=sums)
+        return sums
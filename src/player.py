@@ -2,14 +2,12 @@ import pygame
 
 from src.tank import Tank
 
-from src.constants import Direction, TankState
+from src.constants import Direction, GameSide, Sprite, TankState
 
 
 class Player(Tank):
-    def __init__(self, game, level, type, position=None, direction=None, filename=None):
+    def __init__(self, game, level, type, position=None, direction=None, number=0):
         Tank.__init__(self, game, level, type, position=None, direction=None)
-        if filename is None:
-            filename = (0, 0, 16 * 2, 16 * 2)
         self.start_position = position
         self.start_direction = direction
         self.lives = 3
@@ -21,11 +19,8 @@ class Player(Tank):
             "enemy2": 0,
             "enemy3": 0
         }
-        self.image = self.game.sprites.subsurface(filename)
-        self.image_up = self.image
-        self.image_left = pygame.transform.rotate(self.image, 90)
-        self.image_down = pygame.transform.rotate(self.image, 180)
-        self.image_right = pygame.transform.rotate(self.image, 270)
+        self.set_images(Sprite.Player, number)
+        self.image = self.image_up
 
         if direction is None:
             self.rotate(Direction.Up, False)
@@ -36,7 +31,8 @@ class Player(Tank):
         if self.state == TankState.Exploding:
             if not self.explosion.active:
                 self.state = TankState.Dead
-                del self.explosion
+                self.game.explosion_pool.release(self.explosion)
+                self.explosion = None
 
         if self.state != TankState.Alive:
             return
@@ -67,26 +63,26 @@ class Player(Tank):
 
         player_rect = pygame.Rect(new_position, [26, 26])
 
-        if player_rect.collidelist(self.level.obstacle_rects) != -1:
+        if self.level.collides(player_rect):
             return
 
-        for player in self.game.players:
-            if player != self and player.state == TankState.Alive and player_rect.colliderect(player.rect) is True:
+        for tank in self.game.tank_hash.query(player_rect):
+            if tank.side == GameSide.Player:
+                if tank != self and tank.state == TankState.Alive:
+                    return
+            else:
                 return
 
-        for enemy in self.game.enemies:
-            if player_rect.colliderect(enemy.rect) is True:
-                return
-
-        for bonus in self.game.bonuses:
-            if player_rect.colliderect(bonus.rect) is True:
-                self.bonus = bonus
+        for bonus in self.game.bonus_hash.query(player_rect):
+            self.bonus = bonus
 
         self.rect.topleft = (new_position[0], new_position[1])
+        self.game.tank_hash.update(self)
 
     def reset(self):
         self.rotate(self.start_direction, False)
         self.rect.topleft = self.start_position
+        self.game.tank_hash.update(self)
         self.superpowers = 0
         self.max_active_bullets = 1
         self.health = 100
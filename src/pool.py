@@ -0,0 +1,42 @@
+class Pool:
+    """
+    Free list of reusable game objects.
+
+    acquire hands out a released object reset in place with the given
+    arguments, or builds a new one when the pool is empty. Objects must be
+    released exactly once and not used after that.
+    """
+    def __init__(self, cls):
+        self.cls = cls
+        self.free = []
+        self.created = 0
+        self.reused = 0
+        self.in_use = 0
+        self.peak = 0
+
+    def acquire(self, *args, **kwargs):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args, **kwargs)
+            self.reused += 1
+        else:
+            obj = self.cls(*args, **kwargs)
+            self.created += 1
+
+        self.in_use += 1
+        if self.in_use > self.peak:
+            self.peak = self.in_use
+        return obj
+
+    def release(self, obj):
+        self.in_use -= 1
+        self.free.append(obj)
+
+    def get_stats(self):
+        return {
+            "created": self.created,
+            "reused": self.reused,
+            "in_use": self.in_use,
+            "free": len(self.free),
+            "peak": self.peak
+        }
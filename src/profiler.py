@@ -0,0 +1,123 @@
+import json
+import sys
+import time
+
+# values below 2 ** SUB_BUCKET_BITS are counted exactly, above that every power of two is split
+# into 2 ** (SUB_BUCKET_BITS - 1) buckets, so a bucket is never wider than 1/64 of its values
+SUB_BUCKET_BITS = 7
+
+PHASES = ("events", "players", "enemies", "bonus_death", "bullets", "gtimer", "draw", "frame")
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    """
+    Latency histogram with log-linear buckets in the style of HdrHistogram:
+    constant relative precision from nanoseconds to seconds in a few hundred
+    counters, recording is a dict update.
+    """
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def _get_bucket(value):
+        shift = value.bit_length() - SUB_BUCKET_BITS
+        if shift <= 0:
+            return value
+        return (shift << SUB_BUCKET_BITS) | (value >> shift)
+
+    @staticmethod
+    def _get_highest_value(bucket):
+        shift = bucket >> SUB_BUCKET_BITS
+        if shift == 0:
+            return bucket
+        return (((bucket & ((1 << SUB_BUCKET_BITS) - 1)) + 1) << shift) - 1
+
+    def record(self, value):
+        bucket = self._get_bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total += 1
+        if value > self.max:
+            self.max = value
+
+    def get_percentile(self, percentile):
+        """The highest value of the bucket the percentile falls into, never above max."""
+        if self.total == 0:
+            return 0
+        rank = max(1, -(-self.total * percentile // 100))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self._get_highest_value(bucket), self.max)
+        return self.max
+
+
+class FrameProfiler:
+    """
+    Wall time of every phase of a frame, per stage.
+
+    begin starts a frame, each mark closes the phase that ran since the
+    previous mark and end records the whole frame. Times come from the
+    monotonic perf_counter_ns clock and go into one Histogram per stage and
+    phase. The game holds None instead of a profiler when profiling is off,
+    so the cost then is one comparison per phase.
+    """
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.histograms = {}
+        self.current = None
+        self.frame_start = 0
+        self.last = 0
+
+    def begin(self, stage):
+        self.current = self.histograms.get(stage)
+        if self.current is None:
+            self.current = self.histograms[stage] = {phase: Histogram() for phase in PHASES}
+        self.frame_start = self.last = time.perf_counter_ns()
+
+    def mark(self, phase):
+        if self.current is None:
+            return
+        now = time.perf_counter_ns()
+        self.current[phase].record(now - self.last)
+        self.last = now
+
+    def end(self):
+        if self.current is None:
+            return
+        self.current["frame"].record(time.perf_counter_ns() - self.frame_start)
+        self.current = None
+
+    def get_report(self):
+        """Frames, percentiles and max in microseconds by stage and phase."""
+        report = {}
+        for stage, histograms in sorted(self.histograms.items()):
+            report[stage] = {}
+            for phase, histogram in histograms.items():
+                if histogram.total == 0:
+                    continue
+                summary = {"count": histogram.total}
+                for percentile in PERCENTILES:
+                    summary[f"p{percentile}"] = round(histogram.get_percentile(percentile) / 1000, 1)
+                summary["max"] = round(histogram.max / 1000, 1)
+                report[stage][phase] = summary
+        return report
+
+    def dump(self, file=None):
+        """Print the report, and write it as JSON when the profiler has a filename."""
+        file = sys.stderr if file is None else file
+        report = self.get_report()
+        columns = [f"p{percentile}" for percentile in PERCENTILES] + ["max"]
+        for stage, phases in report.items():
+            frames = phases.get("frame", {}).get("count", 0)
+            print(f"Stage {stage}, {frames} frames, microseconds", file=file)
+            print(f"  {'phase':12}" + "".join(f"{column:>10}" for column in columns), file=file)
+            for phase, summary in phases.items():
+                print(f"  {phase:12}" + "".join(f"{summary[column]:10.1f}" for column in columns), file=file)
+
+        if self.filename is not None:
+            with open(self.filename, "w") as f:
+                json.dump(report, f, indent=2)
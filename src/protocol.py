@@ -0,0 +1,205 @@
+"""
+Network protocol of the multiplayer server and its clients.
+
+The server runs the simulation and sends each client what it needs to draw
+every tick: the HUD, the tile map and the sprites every object drew, each
+object keyed by a stable id. Snapshots are deltas against the previous
+tick: only the HUD when it changed, the changed tiles and the objects whose
+sprites or positions changed, plus the ids of the objects gone. TCP keeps
+them in order, so a client only needs a keyframe when it joins.
+
+Every message is a header, type byte and payload size as uint16, then the
+payload, all little-endian:
+    JOIN        client -> server, role byte: PLAYER or SPECTATOR
+    INPUT       client -> server, an input byte as in replays, see src/replay.py
+    WELCOME     server -> client, match number as uint16, player slot (SPECTATOR_SLOT for spectators),
+                players number, tick rate and number of sprites as uint16
+    SNAPSHOT    server -> client, tick as uint32, section flags byte, then the flagged sections in order:
+        HUD_SECTION     stage, enemies left, HUD flags, lives of both players, scores of both players as uint32
+        TILE_MAP        the whole map, one byte per cell
+        TILE_CHANGES    count as uint16, then cell as uint16 and tile byte per changed tile
+        OBJECTS         count as uint16, then per object id as uint16, part count byte and
+                        per part sprite as uint16, x and y as int16
+        REMOVED         count as uint16, then the ids as uint16
+
+A sprite indexes the registry's images in key order, see get_sprite_keys.
+Sprites from LABEL_SPRITE on are score labels showing sprite - LABEL_SPRITE
+points. An object id is its layer, its position in the drawing order, shifted
+by LAYER_SHIFT plus a slot within the layer.
+"""
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+from src.constants import MAP_SIZE
+
+PORT = 5015
+
+HEADER = struct.Struct("<BH")
+JOIN, INPUT, WELCOME, SNAPSHOT = range(1, 5)
+
+PLAYER, SPECTATOR = range(2)
+SPECTATOR_SLOT = 0xff
+
+WELCOME_BODY = struct.Struct("<HBBHH")
+SNAPSHOT_HEADER = struct.Struct("<IB")
+HUD = struct.Struct("<BBB2B2I")
+COUNT = struct.Struct("<H")
+TILE_CHANGE = struct.Struct("<HB")
+OBJECT = struct.Struct("<HB")
+PART = struct.Struct("<Hhh")
+OBJECT_ID = struct.Struct("<H")
+
+# snapshot sections
+KEYFRAME = 0x01
+HUD_SECTION = 0x02
+TILE_MAP = 0x04
+TILE_CHANGES = 0x08
+OBJECTS = 0x10
+REMOVED = 0x20
+
+# HUD flags
+GAME_OVER = 0x01
+CLEARED = 0x02
+
+LAYERS = ("castle", "enemies", "players", "labels", "bullets", "bonuses")
+LAYER_SHIFT = 12
+LABEL_SPRITE = 0x8000
+
+MAP_CELLS = MAP_SIZE * MAP_SIZE
+
+Snapshot = namedtuple("Snapshot", "tick keyframe hud tile_map tile_changes objects removed")
+
+
+def get_sprite_keys(registry):
+    """Registry keys in the order sprites are numbered on the wire, the same on every machine."""
+    return sorted(registry.images)
+
+
+def get_object_id(layer, slot):
+    return LAYERS.index(layer) << LAYER_SHIFT | slot
+
+
+def pack_message(kind, payload=b""):
+    return HEADER.pack(kind, len(payload)) + payload
+
+
+async def read_message(reader):
+    """The type and payload of the next message, raises asyncio.IncompleteReadError when the peer left."""
+    kind, size = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return kind, await reader.readexactly(size)
+
+
+class WorldState:
+    """
+    Everything a client draws for one tick: the HUD fields, the tile map
+    and the (sprite, x, y) parts of every object by id.
+    """
+    def __init__(self, hud=None, tiles=None, objects=None):
+        self.hud = hud
+        self.tiles = bytearray(MAP_CELLS) if tiles is None else tiles
+        self.objects = {} if objects is None else objects
+
+    def __eq__(self, other):
+        return (self.hud, bytes(self.tiles), self.objects) == (other.hud, bytes(other.tiles), other.objects)
+
+    def apply(self, snapshot):
+        """Bring the state to the tick of a decoded snapshot."""
+        if snapshot.keyframe:
+            self.objects.clear()
+        if snapshot.hud is not None:
+            self.hud = snapshot.hud
+        if snapshot.tile_map is not None:
+            self.tiles[:] = snapshot.tile_map
+        for cell, tile in snapshot.tile_changes:
+            self.tiles[cell] = tile
+        self.objects.update(snapshot.objects)
+        for object_id in snapshot.removed:
+            del self.objects[object_id]
+
+
+def encode_snapshot(tick, state, previous=None):
+    """The SNAPSHOT message bringing a client from previous to state, a keyframe when previous is None."""
+    sections = 0
+    body = bytearray()
+
+    if previous is None:
+        sections |= KEYFRAME
+        previous = WorldState()
+
+    if state.hud != previous.hud:
+        sections |= HUD_SECTION
+        body += HUD.pack(*state.hud)
+
+    if state.tiles != previous.tiles:
+        cells = np.flatnonzero(np.frombuffer(state.tiles, dtype=np.uint8) !=
+                               np.frombuffer(previous.tiles, dtype=np.uint8))
+        # a new stage changes most of the map, sending it whole is smaller then
+        if sections & KEYFRAME or len(cells) * TILE_CHANGE.size >= MAP_CELLS:
+            sections |= TILE_MAP
+            body += state.tiles
+        else:
+            sections |= TILE_CHANGES
+            body += COUNT.pack(len(cells))
+            for cell in cells.tolist():
+                body += TILE_CHANGE.pack(cell, state.tiles[cell])
+
+    updated = [(object_id, parts) for object_id, parts in state.objects.items()
+               if previous.objects.get(object_id) != parts]
+    if updated:
+        sections |= OBJECTS
+        body += COUNT.pack(len(updated))
+        for object_id, parts in updated:
+            body += OBJECT.pack(object_id, len(parts))
+            for part in parts:
+                body += PART.pack(*part)
+
+    removed = [object_id for object_id in previous.objects if object_id not in state.objects]
+    if removed:
+        sections |= REMOVED
+        body += COUNT.pack(len(removed))
+        for object_id in removed:
+            body += OBJECT_ID.pack(object_id)
+
+    return pack_message(SNAPSHOT, SNAPSHOT_HEADER.pack(tick, sections) + body)
+
+
+def decode_snapshot(payload):
+    tick, sections = SNAPSHOT_HEADER.unpack_from(payload)
+    pos = SNAPSHOT_HEADER.size
+
+    hud = None
+    if sections & HUD_SECTION:
+        hud = HUD.unpack_from(payload, pos)
+        pos += HUD.size
+
+    tile_map = None
+    if sections & TILE_MAP:
+        tile_map = payload[pos:pos + MAP_CELLS]
+        pos += MAP_CELLS
+
+    tile_changes = []
+    if sections & TILE_CHANGES:
+        count, = COUNT.unpack_from(payload, pos)
+        pos += COUNT.size
+        tile_changes = list(TILE_CHANGE.iter_unpack(payload[pos:pos + count * TILE_CHANGE.size]))
+        pos += count * TILE_CHANGE.size
+
+    objects = {}
+    if sections & OBJECTS:
+        count, = COUNT.unpack_from(payload, pos)
+        pos += COUNT.size
+        for _ in range(count):
+            object_id, part_count = OBJECT.unpack_from(payload, pos)
+            pos += OBJECT.size
+            objects[object_id] = tuple(PART.iter_unpack(payload[pos:pos + part_count * PART.size]))
+            pos += part_count * PART.size
+
+    removed = []
+    if sections & REMOVED:
+        count, = COUNT.unpack_from(payload, pos)
+        pos += COUNT.size
+        removed = [object_id for object_id, in OBJECT_ID.iter_unpack(payload[pos:pos + count * OBJECT_ID.size])]
+
+    return Snapshot(tick, bool(sections & KEYFRAME), hud, tile_map, tile_changes, objects, removed)
@@ -0,0 +1,150 @@
+"""
+Input log replays.
+
+A replay stores the seed and enemy behaviour of a session and, for every
+tick, the time that passed and each player's input. Since all randomness comes from the seeded
+generator, feeding them back to a Simulation reproduces the session exactly,
+as fast as it can run.
+
+File layout, little-endian:
+    header      b"BCRP", version byte, seed as uint64, enemy behaviour byte
+    new game    0xff, players number byte
+    tick        one input byte per player, time passed as a varint
+
+An input byte holds the direction + 1 (0 when standing still) in its low
+three bits and the fire button in bit 3.
+
+Replay a file from src with: PYTHONPATH=.. python -m src.replay FILE
+"""
+import struct
+import time
+
+from src.constants import Direction, EnemyBehaviour
+
+MAGIC = b"BCRP"
+REPLAY_VERSION = 2
+HEADER = struct.Struct("<4sBQB")
+NEW_GAME = 0xff
+FIRE_BIT = 0x08
+
+# ticks written between flushes, so a killed process loses at most this many
+FLUSH_TICKS = 50
+
+
+def encode_input(direction, fire):
+    return (0 if direction is None else direction + 1) | (FIRE_BIT if fire else 0)
+
+
+def decode_input(value):
+    direction = value & 0x07
+    return (None if direction == 0 else Direction(direction - 1)), bool(value & FIRE_BIT)
+
+
+class ReplayWriter:
+    def __init__(self, filename, seed, enemy_behaviour=EnemyBehaviour.Wander):
+        self.file = open(filename, "wb")
+        self.file.write(HEADER.pack(MAGIC, REPLAY_VERSION, seed, enemy_behaviour))
+        self.players_number = 0
+        self.unflushed = 0
+
+    def start_game(self, players_number):
+        self.players_number = players_number
+        self.file.write(bytes([NEW_GAME, players_number]))
+        self.file.flush()
+
+    def write_tick(self, inputs, time_passed):
+        record = bytearray(encode_input(direction, fire) for direction, fire in inputs)
+        record.extend(bytes(self.players_number - len(record)))
+        while time_passed > 0x7f:
+            record.append(time_passed & 0x7f | 0x80)
+            time_passed >>= 7
+        record.append(time_passed)
+        self.file.write(record)
+
+        self.unflushed += 1
+        if self.unflushed >= FLUSH_TICKS:
+            self.file.flush()
+            self.unflushed = 0
+
+    def close(self):
+        self.file.close()
+
+
+def read_replay(filename):
+    """
+    The seed, the enemy behaviour and the events of a replay: ("game",
+    players_number) when a new game starts and ("tick", inputs, time_passed)
+    for every step. A record cut off at the end of the file, as a killed
+    session leaves it, is dropped.
+    """
+    with open(filename, "rb") as f:
+        data = f.read()
+
+    if len(data) < HEADER.size:
+        raise ValueError(f"{filename} is not a version {REPLAY_VERSION} replay")
+    magic, version, seed, enemy_behaviour = HEADER.unpack_from(data)
+    if magic != MAGIC or version != REPLAY_VERSION:
+        raise ValueError(f"{filename} is not a version {REPLAY_VERSION} replay")
+
+    events = []
+    players_number = 0
+    pos = HEADER.size
+    while pos < len(data):
+        if data[pos] == NEW_GAME:
+            if pos + 1 >= len(data):
+                break
+            players_number = data[pos + 1]
+            events.append(("game", players_number))
+            pos += 2
+            continue
+
+        inputs = [decode_input(value) for value in data[pos:pos + players_number]]
+        pos += players_number
+        time_passed = shift = 0
+        while pos < len(data):
+            byte = data[pos]
+            pos += 1
+            time_passed |= (byte & 0x7f) << shift
+            shift += 7
+            if byte < 0x80:
+                break
+        else:
+            break
+        events.append(("tick", inputs, time_passed))
+
+    return seed, EnemyBehaviour(enemy_behaviour), events
+
+
+def run_replay(filename):
+    """Play a replay back on a headless Simulation as fast as possible and return it."""
+    from src.simulation import Simulation
+
+    seed, enemy_behaviour, events = read_replay(filename)
+    sim = Simulation(seed=seed, enemy_behaviour=enemy_behaviour)
+
+    for event in events:
+        if event[0] == "game":
+            sim.new_game(event[1])
+        else:
+            if not sim.running:
+                sim.start_stage()
+            sim.step(event[1], event[2])
+
+    return sim
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Play a Battle city replay back without a window")
+    parser.add_argument("filename")
+    args = parser.parse_args()
+
+    ticks = sum(1 for event in read_replay(args.filename)[2] if event[0] == "tick")
+
+    start = time.perf_counter()
+    replayed = run_replay(args.filename)
+    elapsed = time.perf_counter() - start
+
+    print(f"Replayed {ticks} ticks up to stage {replayed.stage} in {elapsed:.2f}s ({ticks / elapsed:.0f} ticks/s), "
+          f"scores {[player.score for player in replayed.players]}")
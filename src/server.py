@@ -0,0 +1,322 @@
+"""
+Authoritative multiplayer server.
+
+Clients join over TCP, see src/protocol.py. Players fill the slots of a
+match, which starts once all of them are taken, and the next players open a
+new match; spectators watch the newest one. One loop steps every running
+match at a fixed tick rate with the inputs its players sent since the last
+tick. Each tick a match encodes a single delta snapshot and the same bytes
+go to all of its clients, a client that falls too far behind is dropped.
+
+Run from src with: PYTHONPATH=.. python -m src.server [--port N] [--players 1|2]
+"""
+import asyncio
+import random
+import time
+from collections import namedtuple
+
+import pygame
+
+from src.constants import TICK_MS, TICK_RATE, EnemyBehaviour
+from src.protocol import (CLEARED, GAME_OVER, INPUT, JOIN, LABEL_SPRITE, LAYERS, PORT, SPECTATOR, SPECTATOR_SLOT,
+                          WELCOME, WELCOME_BODY, WorldState, encode_snapshot, get_object_id, get_sprite_keys,
+                          pack_message, read_message)
+from src.replay import decode_input
+from src.simulation import Simulation
+
+# bytes waiting to be sent to a client before it is dropped as too slow, seconds of snapshots
+MAX_BACKLOG = 64 * 1024
+
+# what the server's label font renders: the points, the client renders the text
+LabelImage = namedtuple("LabelImage", "points")
+
+
+class LabelText:
+    """Stands in for the label font of a match, labels are sent as their points."""
+    @staticmethod
+    def render(text, antialias, color):
+        return LabelImage(int(text))
+
+
+class DisplayRecorder:
+    """
+    Stands in for the screen of a match. Objects draw into it as they would
+    on a window and it keeps the (sprite, x, y) of every blit instead.
+    """
+    def __init__(self, registry):
+        self.sprites = {id(registry.images[key]): n for n, key in enumerate(get_sprite_keys(registry))}
+        self.parts = []
+
+    def blit(self, image, dest, area=None):
+        x, y = int(dest[0]), int(dest[1])
+        if isinstance(image, LabelImage):
+            self.parts.append((LABEL_SPRITE + image.points, x, y))
+            return pygame.Rect(x, y, 0, 0)
+        self.parts.append((self.sprites[id(image)], x, y))
+        return pygame.Rect((x, y), image.get_size())
+
+    def record(self, obj):
+        """The parts obj draws, empty when it is not visible."""
+        self.parts = []
+        obj.draw()
+        return tuple(self.parts)
+
+
+class SlotMap:
+    """Slots of the objects of one layer, an object keeps its slot, and so its id, while it lives."""
+    def __init__(self):
+        self.slots = {}
+
+    def assign(self, objects):
+        """The slot of each object, the lowest free ones going to the new objects."""
+        slots = {}
+        for obj in objects:
+            slot = self.slots.get(id(obj))
+            if slot is not None:
+                slots[id(obj)] = slot
+
+        taken = set(slots.values())
+        free = 0
+        for obj in objects:
+            if id(obj) not in slots:
+                while free in taken:
+                    free += 1
+                slots[id(obj)] = free
+                taken.add(free)
+
+        self.slots = slots
+        return [slots[id(obj)] for obj in objects]
+
+
+class Match:
+    def __init__(self, number, players_number=2, seed=None, enemy_behaviour=EnemyBehaviour.Wander):
+        self.number = number
+        self.sim = Simulation(players_number, seed, enemy_behaviour)
+        self.recorder = DisplayRecorder(self.sim.sprite_registry)
+        self.sim.screen = self.recorder
+        self.sim.label_text = LabelText()
+        self.slot_maps = {layer: SlotMap() for layer in LAYERS}
+
+        # writers of the connected players by slot and of every client
+        self.players = [None] * players_number
+        self.clients = []
+        # direction held by each player and whether fire was pressed since the last tick
+        self.inputs = [[None, False] for _ in range(players_number)]
+
+        self.tick = 0
+        # what the clients were last sent
+        self.state = None
+        self.started = False
+        self.finished = False
+
+        self.snapshot_bytes = 0
+        self.busy_time = 0.0
+
+    def get_free_slot(self):
+        return next((slot for slot, writer in enumerate(self.players) if writer is None), None)
+
+    def join(self, writer, slot=SPECTATOR_SLOT):
+        if slot != SPECTATOR_SLOT:
+            self.players[slot] = writer
+        self.clients.append(writer)
+
+    def leave(self, writer):
+        if writer in self.clients:
+            self.clients.remove(writer)
+        if writer in self.players:
+            slot = self.players.index(writer)
+            self.players[slot] = None
+            self.inputs[slot] = [None, False]
+            # a match without players is over, one not started yet waits for a replacement
+            if self.started and not any(self.players):
+                self.finished = True
+
+    def set_input(self, slot, value):
+        direction, fire = decode_input(value)
+        self.inputs[slot][0] = direction
+        self.inputs[slot][1] |= fire
+
+    def start(self):
+        self.sim.new_game(self.sim.players_number)
+        self.started = True
+
+    def step(self):
+        """Advance one tick and return the snapshot to send, the match is finished once the game is over."""
+        start = time.perf_counter()
+        sim = self.sim
+        inputs = [tuple(pending) for pending in self.inputs]
+        for pending in self.inputs:
+            pending[1] = False
+
+        sim.step(inputs, TICK_MS)
+        if not sim.running:
+            if sim.game_over:
+                self.finished = True
+            else:
+                sim.start_stage()
+        self.tick += 1
+
+        state = self.capture()
+        message = encode_snapshot(self.tick, state, self.state)
+        self.state = state
+
+        self.snapshot_bytes += len(message)
+        self.busy_time += time.perf_counter() - start
+        return message
+
+    def capture(self):
+        """The WorldState of the current tick, objects recorded in the order Game draws them."""
+        sim = self.sim
+        lives = [0, 0]
+        scores = [0, 0]
+        for n, player in enumerate(sim.players[:2]):
+            lives[n] = max(player.lives, 0)
+            scores[n] = player.score
+        flags = (GAME_OVER if sim.game_over else 0) | (0 if sim.active else CLEARED)
+        hud = (sim.stage, len(sim.level.enemies_left) + len(sim.enemies), flags, *lives, *scores)
+
+        objects = {}
+        layers = {"castle": [sim.castle], "enemies": sim.enemies, "players": sim.players, "labels": sim.labels,
+                  "bullets": sim.bullets, "bonuses": sim.bonuses}
+        for layer in LAYERS:
+            layer_objects = layers[layer]
+            for obj, slot in zip(layer_objects, self.slot_maps[layer].assign(layer_objects)):
+                parts = self.recorder.record(obj)
+                if parts:
+                    objects[get_object_id(layer, slot)] = parts
+
+        return WorldState(hud, bytes(sim.level.map), objects)
+
+    def broadcast(self, message):
+        for writer in list(self.clients):
+            if writer.transport.get_write_buffer_size() > MAX_BACKLOG:
+                self.leave(writer)
+                writer.close()
+            else:
+                writer.write(message)
+
+    def close(self):
+        for writer in self.clients:
+            writer.close()
+        self.clients.clear()
+
+
+class Server:
+    """
+    Hosts matches of players_number players. Match n is seeded with seed + n.
+    on_tick, when set, is called with each match and its WorldState after
+    every tick, before the snapshot is sent.
+    """
+    def __init__(self, players_number=2, seed=None, enemy_behaviour=EnemyBehaviour.Wander, tick_rate=TICK_RATE,
+                 on_tick=None):
+        self.players_number = players_number
+        self.seed = random.randrange(2 ** 62) if seed is None else seed
+        self.enemy_behaviour = enemy_behaviour
+        self.tick_rate = tick_rate
+        self.on_tick = on_tick
+
+        self.matches = []
+        self.match_count = 0
+        self.sprite_count = 0
+        self.server = None
+        self.ticker = None
+
+    async def start(self, host="127.0.0.1", port=PORT):
+        """Listen on host and port, 0 for any free one, and return the port."""
+        self.server = await asyncio.start_server(self._handle_client, host, port)
+        self.ticker = asyncio.create_task(self._run_ticks())
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.ticker.cancel()
+        self.server.close()
+        for match in self.matches:
+            match.close()
+        self.matches.clear()
+        await self.server.wait_closed()
+
+    def _get_match(self, role):
+        """The match a new client goes to and its slot there."""
+        if role == SPECTATOR:
+            if self.matches:
+                return self.matches[-1], SPECTATOR_SLOT
+        else:
+            for match in self.matches:
+                slot = match.get_free_slot()
+                if slot is not None and not match.finished:
+                    return match, slot
+
+        match = Match(self.match_count, self.players_number, self.seed + self.match_count, self.enemy_behaviour)
+        self.match_count += 1
+        self.sprite_count = len(match.recorder.sprites)
+        self.matches.append(match)
+        return match, SPECTATOR_SLOT if role == SPECTATOR else 0
+
+    async def _handle_client(self, reader, writer):
+        match = None
+        try:
+            kind, payload = await read_message(reader)
+            if kind != JOIN or len(payload) != 1:
+                return
+            match, slot = self._get_match(payload[0])
+            match.join(writer, slot)
+            writer.write(pack_message(WELCOME, WELCOME_BODY.pack(match.number, slot, self.players_number,
+                                                                 self.tick_rate, self.sprite_count)))
+            if match.state is not None:
+                writer.write(encode_snapshot(match.tick, match.state))
+            if not match.started and match.get_free_slot() is None:
+                match.start()
+
+            while True:
+                kind, payload = await read_message(reader)
+                if kind == INPUT and slot != SPECTATOR_SLOT and len(payload) == 1:
+                    match.set_input(slot, payload[0])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if match is not None:
+                match.leave(writer)
+            writer.close()
+
+    async def _run_ticks(self):
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.tick_rate
+        next_tick = loop.time()
+        while True:
+            for match in list(self.matches):
+                if match.started:
+                    message = match.step()
+                    if self.on_tick is not None:
+                        self.on_tick(match, match.state)
+                    match.broadcast(message)
+                if match.finished:
+                    match.close()
+                    self.matches.remove(match)
+
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                # too slow to keep up, the next ticks are late rather than rushed
+                next_tick -= delay
+                delay = 0
+            await asyncio.sleep(delay)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Host Battle city matches for clients on other processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--players", type=int, default=2, choices=[1, 2], help="players of each match")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--enemies", choices=[behaviour.name.lower() for behaviour in EnemyBehaviour], default="wander")
+    args = parser.parse_args()
+
+    async def serve():
+        server = Server(args.players, args.seed, EnemyBehaviour[args.enemies.capitalize()])
+        port = await server.start(args.host, args.port)
+        print(f"Serving {args.players} player matches on {args.host}:{port}")
+        await server.ticker
+
+    asyncio.run(serve())
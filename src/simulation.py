@@ -0,0 +1,343 @@
+import random
+
+import pygame
+
+from src.atlas import load_sprite_registry
+from src.castle import Castle
+from src.level import Level
+from src.player import Player
+from src.enemy import Enemy
+from src.flow_field import FlowField
+from src.bullet import Bullet
+from src.audio import Audio
+from src.bullet_engine import BulletEngine
+from src.explosion import Explosion
+from src.label import Label
+from src.pool import Pool
+from src.spatial_hash import SpatialHash
+from src.text_cache import TextCache
+from src.timer import Timer
+
+from src.constants import PLAYER_POSITIONS, TICK_MS, BonusType, Direction, EnemyBehaviour, GameSide, TankState, Tile
+
+
+class Simulation:
+    """
+    Game state and rules without a window, a clock or a mixer.
+
+    `step` advances the world by one tick, so the simulation can be driven
+    as fast as the caller wants. Game builds the display on top of it.
+    All randomness comes from self.random, so a seed and the inputs of every
+    step reproduce a run exactly.
+    """
+    def __init__(self, players_number=1, seed=None, enemy_behaviour=EnemyBehaviour.Wander):
+        # labels render their text with a system font, looked up once and shared by all of them
+        pygame.font.init()
+        self.label_text = TextCache(pygame.font.SysFont("Arial", 13))
+        self.sprite_registry = load_sprite_registry()
+
+        if seed is None:
+            seed = random.randrange(2 ** 63)
+        self.seed = seed
+        self.random = random.Random(seed)
+
+        self.players = []
+        self.enemies = []
+        self.bullets = []
+        self.bonuses = []
+        self.labels = []
+        self.level = None
+
+        # broadphase for collisions between moving objects
+        self.tank_hash = SpatialHash()
+        self.bonus_hash = SpatialHash()
+
+        # enemies share one distance field to their targets instead of wandering
+        self.flow_field = None
+        if enemy_behaviour != EnemyBehaviour.Wander:
+            self.flow_field = FlowField(self, include_players=enemy_behaviour == EnemyBehaviour.Hunt)
+
+        # bullets are moved and collided in batches, see BulletEngine
+        self.bullet_engine = BulletEngine(self)
+
+        # shots, their explosions and score popups are recycled instead of allocated per shot
+        self.bullet_pool = Pool(Bullet)
+        self.explosion_pool = Pool(Explosion)
+        self.label_pool = Pool(Label)
+
+        self.play_sounds = False
+        self.sounds = {}
+        # sound requests of a tick, Game plays them after each step
+        self.audio = Audio(self.sounds)
+
+        self.gtimer = Timer()
+
+        # a FrameProfiler when the phases of each frame are timed
+        self.profiler = None
+
+        self.game_over = False
+        self.running = True
+        self.active = True
+        self.time_freeze = False
+
+        self.stage = 0
+        self.players_number = players_number
+
+        self.castle = Castle(self)
+
+    def new_game(self, players_number, stage=None, seed=None):
+        """Start a new game the way the menu does, on stage or the first one, reseeded when seed is given."""
+        if seed is not None:
+            self.seed = seed
+            self.random.seed(seed)
+        self.stage = 0
+        self.players.clear()
+        self.players_number = players_number
+        self.start_stage(stage)
+
+    def start_stage(self, stage=None):
+        self._clear_game_objects_for_next_level()
+        self.stage = self.stage + 1 if stage is None else stage
+        self.level = Level(self, self.stage)
+        self.time_freeze = False
+
+        enemies_count_on_level = self._get_enemies_count_by_level()
+
+        self.level.enemies_left = ([0] * enemies_count_on_level[0] +
+                                   [1] * enemies_count_on_level[1] +
+                                   [2] * enemies_count_on_level[2] +
+                                   [3] * enemies_count_on_level[3])
+        self.random.shuffle(self.level.enemies_left)
+
+        if self.play_sounds:
+            self.audio.play("gamestart")
+            self.gtimer.add(4330, lambda: self.audio.play("background", -1), 1)
+
+        self._reload_players()
+
+        self.gtimer.add(3000, lambda: self._spawn_enemy())
+
+        self.game_over = False
+        self.running = True
+        self.active = True
+
+    def step(self, inputs=None, time_passed=TICK_MS):
+        """
+        Advance the world by one tick.
+
+        inputs holds one (direction, fire) pair per player, direction being
+        a Direction or None when the player is standing still.
+        """
+        self.step_tanks(inputs, time_passed)
+        self.step_rest(self.bullet_engine.update(), time_passed)
+
+    def step_tanks(self, inputs=None, time_passed=TICK_MS):
+        """The part of a tick before the bullets move: players, enemies, bonuses and deaths."""
+        if inputs is None:
+            inputs = ()
+        inputs = list(inputs) + [(None, False)] * (len(self.players) - len(inputs))
+        profiler = self.profiler
+
+        if not self.game_over and self.active:
+            for player, (direction, fire) in zip(self.players, inputs):
+                if fire and player.state == TankState.Alive:
+                    if player.fire() and self.play_sounds:
+                        self.audio.play("fire")
+
+        for player, (direction, fire) in zip(self.players, inputs):
+            if player.state == TankState.Alive and not self.game_over and self.active:
+                if direction is not None:
+                    player.move(direction)
+            player.update(time_passed)
+        if profiler is not None:
+            profiler.mark("players")
+
+        for enemy in self.enemies:
+            if enemy.state == TankState.Dead and not self.game_over and self.active:
+                self.enemies.remove(enemy)
+                self.tank_hash.remove(enemy)
+                if len(self.level.enemies_left) == 0 and len(self.enemies) == 0:
+                    self._finish_level()
+            else:
+                enemy.update(time_passed)
+        if profiler is not None:
+            profiler.mark("enemies")
+
+        if not self.game_over and self.active:
+            for player in self.players:
+                if player.state == TankState.Alive:
+                    if player.bonus is not None and player.side == GameSide.Player:
+                        self._trigger_bonus(player.bonus, player)
+                        player.bonus = None
+                elif player.state == TankState.Dead:
+                    self.superpowers = 0
+                    player.lives -= 1
+                    if player.lives > 0:
+                        self._respawn_player(player)
+                    else:
+                        self._game_over()
+        if profiler is not None:
+            profiler.mark("bonus_death")
+
+    def step_rest(self, dropped, time_passed=TICK_MS):
+        """The part of a tick after the bullets moved, dropped being the bullets the engine let go."""
+        profiler = self.profiler
+        for bullet in dropped:
+            self._release_bullet(bullet)
+
+        for bonus in self.bonuses[:]:
+            if not bonus.active:
+                self.remove_bonus(bonus)
+
+        for label in self.labels[:]:
+            if not label.active:
+                self.labels.remove(label)
+                self.label_pool.release(label)
+
+        if not self.game_over:
+            if not self.castle.active:
+                self._game_over()
+        if profiler is not None:
+            profiler.mark("bullets")
+
+        self.gtimer.update(time_passed)
+        if profiler is not None:
+            profiler.mark("gtimer")
+
+    def _get_enemies_count_by_level(self):
+        return self.level.enemy_counts
+
+    def get_pool_stats(self):
+        return {
+            "bullets": self.bullet_pool.get_stats(),
+            "explosions": self.explosion_pool.get_stats(),
+            "labels": self.label_pool.get_stats()
+        }
+
+    def _release_bullet(self, bullet):
+        if bullet.explosion is not None:
+            self.explosion_pool.release(bullet.explosion)
+            bullet.explosion = None
+        self.bullet_pool.release(bullet)
+
+    def _clear_game_objects_for_next_level(self):
+        for bullet in self.bullets:
+            self._release_bullet(bullet)
+        for tank in self.players + self.enemies:
+            if tank.explosion is not None:
+                self.explosion_pool.release(tank.explosion)
+                tank.explosion = None
+        for label in self.labels:
+            self.label_pool.release(label)
+        del self.bullets[:]
+        del self.enemies[:]
+        del self.bonuses[:]
+        del self.labels[:]
+        self.tank_hash.clear()
+        self.bonus_hash.clear()
+        self.castle.rebuild()
+        self.gtimer.clear()
+
+    def _trigger_bonus(self, bonus, player):
+        if self.play_sounds:
+            self.audio.play("bonus")
+
+        player.trophies["bonus"] += 1
+        player.score += 500
+
+        if bonus.bonus == BonusType.Grenade:
+            for enemy in self.enemies:
+                enemy.explode()
+        elif bonus.bonus == BonusType.Helmet:
+            self._cover_player_with_shield(player, True, 10000)
+        elif bonus.bonus == BonusType.Shovel:
+            self.level.build_castle(Tile.Steel)
+            self.gtimer.add(10000, lambda: self.level.build_castle(Tile.Brick), 1)
+        elif bonus.bonus == BonusType.Star:
+            player.superpowers += 1
+            if player.superpowers == 2:
+                player.max_active_bullets = 2
+        elif bonus.bonus == BonusType.Tank:
+            player.lives += 1
+        elif bonus.bonus == BonusType.Timer:
+            self.toggle_enemy_freeze(True)
+            self.gtimer.add(10000, lambda: self.toggle_enemy_freeze(False), 1)
+        self.remove_bonus(bonus)
+
+        self.labels.append(self.label_pool.acquire(self, bonus.rect.topleft, "500", 500))
+
+    def remove_bonus(self, bonus):
+        if bonus in self.bonuses:
+            self.bonuses.remove(bonus)
+            self.bonus_hash.remove(bonus)
+
+    def _cover_player_with_shield(self, player, shield=True, duration=None):
+        player.shielded = shield
+        if shield:
+            player.timer_uuid_shield = self.gtimer.add(100, lambda: player.toggle_shield_image())
+        else:
+            self.gtimer.destroy(player.timer_uuid_shield)
+
+        if shield and duration is not None:
+            self.gtimer.add(duration, lambda: self._cover_player_with_shield(player, False), 1)
+
+    def _spawn_enemy(self):
+        if len(self.enemies) >= self.level.max_active_enemies:
+            return
+        if len(self.level.enemies_left) < 1 or self.time_freeze:
+            return
+        enemy = Enemy(self, self.level, 1)
+        # no free spawn slot, the enemy is left out and its type put back
+        if enemy.state == TankState.Dead:
+            return
+        self.enemies.append(enemy)
+        self.tank_hash.add(enemy)
+
+    def _reload_players(self):
+        if len(self.players) == 0:
+            # first player
+            player = Player(self, self.level, 0, list(PLAYER_POSITIONS[0]), Direction.Up, 0)
+            self.players.append(player)
+
+            # second player
+            if self.players_number == 2:
+                player = Player(self, self.level, 0, list(PLAYER_POSITIONS[1]), Direction.Up, 1)
+                player.controls = [pygame.K_f, pygame.K_w, pygame.K_d, pygame.K_s, pygame.K_a]
+                self.players.append(player)
+
+        for player in self.players:
+            player.level = self.level
+            self.tank_hash.add(player)
+            self._respawn_player(player, True)
+
+    def _respawn_player(self, player, clear_scores=False):
+        player.reset()
+
+        if clear_scores:
+            player.trophies = {"bonus": 0, "enemy0": 0, "enemy1": 0, "enemy2": 0, "enemy3": 0}
+
+        self._cover_player_with_shield(player, True, 4000)
+
+    def _game_over(self):
+        if self.play_sounds:
+            self.audio.stop_all()
+            self.audio.play("gameover")
+
+        self.game_over = True
+        self.gtimer.add(3000, lambda: self._end_stage(), 1)
+
+    def _finish_level(self):
+        if self.play_sounds:
+            self.audio.stop("background")
+
+        self.active = False
+        self.gtimer.add(3000, lambda: self._end_stage(), 1)
+
+    def _end_stage(self):
+        self.running = False
+        self.gtimer.clear()
+
+    def toggle_enemy_freeze(self, freeze=True):
+        for enemy in self.enemies:
+            enemy.paused = freeze
+        self.time_freeze = freeze
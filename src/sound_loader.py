@@ -0,0 +1,34 @@
+import threading
+import time
+
+import pygame
+
+
+class DeferredSound:
+    """A sound that may still be decoding."""
+    def __init__(self):
+        self.sound = None
+
+    def get(self):
+        """The decoded pygame Sound, None until it is ready."""
+        return self.sound
+
+
+class SoundLoader(threading.Thread):
+    """
+    Decodes sounds on a daemon thread so the window doesn't wait for them.
+    sounds holds a DeferredSound per name right away, callers poll its get:
+    None until its file is decoded, the pygame Sound from then on.
+    """
+    def __init__(self, filenames):
+        threading.Thread.__init__(self, name="SoundLoader", daemon=True)
+        self.filenames = filenames
+        self.sounds = {name: DeferredSound() for name in filenames}
+        # seconds the decoding took, None until it is done
+        self.elapsed = None
+
+    def run(self):
+        start = time.perf_counter()
+        for name, filename in self.filenames.items():
+            self.sounds[name].sound = pygame.mixer.Sound(filename)
+        self.elapsed = time.perf_counter() - start
@@ -0,0 +1,74 @@
+from src.constants import TILE_SIZE
+
+
+class SpatialHash:
+    """
+    Uniform grid broadphase for entities with a rect.
+
+    Every entity is registered in each cell its rect overlaps, so a query
+    only looks at the entities near the queried rect. Buckets are dicts to
+    keep query results in a reproducible order.
+    """
+    def __init__(self, cell_size=TILE_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.spans = {}
+
+    def _get_span(self, rect):
+        size = self.cell_size
+        return rect.left // size, rect.top // size, (rect.right - 1) // size, (rect.bottom - 1) // size
+
+    def _insert(self, entity, span):
+        self.spans[entity] = span
+        for x in range(span[0], span[2] + 1):
+            for y in range(span[1], span[3] + 1):
+                bucket = self.cells.get((x, y))
+                if bucket is None:
+                    bucket = self.cells[(x, y)] = {}
+                bucket[entity] = None
+
+    def _erase(self, entity, span):
+        for x in range(span[0], span[2] + 1):
+            for y in range(span[1], span[3] + 1):
+                bucket = self.cells[(x, y)]
+                del bucket[entity]
+                if not bucket:
+                    del self.cells[(x, y)]
+
+    def add(self, entity):
+        if entity in self.spans:
+            self.update(entity)
+        else:
+            self._insert(entity, self._get_span(entity.rect))
+
+    def remove(self, entity):
+        span = self.spans.pop(entity, None)
+        if span is not None:
+            self._erase(entity, span)
+
+    def update(self, entity):
+        """Move entity to the cells of its current rect. Entities not in the hash are ignored."""
+        span = self.spans.get(entity)
+        if span is None:
+            return
+        new_span = self._get_span(entity.rect)
+        if new_span != span:
+            self._erase(entity, span)
+            self._insert(entity, new_span)
+
+    def clear(self):
+        self.cells.clear()
+        self.spans.clear()
+
+    def query(self, rect):
+        """Entities whose rect collides with rect."""
+        found = {}
+        x0, y0, x1, y1 = self._get_span(rect)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                bucket = self.cells.get((x, y))
+                if bucket is not None:
+                    for entity in bucket:
+                        if entity not in found and rect.colliderect(entity.rect):
+                            found[entity] = None
+        return list(found)
@@ -0,0 +1,82 @@
+import pygame
+
+from src.constants import BonusType, Direction, EnemyType, Sprite, Tile
+
+# rects on the scaled sprite sheet, one per variant
+SPRITE_RECTS = {
+    Sprite.Player: [(0, 0, 13 * 2, 13 * 2), (16 * 2, 0, 13 * 2, 13 * 2)],
+    # basic, fast, powerful and armored tanks, then their flashing bonus-carrier frames
+    Sprite.Enemy: [(32 * 2 + 16 * 2 * n, 16 * 2 * row, 13 * 2, 15 * 2) for row in range(2) for n in range(len(EnemyType))],
+    Sprite.Shield: [(0, 48 * 2, 16 * 2, 16 * 2), (16 * 2, 48 * 2, 16 * 2, 16 * 2)],
+    Sprite.Spawn: [(32 * 2, 48 * 2, 16 * 2, 16 * 2), (48 * 2, 48 * 2, 16 * 2, 16 * 2)],
+    Sprite.Bullet: [(75 * 2, 74 * 2, 3 * 2, 4 * 2)],
+    Sprite.Explosion: [(0, 80 * 2, 32 * 2, 32 * 2), (32 * 2, 80 * 2, 32 * 2, 32 * 2), (64 * 2, 80 * 2, 32 * 2, 32 * 2)],
+    Sprite.Bonus: [(16 * 2 * n, 32 * 2, 16 * 2, 15 * 2) for n in range(len(BonusType))],
+    Sprite.Castle: [(0, 15 * 2, 16 * 2, 16 * 2), (16 * 2, 15 * 2, 16 * 2, 16 * 2)],
+    Sprite.EnemyLife: [(81 * 2, 57 * 2, 7 * 2, 7 * 2)],
+    Sprite.PlayerLife: [(89 * 2, 56 * 2, 7 * 2, 8 * 2)],
+    Sprite.Flag: [(64 * 2, 49 * 2, 16 * 2, 15 * 2)],
+    Sprite.Arrow: [(81 * 2, 48 * 2, 7 * 2, 7 * 2), (88 * 2, 48 * 2, 7 * 2, 7 * 2)],
+    Sprite.Water: [(64 * 2, 64 * 2, 8 * 2, 8 * 2), (64 * 2, 64 * 2, 8 * 2, 8 * 2)],
+    Sprite.LetterBrick: [(56 * 2, 64 * 2, 8 * 2, 8 * 2)]
+}
+
+TILE_RECTS = {
+    Tile.Brick: (48 * 2, 64 * 2, 8 * 2, 8 * 2),
+    Tile.Steel: (48 * 2, 72 * 2, 8 * 2, 8 * 2),
+    Tile.Grass: (56 * 2, 72 * 2, 8 * 2, 8 * 2),
+    Tile.Frozen: (72 * 2, 64 * 2, 8 * 2, 8 * 2)
+}
+
+# sprites drawn facing every direction, the sheet has them facing up
+ROTATED_SPRITES = (Sprite.Player, Sprite.Enemy, Sprite.Bullet)
+
+ROTATION_ANGLES = {
+    Direction.Up: 0,
+    Direction.Right: 270,
+    Direction.Down: 180,
+    Direction.Left: 90
+}
+
+
+class SpriteRegistry:
+    """
+    Every image the game draws, cut out of the sprite sheet and rotated once
+    at startup and shared by all instances.
+
+    Images are looked up by (sprite, direction, variant), variant being the
+    player number, EnemyType, BonusType, Tile or animation frame.
+    """
+    def __init__(self, images):
+        self.images = images
+
+    @classmethod
+    def from_sheet(cls, sprites):
+        images = {}
+        for sprite, rects in SPRITE_RECTS.items():
+            for variant, rect in enumerate(rects):
+                cls._add(images, sprite, variant, sprites.subsurface(rect))
+        for tile, rect in TILE_RECTS.items():
+            cls._add(images, Sprite.Tile, tile, sprites.subsurface(rect))
+        return cls(images)
+
+    @classmethod
+    def from_atlas(cls, atlas, frames):
+        """Registry over a baked atlas, frames mapping every key to its rect on it."""
+        return cls({key: atlas.subsurface(rect) for key, rect in frames.items()})
+
+    @staticmethod
+    def _add(images, sprite, variant, image):
+        if sprite in ROTATED_SPRITES:
+            for direction, angle in ROTATION_ANGLES.items():
+                images[(sprite, direction, variant)] = pygame.transform.rotate(image, angle) if angle else image
+        else:
+            images[(sprite, Direction.Up, variant)] = image
+
+    def get(self, sprite, direction=Direction.Up, variant=0):
+        return self.images[(sprite, direction, variant)]
+
+    def get_frames(self, sprite, count=None):
+        """Animation frames of a sprite in order."""
+        count = len(SPRITE_RECTS[sprite]) if count is None else count
+        return [self.images[(sprite, Direction.Up, variant)] for variant in range(count)]
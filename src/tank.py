@@ -1,12 +1,6 @@
-import random
-
 import pygame
 
-from src.bullet import Bullet
-from src.explosion import Explosion
-from src.label import Label
-
-from src.constants import BulletState, Direction, GameSide, TankState
+from src.constants import BulletState, Direction, GameSide, Sprite, TankState
 
 
 class Tank:
@@ -26,6 +20,7 @@ class Tank:
         # 3 - can destroy steel
         self.superpowers = 0
         self.bonus = None
+        self.explosion = None
         self.controls = [pygame.K_SPACE, pygame.K_UP, pygame.K_RIGHT, pygame.K_DOWN, pygame.K_LEFT]
         self.pressed = [False] * 4
 
@@ -35,17 +30,11 @@ class Tank:
         self.image_down = None
         self.image_left = None
 
-        self.shield_images = [
-            self.game.sprites.subsurface(0, 48 * 2, 16 * 2, 16 * 2),
-            self.game.sprites.subsurface(16 * 2, 48 * 2, 16 * 2, 16 * 2)
-        ]
+        self.shield_images = self.game.sprite_registry.get_frames(Sprite.Shield)
         self.shield_image = self.shield_images[0]
         self.shield_index = 0
 
-        self.spawn_images = [
-            self.game.sprites.subsurface(32 * 2, 48 * 2, 16 * 2, 16 * 2),
-            self.game.sprites.subsurface(48 * 2, 48 * 2, 16 * 2, 16 * 2)
-        ]
+        self.spawn_images = self.game.sprite_registry.get_frames(Sprite.Spawn)
         self.spawn_image = self.spawn_images[0]
         self.spawn_index = 0
 
@@ -57,7 +46,7 @@ class Tank:
             self.rect = pygame.Rect(0, 0, 26, 26)
 
         if direction is None:
-            self.direction = random.choice([Direction.Right, Direction.Down, Direction.Left])
+            self.direction = self.game.random.choice([Direction.Right, Direction.Down, Direction.Left])
         else:
             self.direction = direction
 
@@ -91,18 +80,20 @@ class Tank:
 
     def draw(self):
         if self.state == TankState.Alive:
-            self.game.screen.blit(self.image, self.rect.topleft)
+            rect = self.game.screen.blit(self.image, self.rect.topleft)
             if self.shielded:
-                self.game.screen.blit(self.shield_image, [self.rect.left - 3, self.rect.top - 3])
+                rect = rect.union(self.game.screen.blit(self.shield_image, [self.rect.left - 3, self.rect.top - 3]))
+            return rect
         elif self.state == TankState.Exploding:
-            self.explosion.draw()
+            return self.explosion.draw()
         elif self.state == TankState.Spawning:
-            self.game.screen.blit(self.spawn_image, self.rect.topleft)
+            return self.game.screen.blit(self.spawn_image, self.rect.topleft)
 
     def explode(self):
-        if self.state != TankState.Dead:
+        # a tank already exploding keeps its explosion, acquiring another would leak the first from the pool
+        if self.state not in (TankState.Dead, TankState.Exploding):
             self.state = TankState.Exploding
-            self.explosion = Explosion(self.game, self.rect.topleft)
+            self.explosion = self.game.explosion_pool.acquire(self.game, self.rect.topleft)
 
             if self.bonus:
                 self.spawn_bonus()
@@ -123,7 +114,7 @@ class Tank:
             if active_bullets >= self.max_active_bullets:
                 return False
 
-        bullet = Bullet(self.game, self.level, self.rect.topleft, self.direction)
+        bullet = self.game.bullet_pool.acquire(self.game, self.level, self.rect.topleft, self.direction)
 
         # if superpower level is at least 1
         if self.superpowers > 0:
@@ -140,9 +131,16 @@ class Tank:
             self.bullet_queued = False
 
         bullet.owner_class = self
-        self.game.bullets.append(bullet)
+        self.game.bullet_engine.add(bullet)
         return True
 
+    def set_images(self, sprite, variant=0):
+        registry = self.game.sprite_registry
+        self.image_up = registry.get(sprite, Direction.Up, variant)
+        self.image_right = registry.get(sprite, Direction.Right, variant)
+        self.image_down = registry.get(sprite, Direction.Down, variant)
+        self.image_left = registry.get(sprite, Direction.Left, variant)
+
     def rotate(self, direction, fix_position=True):
         self.direction = direction
 
@@ -162,6 +160,7 @@ class Tank:
                 self.rect.left = new_x
             if abs(self.rect.top - new_y) < 5:
                 self.rect.top = new_y
+            self.game.tank_hash.update(self)
 
     def turn_around(self):
         if self.direction in (Direction.Up, Direction.Right):
@@ -173,7 +172,8 @@ class Tank:
         if self.state == TankState.Exploding:
             if not self.explosion.active:
                 self.state = TankState.Dead
-                del self.explosion
+                self.game.explosion_pool.release(self.explosion)
+                self.explosion = None
 
     def get_nearest(self, num, base):
         return int(round(num / (base * 1.0)) * base)
@@ -190,9 +190,9 @@ class Tank:
                     points = (self.type + 1) * 100
                     tank.score += points
                     if self.game.play_sounds:
-                        self.game.sounds["explosion"].play()
+                        self.game.audio.play("explosion")
 
-                    self.game.labels.append(Label(self.game, self.rect.topleft, str(points), 500))
+                    self.game.labels.append(self.game.label_pool.acquire(self.game, self.rect.topleft, str(points), 500))
 
                 self.explode()
             return True
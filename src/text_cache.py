@@ -0,0 +1,31 @@
+from collections import OrderedDict
+
+
+class TextCache:
+    """
+    Rendered strings of one font, least recently used ones dropped first.
+
+    HUD numbers and popups repeat the same few strings every frame, so each
+    (text, antialias, color) is rasterized once and the surface is reused.
+    Callers must not draw on the returned surfaces.
+    """
+    def __init__(self, font, max_size=256):
+        self.font = font
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+
+    def render(self, text, antialias, color):
+        key = text, antialias, tuple(color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+
+        surface = self.font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
@@ -1,41 +1,82 @@
-import uuid
+import heapq
+import itertools
+
+# positions in a timer entry, kept as a list so heapq can order it by due time and handle
+DUE, HANDLE, INTERVAL, CALLBACK, REPEAT, TIMES = range(6)
 
 
 class Timer:
+    """
+    Scheduler for game callbacks.
+
+    Timers live in a min-heap ordered by due time, so update only visits the
+    timers that are due. A timer fires at most once per update, after more
+    than `interval` milliseconds passed since it was added or last fired.
+    """
     def __init__(self):
-        self.timers = []
+        self.time = 0
+        self.heap = []
+        self.timers = {}
+        self.handles = itertools.count(1)
+        # bumped by clear() so an update interrupted by a callback stops firing stale timers
+        self.generation = 0
 
     def add(self, interval, f, repeat=-1):
-        options = {
-            "interval": interval,
-            "callback": f,
-            "repeat": repeat,
-            "times": 0,
-            "time": 0,
-            "uuid": uuid.uuid4()
-        }
-        self.timers.append(options)
-
-        return options["uuid"]
-
-    def destroy(self, uuid_nr):
-        for timer in self.timers:
-            if timer["uuid"] == uuid_nr:
-                self.timers.remove(timer)
-                return
+        handle = next(self.handles)
+        timer = [self.time + interval, handle, interval, f, repeat, 0]
+        self.timers[handle] = timer
+        heapq.heappush(self.heap, timer)
+
+        return handle
+
+    def destroy(self, handle):
+        timer = self.timers.pop(handle, None)
+        if timer is None:
+            return
+        timer[CALLBACK] = None
+        # cancelled timers are dropped lazily, compact the heap once they are the majority
+        if len(self.heap) > 2 * len(self.timers) + 16:
+            self.heap = [timer for timer in self.heap if timer[CALLBACK] is not None]
+            heapq.heapify(self.heap)
+
+    def clear(self):
+        self.heap.clear()
+        self.timers.clear()
+        self.generation += 1
 
     def update(self, time_passed):
-        for timer in self.timers:
-            timer["time"] += time_passed
-            if timer["time"] > timer["interval"]:
-                timer["time"] -= timer["interval"]
-                timer["times"] += 1
-                if -1 < timer["repeat"] == timer["times"]:
-                    self.timers.remove(timer)
-                try:
-                    timer["callback"]()
-                except:
-                    try:
-                        self.timers.remove(timer)
-                    except:
-                        pass
+        self.time += time_passed
+
+        due = []
+        while self.heap and self.heap[0][DUE] < self.time:
+            timer = heapq.heappop(self.heap)
+            if timer[CALLBACK] is not None:
+                due.append(timer)
+        # timers due in the same update fire in the order they were added
+        due.sort(key=lambda t: t[HANDLE])
+
+        generation = self.generation
+        rescheduled = []
+        try:
+            for n, timer in enumerate(due):
+                callback = timer[CALLBACK]
+                if callback is None:
+                    continue
+                timer[TIMES] += 1
+                if -1 < timer[REPEAT] <= timer[TIMES]:
+                    del self.timers[timer[HANDLE]]
+                else:
+                    timer[DUE] += timer[INTERVAL]
+                    rescheduled.append(timer)
+                callback()
+                if self.generation != generation:
+                    return
+        except BaseException:
+            # put back the timers that did not get their turn
+            rescheduled.extend(timer for timer in due[n + 1:] if timer[CALLBACK] is not None)
+            raise
+        finally:
+            if self.generation == generation:
+                for timer in rescheduled:
+                    if timer[CALLBACK] is not None:
+                        heapq.heappush(self.heap, timer)
@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from src.batch import BatchedSimulation
+from src.constants import Direction, EnemyBehaviour
+from src.simulation import Simulation
+
+GAMES = 6
+PLAYERS = 2
+SEED = 100
+
+
+def _get_state(sim):
+    return (sim.stage, sim.game_over, bytes(sim.level.map), [player.score for player in sim.players],
+            [(tuple(player.rect), player.state) for player in sim.players],
+            [(tuple(enemy.rect), enemy.state, enemy.type) for enemy in sim.enemies],
+            [(tuple(bullet.rect), bullet.state) for bullet in sim.bullets], sim.random.getstate())
+
+
+def _get_inputs(rngs):
+    return [[(rng.choice([None] + list(Direction)), rng.random() < 0.5) for _ in range(PLAYERS)] for rng in rngs]
+
+
+def _play(games, start_stage, new_game, step, ticks, reset_every):
+    """
+    The state of every game after each tick, games starting the next stage
+    when one is cleared and a new game when it is lost or every reset_every
+    ticks, reseeded.
+    """
+    rngs = [random.Random(n) for n in range(len(games))]
+    inputs = _get_inputs(rngs)
+    states = []
+    for tick in range(ticks):
+        if tick % 10 == 0:
+            inputs = _get_inputs(rngs)
+        for n, game in enumerate(games):
+            if tick and tick % reset_every == 0:
+                new_game(n, SEED + tick + n)
+            elif not game.running:
+                if game.game_over:
+                    new_game(n, None)
+                else:
+                    start_stage(n)
+        step(inputs)
+        states.append([_get_state(game) for game in games])
+    return states
+
+
+@pytest.mark.parametrize("behaviour", [EnemyBehaviour.Wander, EnemyBehaviour.Hunt])
+def test_batch_plays_as_separate_simulations(behaviour):
+    ticks, reset_every = 900, 400
+
+    sims = [Simulation(PLAYERS, SEED + n, behaviour) for n in range(GAMES)]
+    for sim in sims:
+        sim.new_game(PLAYERS, 1)
+
+    def step(inputs):
+        for sim, sim_inputs in zip(sims, inputs):
+            sim.step(sim_inputs)
+
+    expected = _play(sims, lambda n: sims[n].start_stage(), lambda n, seed: sims[n].new_game(PLAYERS, 1, seed),
+                     step, ticks, reset_every)
+
+    batch = BatchedSimulation(GAMES, PLAYERS, SEED, behaviour)
+    for n in range(GAMES):
+        batch.start_stage(n, 1)
+    states = _play(batch.games, batch.start_stage, lambda n, seed: batch.reset(n, seed), batch.step, ticks,
+                   reset_every)
+
+    for tick, (expected_games, games) in enumerate(zip(expected, states)):
+        assert games == expected_games, f"tick {tick}"
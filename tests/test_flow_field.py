@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from src.constants import MAP_SIZE, TILE_SIZE, EnemyBehaviour, Tile
+from src.flow_field import NODES, FlowField
+from src.simulation import Simulation
+
+
+def _edit(behaviour, seed, edits=300):
+    """
+    A two player game on a seeded stage and its flow field after each of a
+    series of seeded edits: mostly tiles cleared, sometimes a brick laid or
+    the players moved.
+    """
+    sim = Simulation(2, seed, behaviour)
+    sim.new_game(2, 1 + seed * 7)
+    field = sim.flow_field
+    rng = random.Random(seed)
+    for _ in range(edits):
+        roll = rng.random()
+        if roll < 0.7:
+            cell = rng.randrange(MAP_SIZE * MAP_SIZE)
+            sim.level.set_tile(cell, Tile.Empty)
+        elif roll < 0.8:
+            cell = rng.randrange(MAP_SIZE * MAP_SIZE)
+            sim.level.set_tile(cell, Tile.Brick)
+        else:
+            for player in sim.players:
+                player.rect.topleft = (rng.randrange(NODES) * TILE_SIZE + 3, rng.randrange(NODES) * TILE_SIZE + 3)
+        field.update()
+        yield sim, field
+
+
+@pytest.mark.parametrize("behaviour", [EnemyBehaviour.Castle, EnemyBehaviour.Hunt])
+@pytest.mark.parametrize("seed", range(3))
+def test_incremental_update_matches_rebuild(behaviour, seed):
+    for sim, field in _edit(behaviour, seed):
+        castle_distance, distance = list(field.castle_distance), list(field.distance)
+        field.rebuild()
+        assert field.castle_distance == castle_distance
+        assert field.distance == distance
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_hunt_field_matches_all_targets_at_once(seed):
+    """The players laid over the castle's field give the distances of one Dijkstra from every target."""
+    for sim, field in _edit(EnemyBehaviour.Hunt, seed):
+        combined = FlowField(sim)
+        combined.level = sim.level
+        combined.castle_targets = field.castle_targets | field.player_targets
+        combined.rebuild()
+        assert combined.distance == field.distance